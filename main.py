@@ -14,6 +14,11 @@ from config import GITHUB_WEBHOOK_SECRET, ENV, PRODUCT_NAME, SENTRY_DSN, UTF8
 from scheduler import schedule_handler
 from services.github.github_manager import verify_webhook_signature
 from services.webhook_handler import handle_webhook_event
+from utils.retry import (
+    log_retry_metrics,
+    reset_retry_metrics,
+    set_deadline_from_lambda_context,
+)
 
 if ENV != "local":
     sentry_sdk.init(
@@ -30,11 +35,17 @@ mangum_handler = Mangum(app=app, lifespan="off")
 
 # Here is an entry point for the AWS Lambda function. Mangum is a library that allows you to use FastAPI with AWS Lambda.
 def handler(event, context):
+    # Retries never wait longer than the time left in this invocation
+    set_deadline_from_lambda_context(context=context)
+    reset_retry_metrics()
     if "source" in event and event["source"] == "aws.events":
         schedule_handler(_event=event, _context=context)
+        log_retry_metrics()
         return {"statusCode": 200}
 
-    return mangum_handler(event=event, context=context)
+    response = mangum_handler(event=event, context=context)
+    log_retry_metrics()
+    return response
 
 
 @app.post(path="/webhook")
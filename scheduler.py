@@ -1,7 +1,6 @@
 """This is scheduled to run by AWS Lambda"""
 
 import logging
-import time
 from config import GITHUB_APP_USER_ID, GITHUB_APP_USER_NAME, PRODUCT_ID, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
 from services.github.github_manager import (
     add_label_to_issue,
@@ -22,10 +21,8 @@ def schedule_handler(_event, _context) -> dict[str, int]:
     installation_ids: list[int] = supabase_manager.get_installation_ids()
 
     # Get all owners and repositories from GitHub.
+    # Requests are paced by the rate limit governor, so no fixed pauses are needed here
     for installation_id in installation_ids:
-        # Pause for 1+ second to avoid secondary rate limits. https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#pause-between-mutative-requests
-        time.sleep(1)
-
         # Get the installation access token for each installation ID.
         token = get_installation_access_token(installation_id=installation_id)
         if token is None:
@@ -34,7 +31,9 @@ def schedule_handler(_event, _context) -> dict[str, int]:
             continue
 
         # Get all owners and repositories for each installation ID.
-        owners_repos = get_installed_owners_and_repos(token=token)
+        owners_repos = get_installed_owners_and_repos(
+            token=token, installation_id=installation_id
+        )
 
         # Process each owner and repository.
         for owner_repo in owners_repos:
@@ -72,7 +71,6 @@ def schedule_handler(_event, _context) -> dict[str, int]:
                 continue
 
             # Label the issue with the product ID to trigger GitAuto.
-            time.sleep(1)
             add_label_to_issue(
                 owner=owner,
                 repo=repo,
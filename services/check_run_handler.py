@@ -1,17 +1,22 @@
-# Local imports
+# Standard imports
 import json
+import os
+
+# Local imports
 from config import (
+    CACHE_DIR,
     EMAIL_LINK,
+    ENV,
     GITHUB_APP_USER_NAME,
-    STRIPE_PRODUCT_ID_FREE,
     SUPABASE_URL,
     SUPABASE_SERVICE_ROLE_KEY,
 )
 from services.github.actions_manager import get_workflow_run_logs, get_workflow_run_path
+from services.github.blob_cache import log_blob_cache_stats
+from services.github.commit_manager import commit_staged_changes
 from services.github.github_manager import (
     get_installation_access_token,
     create_comment,
-    get_issue_comments,
     get_remote_file_content,
     get_remote_file_tree,
     update_comment,
@@ -24,18 +29,28 @@ from services.github.github_types import (
     PullRequest,
     Repository,
 )
-from services.github.pulls_manager import get_pull_request, get_pull_request_files
+from services.github.pulls_manager import (
+    format_pull_request_files,
+    get_pull_request,
+    get_pull_request_files,
+)
 from services.github.utils import create_permission_url
-from services.openai.commit_changes import chat_with_agent
+from services.openai.commit_changes import chat_with_agent, describe_tool_calls
 from services.openai.chat import chat_with_ai
 from services.openai.instructions.identify_cause import IDENTIFY_CAUSE
-from services.stripe.subscriptions import get_stripe_product_id
+from services.stripe.entitlements import is_paid_owner
 from services.supabase import SupabaseManager
-from services.supabase.owers_manager import get_stripe_customer_id
+from services.supabase.check_run_attempts_manager import SQLiteCheckRunAttempts
 from utils.colorize_log import colorize
 from utils.progress_bar import create_progress_bar
+from utils.task_graph import Task, run_task_graph
 
 supabase_manager = SupabaseManager(url=SUPABASE_URL, key=SUPABASE_SERVICE_ROLE_KEY)
+attempt_ledger: SupabaseManager | SQLiteCheckRunAttempts = supabase_manager
+if ENV == "local":
+    attempt_ledger = SQLiteCheckRunAttempts(
+        path=os.path.join(CACHE_DIR, "check_run_attempts.sqlite")
+    )
 
 
 def handle_check_run(payload: CheckRunCompletedPayload) -> None:
@@ -63,6 +78,7 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
     # Extract branch related variables
     check_suite: CheckSuite = check_run["check_suite"]
     head_branch: str = check_suite["head_branch"]
+    head_sha: str = check_run["head_sha"]
 
     # Extract sender related variables and return if sender is GitAuto itself
     sender_id: int = payload["sender"]["id"]
@@ -84,7 +100,6 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
 
     # Extract other information
     installation_id: int = payload["installation"]["id"]
-    token: str = get_installation_access_token(installation_id=installation_id)
     base_args: dict[str, str | int | bool] = {
         "owner_type": owner_type,
         "owner_id": owner_id,
@@ -98,74 +113,82 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
         "pull_number": pull_number,
         "workflow_run_id": workflow_run_id,
         "check_run_name": check_run_name,
-        "token": token,
     }
 
-    # Return here if stripe_customer_id is not found
-    stripe_customer_id: str | None = get_stripe_customer_id(owner_id=owner_id)
-    if stripe_customer_id is None:
-        msg = f"Skipping because customer is in free tier. stripe_customer_id: '{stripe_customer_id}'"
-        print(colorize(text=msg, color="yellow"))
-        return
-
-    # Return here if product_id is not found or is in free tier
-    product_id: str | None = get_stripe_product_id(customer_id=stripe_customer_id)
-    if product_id is None or product_id == STRIPE_PRODUCT_ID_FREE:
-        msg = f"Skipping because product_id is not found or is in free tier. product_id: '{product_id}'"
+    # Return here if the owner is in free tier. webhook_handler checks this before dispatching, and the plan is cached, so this is a cheap safeguard.
+    if not is_paid_owner(owner_id=owner_id):
+        msg = f"Skipping because owner '{owner_name}' is in free tier"
         print(colorize(text=msg, color="yellow"))
         return
 
     # Return here if GitAuto has tried to fix this Check Run error before because we need to avoid infinite loops
-    pr_comments = get_issue_comments(
-        issue_number=pull_number, base_args=base_args, includes_me=True
-    )
-    if any(check_run_name in comment for comment in pr_comments):
+    attempt_key = {
+        "owner": owner_name,
+        "repo": repo_name,
+        "pull_number": pull_number,
+        "check_run_name": check_run_name,
+    }
+    if attempt_ledger.has_check_run_attempt(**attempt_key):
         msg = "Skipping because GitAuto has tried to fix this Check Run error before"
         print(colorize(text=msg, color="yellow"))
         return
+    # This raises if the attempt can't be recorded, so that no repair runs without being recorded
+    attempt_ledger.create_check_run_attempt(**attempt_key, head_sha=head_sha)
+    token: str = get_installation_access_token(installation_id=installation_id)
+    base_args["token"] = token
 
-    # Create a first comment to inform the user that GitAuto is trying to fix the Check Run error
+    # Create a first comment to inform the user that GitAuto is trying to fix the Check Run error, while gathering the PR, the workflow, the file tree, and the error log concurrently
     msg = "Oops! Check run stumbled. Digging into logs... 🕵️"
     comment_body = create_progress_bar(p=0, msg=msg)
-    comment_url = create_comment(
-        issue_number=pull_number, body=comment_body, base_args=base_args
-    )
-    base_args["comment_url"] = comment_url
-
-    # Get title, body, and code changes in the PR
-    comment_body = "Checking out the pull request title, body, and code changes..."
-    update_comment(body=comment_body, base_args=base_args, p=5)
-    pull_title, pull_body = get_pull_request(url=pull_url, token=token)
     pull_file_url = f"{pull_url}/files"
-    pull_changes = get_pull_request_files(url=pull_file_url, token=token)
-
-    # Get the GitHub workflow file content
-    comment_body = "Checking out the GitHub Action workflow file..."
-    update_comment(body=comment_body, base_args=base_args, p=10)
-    workflow_path = get_workflow_run_path(
-        owner=owner_name, repo=repo_name, run_id=workflow_run_id, token=token
+    results = run_task_graph(
+        tasks={
+            "comment_url": Task(
+                func=lambda: create_comment(
+                    issue_number=pull_number, body=comment_body, base_args=base_args
+                )
+            ),
+            "pull_request": Task(
+                func=lambda: get_pull_request(url=pull_url, token=token)
+            ),
+            "pull_changes": Task(
+                func=lambda: get_pull_request_files(url=pull_file_url, token=token)
+            ),
+            "workflow_path": Task(
+                func=lambda: get_workflow_run_path(
+                    owner=owner_name, repo=repo_name, run_id=workflow_run_id, token=token
+                )
+            ),
+            "workflow_content": Task(
+                func=lambda workflow_path: (
+                    None
+                    if workflow_path == 404
+                    else get_remote_file_content(
+                        file_path=workflow_path, base_args=base_args
+                    )
+                ),
+                deps=("workflow_path",),
+            ),
+            "file_tree": Task(func=lambda: get_remote_file_tree(base_args=base_args)),
+            "error_log": Task(
+                func=lambda: get_workflow_run_logs(
+                    owner=owner_name, repo=repo_name, run_id=workflow_run_id, token=token
+                )
+            ),
+        }
     )
+    base_args["comment_url"] = results["comment_url"]
+    pull_title, pull_body = results["pull_request"]
+    pull_changes = results["pull_changes"]
     permission_url = create_permission_url(
         owner_type=owner_type, owner_name=owner_name, installation_id=installation_id
     )
-    if workflow_path == 404:
+    if results["workflow_path"] == 404:
         comment_body = f"Approve permission(s) to allow GitAuto to access the check run logs here: {permission_url}"
         return update_comment(body=comment_body, base_args=base_args)
-    workflow_content = get_remote_file_content(
-        file_path=workflow_path, base_args=base_args
-    )
-
-    # Get the file tree in the root of the repo
-    comment_body = "Checking out the file tree in the root of the repo..."
-    update_comment(body=comment_body, base_args=base_args, p=15)
-    file_tree: str = get_remote_file_tree(base_args=base_args)
-
-    # Get the error log from the workflow run
-    comment_body = "Checking out the error log from the workflow run..."
-    update_comment(body=comment_body, base_args=base_args, p=20)
-    error_log: str | int | None = get_workflow_run_logs(
-        owner=owner_name, repo=repo_name, run_id=workflow_run_id, token=token
-    )
+    workflow_content = results["workflow_content"]
+    file_tree: str = results["file_tree"]
+    error_log: str | int | None = results["error_log"]
     if error_log == 404:
         comment_body = f"Approve permission(s) to allow GitAuto to access the check run logs here: {permission_url}"
         return update_comment(body=comment_body, base_args=base_args)
@@ -179,7 +202,7 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
     input_message: dict[str, str] = {
         "pull_request_title": pull_title,
         "pull_request_body": pull_body,
-        "pull_request_changes": json.dumps(obj=pull_changes),
+        "pull_request_changes": format_pull_request_files(files=pull_changes or []),
         "workflow_content": workflow_content,
         "file_tree": file_tree,
         "error_log": error_log,
@@ -196,8 +219,8 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
     (
         _messages,
         _previous_calls,
-        _tool_name,
-        _tool_args,
+        _tool_names,
+        _tool_args_list,
         _token_input,
         _token_output,
         is_commented,
@@ -223,8 +246,8 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
         (
             messages,
             previous_calls,
-            tool_name,
-            tool_args,
+            tool_names,
+            tool_args_list,
             _token_input,
             _token_output,
             is_explored,
@@ -234,16 +257,19 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
             mode="get",  # explore can not be used here because "search_remote_file_contents" can search files only in the default branch NOT in the branch that is merged into the default branch
             previous_calls=previous_calls,
         )
-        comment_body = f"Calling `{tool_name}()` with `{tool_args}`..."
-        update_comment(body=comment_body, base_args=base_args, p=p)
-        p = min(p + 5, 95)
+        if tool_names:
+            comment_body = describe_tool_calls(
+                tool_names=tool_names, tool_args_list=tool_args_list
+            )
+            update_comment(body=comment_body, base_args=base_args, p=p)
+            p = min(p + 5, 95)
 
         # Commit changes based on the exploration information
         (
             messages,
             previous_calls,
-            tool_name,
-            tool_args,
+            tool_names,
+            tool_args_list,
             _token_input,
             _token_output,
             is_committed,
@@ -253,9 +279,12 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
             mode="commit",
             previous_calls=previous_calls,
         )
-        msg = f"Calling `{tool_name}()` with `{tool_args}`..."
-        update_comment(body=comment_body, base_args=base_args, p=p)
-        p = min(p + 5, 95)
+        if tool_names:
+            comment_body = describe_tool_calls(
+                tool_names=tool_names, tool_args_list=tool_args_list
+            )
+            update_comment(body=comment_body, base_args=base_args, p=p)
+            p = min(p + 5, 95)
 
         # If no new file is found and no changes are made, it means that the agent has completed the ticket or got stuck for some reason
         if not is_explored and not is_committed:
@@ -270,7 +299,15 @@ def handle_check_run(payload: CheckRunCompletedPayload) -> None:
         # Because the agent is committing changes, keep doing the loop
         retry_count = 0
 
+    # Commit all staged changes at once so that the check run is triggered only once
+    commit_sha = commit_staged_changes(base_args=base_args)
+    if commit_sha is None:
+        msg = f"I couldn't find anything to commit for the Check Run `{check_run_name}` error. Contact {EMAIL_LINK} if the issue persists."
+        update_comment(body=msg, base_args=base_args)
+        return
+
     # Create a pull request to the base branch
     msg = f"Committed the Check Run `{check_run_name}` error fix! Running it again..."
     update_comment(body=msg, base_args=base_args)
+    log_blob_cache_stats()
     return
@@ -1,11 +1,15 @@
 # Standard imports
 import json
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from uuid import uuid4
 
 # Local imports
 from config import (
+    EMAIL_LINK,
     EXCEPTION_OWNERS,
     GITHUB_APP_USER_ID,
     IS_PRD,
@@ -35,14 +39,23 @@ from services.github.github_types import (
     IssueInfo,
     RepositoryInfo,
 )
-from services.openai.commit_changes import chat_with_agent
+from services.github.blob_cache import log_blob_cache_stats
+from services.github.commit_manager import commit_staged_changes
+from services.github.lexical_index import (
+    RELEVANT_FILES_TIMEOUT,
+    find_relevant_files,
+)
+from services.openai.commit_changes import chat_with_agent, describe_tool_calls
 from services.openai.instructions.write_pr_body import WRITE_PR_BODY
 from services.openai.chat import chat_with_ai
 from services.supabase import SupabaseManager
 from utils.extract_urls import extract_urls
 from utils.progress_bar import create_progress_bar
+from utils.retry import get_remaining_time
+from utils.task_graph import Task, run_task_graph
 from utils.text_copy import (
     UPDATE_COMMENT_FOR_422,
+    UPDATE_COMMENT_FOR_RAISED_ERRORS_NO_CHANGES_MADE,
     git_command,
     pull_request_completed,
     request_limit_reached,
@@ -92,29 +105,37 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
     # Extract other information
     github_urls, other_urls = extract_urls(text=issue_body)
     installation_id: int = payload["installation"]["id"]
-    token: str = get_installation_access_token(installation_id=installation_id)
-    sender_email = get_user_public_email(username=sender_name, token=token)
-
     base_args: BaseArgs = {
         "owner": owner_name,
         "repo": repo_name,
         "is_fork": is_fork,
         "base_branch": base_branch_name,
         "new_branch": new_branch_name,
-        "token": token,
         "reviewers": reviewers,
     }
 
-    # Check if the user has reached the request limit
-    requests_left, request_count, end_date = (
-        supabase_manager.get_how_many_requests_left_and_cycle(
-            user_id=sender_id,
-            installation_id=installation_id,
-            user_name=sender_name,
-            owner_id=owner_id,
-            owner_name=owner_name,
-        )
+    # Get the token and the request limit concurrently. Nothing is read from the repository before the limit is checked, so requests over the limit don't spend the installation's rate limit.
+    results = run_task_graph(
+        tasks={
+            "token": Task(
+                func=lambda: get_installation_access_token(
+                    installation_id=installation_id
+                )
+            ),
+            "request_limit": Task(
+                func=lambda: supabase_manager.get_how_many_requests_left_and_cycle(
+                    user_id=sender_id,
+                    installation_id=installation_id,
+                    user_name=sender_name,
+                    owner_id=owner_id,
+                    owner_name=owner_name,
+                )
+            ),
+        }
     )
+    token: str = results["token"]
+    base_args["token"] = token
+    requests_left, request_count, end_date = results["request_limit"]
     print(f"{requests_left=}")
 
     # Notify the user if the request limit is reached and early return
@@ -126,36 +147,55 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         create_comment(issue_number=issue_number, body=body, base_args=base_args)
         return
 
+    # Then acknowledge the request while gathering what the agent reads first (root files list, issue comments, and URLs in the issue body). The comment, the usage record, the reaction, and the reads don't depend on each other.
     msg = "Got your request. Alright, let's get to it..."
     comment_body = create_progress_bar(p=0, msg=msg)
-    comment_url = create_comment(
-        issue_number=issue_number, body=comment_body, base_args=base_args
-    )
-    base_args["comment_url"] = comment_url
     unique_issue_id = f"{owner_type}/{owner_name}/{repo_name}#{issue_number}"
-    usage_record_id = supabase_manager.create_user_request(
-        user_id=sender_id,
-        user_name=sender_name,
-        installation_id=installation_id,
-        unique_issue_id=unique_issue_id,
-        email=sender_email,
-    )
-    add_reaction_to_issue(
-        issue_number=issue_number, content="eyes", base_args=base_args
-    )
-
-    # Check out the issue comments, and root files/directories list
-    comment_body = "Checking the issue title, body, comments, and root files list..."
-    update_comment(body=comment_body, base_args=base_args, p=10)
-    root_files_and_dirs: list[str] = get_remote_file_tree(base_args=base_args)
-    issue_comments = get_issue_comments(issue_number=issue_number, base_args=base_args)
-
-    # Check out the URLs in the issue body
+    tasks: dict[str, Task] = {
+        "sender_email": Task(
+            func=lambda: get_user_public_email(username=sender_name, token=token)
+        ),
+        "root_files_and_dirs": Task(
+            func=lambda: get_remote_file_tree(base_args=base_args)
+        ),
+        "issue_comments": Task(
+            func=lambda: get_issue_comments(
+                issue_number=issue_number, base_args=base_args
+            )
+        ),
+        "comment_url": Task(
+            func=lambda: create_comment(
+                issue_number=issue_number, body=comment_body, base_args=base_args
+            )
+        ),
+        "usage_record_id": Task(
+            func=lambda sender_email: supabase_manager.create_user_request(
+                user_id=sender_id,
+                user_name=sender_name,
+                installation_id=installation_id,
+                unique_issue_id=unique_issue_id,
+                email=sender_email,
+            ),
+            deps=("sender_email",),
+        ),
+        "reaction": Task(
+            func=lambda: add_reaction_to_issue(
+                issue_number=issue_number, content="eyes", base_args=base_args
+            )
+        ),
+    }
+    for i, url in enumerate(github_urls):
+        tasks[f"url_{i}"] = Task(
+            func=lambda url=url: get_remote_file_content_by_url(url=url, token=token)
+        )
+    results |= run_task_graph(tasks=tasks)
+    base_args["comment_url"] = results["comment_url"]
+    usage_record_id = results["usage_record_id"]
+    root_files_and_dirs: list[str] = results["root_files_and_dirs"]
+    issue_comments = results["issue_comments"]
     reference_contents: list[str] = []
-    for url in github_urls:
-        comment_body = "Also checking out the URLs in the issue body..."
-        update_comment(body=comment_body, base_args=base_args, p=15)
-        content = get_remote_file_content_by_url(url=url, token=token)
+    for i, url in enumerate(github_urls):
+        content = results[f"url_{i}"]
         print(f"```{url}\n{content}```\n")
         reference_contents.append(content)
 
@@ -194,6 +234,18 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         )
         return
 
+    # Rank the files against the issue in the background while the branch is created, since building the index the first time downloads the whole tree
+    executor = ThreadPoolExecutor(max_workers=1)
+    cancel_relevant_files = threading.Event()
+    relevant_files_future = executor.submit(
+        find_relevant_files,
+        query=f"{issue_title}\n{issue_body}",
+        ref=base_branch_name,
+        base_args=dict(base_args),
+        cancel=cancel_relevant_files,
+    )
+    executor.shutdown(wait=False)
+
     # Create a remote branch
     comment_body = "Looks like it's doable. Creating the remote branch..."
     update_comment(body=comment_body, base_args=base_args, p=30)
@@ -203,6 +255,19 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
     )
     create_remote_branch(sha=latest_commit_sha, base_args=base_args)
 
+    # Seed the exploration with the files that match the issue best, which saves the agent several rounds of searching
+    # The agent can explore without them, so don't wait for a slow build past the deadline
+    relevant_files = ""
+    timeout = max(0.0, min(get_remaining_time(), RELEVANT_FILES_TIMEOUT))
+    try:
+        relevant_files = relevant_files_future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # Stop the build so that it doesn't compete with the agent for memory and the rate limit
+        cancel_relevant_files.set()
+        logging.info("Skipped seeding relevant files after waiting %.0fs", timeout)
+    if relevant_files:
+        messages.append({"role": "user", "content": relevant_files})
+
     # Loop a process explore repo and commit changes until the ticket is resolved
     previous_calls = []
     retry_count = 0
@@ -212,8 +277,8 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         (
             messages,
             previous_calls,
-            tool_name,
-            tool_args,
+            tool_names,
+            tool_args_list,
             token_input,
             token_output,
             is_explored,
@@ -223,8 +288,10 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
             mode="explore",
             previous_calls=previous_calls,
         )
-        if tool_name is not None and tool_args is not None:
-            comment_body = f"Calling `{tool_name}()` with `{tool_args}`..."
+        if tool_names:
+            comment_body = describe_tool_calls(
+                tool_names=tool_names, tool_args_list=tool_args_list
+            )
             update_comment(body=comment_body, base_args=base_args, p=p)
             p = min(p + 5, 85)
 
@@ -232,8 +299,8 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         (
             messages,
             previous_calls,
-            tool_name,
-            tool_args,
+            tool_names,
+            tool_args_list,
             token_input,
             token_output,
             is_committed,
@@ -243,8 +310,10 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
             mode="commit",
             previous_calls=previous_calls,
         )
-        if tool_name is not None and tool_args is not None:
-            comment_body = f"Calling `{tool_name}()` with `{tool_args}`..."
+        if tool_names:
+            comment_body = describe_tool_calls(
+                tool_names=tool_names, tool_args_list=tool_args_list
+            )
             update_comment(body=comment_body, base_args=base_args, p=p)
             p = min(p + 5, 85)
 
@@ -267,6 +336,29 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         # Because the agent is committing changes, keep doing the loop
         retry_count = 0
 
+    # Commit all staged changes at once so that check runs are triggered only once
+    comment_body = "Committing the changes..."
+    update_comment(body=comment_body, base_args=base_args, p=88)
+    commit_sha = commit_staged_changes(base_args=base_args)
+    if commit_sha is None:
+        # Nothing was staged, or the commit failed and the staged changes are lost, so there is nothing to open a pull request for
+        is_failed = bool(base_args.get("staged_changes"))
+        if is_failed:
+            body = f"Sorry, I couldn't commit the changes to `{new_branch_name}`. Contact {EMAIL_LINK} if the issue persists."
+        else:
+            body = UPDATE_COMMENT_FOR_RAISED_ERRORS_NO_CHANGES_MADE
+        update_comment(body=body, base_args=base_args)
+        log_blob_cache_stats()
+        end_time = time.time()
+        supabase_manager.complete_and_update_usage_record(
+            usage_record_id=usage_record_id,
+            is_completed=not is_failed,  # False is only for GitAuto's failure
+            token_input=token_input,
+            token_output=token_output,
+            total_seconds=int(end_time - current_time),
+        )
+        return
+
     # Create a pull request to the base branch
     comment_body = "Creating a pull request..."
     update_comment(body=comment_body, base_args=base_args, p=90)
@@ -289,6 +381,7 @@ async def handle_gitauto(payload: GitHubLabeledPayload, trigger_type: str) -> No
         body_after_pr = UPDATE_COMMENT_FOR_422
     update_comment(body=body_after_pr, base_args=base_args)
 
+    log_blob_cache_stats()
     end_time = time.time()
     supabase_manager.complete_and_update_usage_record(
         usage_record_id=usage_record_id,
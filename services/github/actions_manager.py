@@ -1,32 +1,60 @@
-import io
-import zipfile
-import requests
-from config import GITHUB_API_URL, TIMEOUT, UTF8
+import re
+from typing import Any
+from config import GITHUB_API_URL, GITHUB_CHECK_RUN_FAILURES, TIMEOUT, UTF8
 from services.github.create_headers import create_headers
+from services.github.http_client import get_with_etag, github_request
 from utils.handle_exceptions import handle_exceptions
+from utils.task_graph import Task, run_task_graph
 
+# E.g. "2024-10-18T23:27:40.6602932Z "
+TIMESTAMP_PATTERN = re.compile(r"^\ufeff?\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z ")
+STEP_MARKER = "##[group]Run "
+ERROR_MARKER = "##[error]"
 
-def get_failed_step_log_file_name(owner: str, repo: str, run_id: int, token: str):
-    """No official API documents"""
+
+@handle_exceptions(default_return_value=[], raise_on_error=False)
+def get_failed_jobs(owner: str, repo: str, run_id: int, token: str):
+    """Return the failed jobs of the latest attempt of the run, or 404 if we can't access them. A matrix can fail in several jobs.
+    https://docs.github.com/en/rest/actions/workflow-jobs?apiVersion=2022-11-28#list-jobs-for-a-workflow-run"""
     url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/runs/{run_id}/jobs"
     headers = create_headers(token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
+    params = {"filter": "latest", "per_page": 100}
+    response = get_with_etag(url=url, headers=headers, params=params, timeout=TIMEOUT)
     if response.status_code == 404 and "Not Found" in response.text:
         return response.status_code
     response.raise_for_status()
-    data = response.json()
+    jobs: list[dict[str, Any]] = response.json().get("jobs", [])
+    failed_jobs = [j for j in jobs if j.get("conclusion") in GITHUB_CHECK_RUN_FAILURES]
+    if failed_jobs:
+        return failed_jobs
+
+    # A job that exceeds its timeout-minutes ends as cancelled, not timed_out. Otherwise cancelled jobs are fail-fast siblings of a failed job or cancelled by hand, and their logs only add noise.
+    return [job for job in jobs if job.get("conclusion") == "cancelled"]
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_job_log(owner: str, repo: str, job_id: int, token: str):
+    """Download the plain text log of a single job instead of the zip of the whole run. GitHub redirects to a short-lived URL and requests drops the Authorization header when following it.
+    https://docs.github.com/en/rest/actions/workflow-jobs?apiVersion=2022-11-28#download-job-logs-for-a-workflow-job"""
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/jobs/{job_id}/logs"
+    headers = create_headers(media_type="", token=token)
+    response = github_request(method="GET", url=url, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 404 and "Not Found" in response.text:
+        return response.status_code
+    response.raise_for_status()
+    return response.content.decode(encoding=UTF8, errors="replace")
 
-    # Get the first failed step name
-    for job in data.get("jobs", []):
-        job_name = job.get("name", "unknown_job")
-        for step in job.get("steps", []):
-            if step.get("conclusion") == "failure":
-                step_number = step.get("number")
-                step_name = step.get("name")
-                return f"{job_name}/{step_number}_{step_name}.txt"
 
-    # Return None if no failed step is found
-    return None
+def slice_failed_step_log(log: str) -> str:
+    """Cut the job log into steps at the "##[group]Run ..." markers that open each step, and return the first step with an "##[error]" line with timestamps removed. Fall back to the whole log if no step can be identified."""
+    lines = [TIMESTAMP_PATTERN.sub("", line, count=1) for line in log.splitlines()]
+    starts = [i for i, line in enumerate(lines) if line.startswith(STEP_MARKER)]
+    bounds = list(zip(starts, starts[1:] + [len(lines)]))
+    for start, end in bounds:
+        step = lines[start:end]
+        if any(line.startswith(ERROR_MARKER) for line in step):
+            return "\n".join(step)
+    return "\n".join(lines)
 
 
 @handle_exceptions(default_return_value="", raise_on_error=False)
@@ -34,7 +62,7 @@ def get_workflow_run_path(owner: str, repo: str, run_id: int, token: str):
     """https://docs.github.com/en/rest/actions/workflow-runs?apiVersion=2022-11-28#get-a-workflow-run"""
     url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/runs/{run_id}"
     headers = create_headers(token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
     if response.status_code == 404 and "Not Found" in response.text:
         return response.status_code
     response.raise_for_status()
@@ -45,36 +73,38 @@ def get_workflow_run_path(owner: str, repo: str, run_id: int, token: str):
 
 @handle_exceptions(default_return_value="", raise_on_error=False)
 def get_workflow_run_logs(owner: str, repo: str, run_id: int, token: str):
-    """https://docs.github.com/en/rest/actions/workflow-runs?apiVersion=2022-11-28#download-workflow-run-logs"""
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/actions/runs/{run_id}/logs"
-    headers = create_headers(media_type="", token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
-    if response.status_code == 404 and "Not Found" in response.text:
-        return response.status_code
-    response.raise_for_status()
-
-    # Get the failed step file name
-    failed_step_fname = get_failed_step_log_file_name(
-        owner=owner, repo=repo, run_id=run_id, token=token
-    )
-    if failed_step_fname == 404:
-        return failed_step_fname
+    """Return the logs of the failed steps in all failed jobs of the run, 404 if we can't access them, or None if no failed job is found. Only the logs of the failed jobs are downloaded, concurrently."""
+    failed_jobs = get_failed_jobs(owner=owner, repo=repo, run_id=run_id, token=token)
+    if failed_jobs == 404:
+        return failed_jobs
+    if not failed_jobs:
+        return None
 
-    # Read the content of the zip file
-    with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-        for log_fname in zf.namelist():
-            if log_fname != failed_step_fname:
-                continue
-
-            # Remove the first 28 characters from the log content
-            # E.g. "2024-10-18T23:27:40.6602932Z "
-            with zf.open(name=log_fname) as lf:
-                content = lf.read().decode(encoding=UTF8)
-                content = "\n".join(
-                    line[29:] if len(line) > 29 else line
-                    for line in content.splitlines()
+    results = run_task_graph(
+        tasks={
+            str(job["id"]): Task(
+                func=lambda job_id=job["id"]: get_job_log(
+                    owner=owner, repo=repo, job_id=job_id, token=token
                 )
-                content = f"```GitHub Check Run Log: {log_fname}\n{content}\n```"
-                return content
+            )
+            for job in failed_jobs
+        }
+    )
+    contents: list[str] = []
+    for job in failed_jobs:
+        log = results[str(job["id"])]
+        if log == 404:
+            return log
+        if not log:
+            continue
 
-    return None
+        # Name the log after the failed step as the run archive used to do
+        job_name = job.get("name", "unknown_job")
+        log_name = job_name
+        for step in job.get("steps", []):
+            if step.get("conclusion") == "failure":
+                log_name = f"{job_name}/{step.get('number')}_{step.get('name')}"
+                break
+        content = slice_failed_step_log(log=log)
+        contents.append(f"```GitHub Check Run Log: {log_name}\n{content}\n```")
+    return "\n\n".join(contents) if contents else None
@@ -0,0 +1,29 @@
+# Standard imports
+import os
+
+# Local imports
+from config import CACHE_DIR
+from utils.lru_cache import SizedLRUCache
+
+# Blobs are content-addressed by their SHA, so a cached blob never goes stale and can be shared by all handlers and runs in a warm container
+MAX_BLOB_CACHE_BYTES = 64 * 1024 * 1024
+MAX_BLOB_DISK_CACHE_BYTES = 256 * 1024 * 1024  # Lambda's /tmp is 512 MB by default
+blob_cache = SizedLRUCache(
+    max_bytes=MAX_BLOB_CACHE_BYTES,
+    disk_dir=os.path.join(CACHE_DIR, "blobs"),
+    max_disk_bytes=MAX_BLOB_DISK_CACHE_BYTES,
+)
+
+
+def get_cached_blob(sha: str) -> bytes | None:
+    """Return the raw content of the blob or None if it is not cached."""
+    return blob_cache.get(key=sha)
+
+
+def cache_blob(sha: str, content: bytes) -> None:
+    if sha:
+        blob_cache.set(key=sha, value=content)
+
+
+def log_blob_cache_stats() -> None:
+    print(f"Blob cache stats: {blob_cache.stats()}")
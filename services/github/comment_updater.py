@@ -0,0 +1,101 @@
+# Standard imports
+import threading
+import time
+from typing import Any
+
+# Local imports
+from config import TIMEOUT
+from services.github.create_headers import create_headers
+from services.github.http_client import github_request
+from utils.handle_exceptions import handle_exceptions
+
+# Progress edits are coalesced so that at most one PATCH is sent per interval. Each edit is a mutative request under GitHub's secondary rate limits.
+PROGRESS_COMMENT_INTERVAL = 3.0
+
+
+class ProgressCommentUpdater:
+    """Coalesces progress edits of one issue comment. update() only records the latest body and schedules a flush on a background thread, so callers never wait on GitHub. finish() cancels any pending flush and sends the final body synchronously, so a terminal state is never overwritten by an older progress body."""
+
+    def __init__(
+        self, comment_url: str, token: str, interval: float = PROGRESS_COMMENT_INTERVAL
+    ) -> None:
+        self.comment_url = comment_url
+        self.token = token
+        self.interval = interval
+        self.pending: str | None = None
+        self.timer: threading.Timer | None = None
+        self.flushed_at = 0.0
+        self.lock = threading.Lock()  # Guards pending and timer
+        self.send_lock = threading.Lock()  # Keeps PATCHes in order
+        self.sent = 0
+        self.coalesced = 0
+
+    def update(self, body: str) -> None:
+        with self.lock:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = body
+            if self.timer is not None:
+                return
+            delay = max(0.0, self.flushed_at + self.interval - time.monotonic())
+            self.timer = threading.Timer(interval=delay, function=self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self) -> dict[str, Any] | None:
+        with self.send_lock:
+            with self.lock:
+                body, self.pending, self.timer = self.pending, None, None
+            if body is None:
+                return None
+            self.flushed_at = time.monotonic()
+            self.sent += 1
+            return self.send(body=body)
+
+    def finish(self, body: str) -> dict[str, Any] | None:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = body
+        return self.flush()
+
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def send(self, body: str) -> dict[str, Any]:
+        """https://docs.github.com/en/rest/issues/comments#update-an-issue-comment"""
+        response = github_request(
+            method="PATCH",
+            url=self.comment_url,
+            headers=create_headers(token=self.token),
+            json={"body": body},
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+progress_updaters: dict[str, ProgressCommentUpdater] = {}
+progress_updaters_lock = threading.Lock()
+
+
+def get_progress_updater(comment_url: str, token: str) -> ProgressCommentUpdater:
+    with progress_updaters_lock:
+        updater = progress_updaters.get(comment_url)
+        if updater is None:
+            updater = ProgressCommentUpdater(comment_url=comment_url, token=token)
+            progress_updaters[comment_url] = updater
+        updater.token = token  # Installation tokens are renewed per run
+        return updater
+
+
+def finish_progress_updater(comment_url: str, token: str, body: str):
+    """Send the final body of the comment and forget its updater so that a warm container doesn't keep one per comment."""
+    updater = get_progress_updater(comment_url=comment_url, token=token)
+    with progress_updaters_lock:
+        progress_updaters.pop(comment_url, None)
+    result = updater.finish(body=body)
+    print(
+        f"Progress comment edits: {updater.sent} sent, {updater.coalesced} coalesced"
+    )
+    return result
@@ -0,0 +1,157 @@
+# Standard imports
+import base64
+
+# Local imports
+from config import GITHUB_API_URL, TIMEOUT, UTF8
+from services.github.create_headers import create_headers
+from services.github.github_types import BaseArgs
+from services.github.http_client import get_with_etag, github_request
+from services.github.tree_index import load_tree_index
+from utils.handle_exceptions import handle_exceptions
+
+
+def stage_file_change(
+    file_path: str, content: str, base_args: BaseArgs, message: str | None = None
+) -> None:
+    """Keep a file change in memory until commit_staged_changes() is called so that all changes in a run end up in one commit (and one set of check runs)."""
+    staged_changes: dict[str, dict[str, str]] = base_args.setdefault(
+        "staged_changes", {}
+    )
+    if message is None:
+        message = f"Update {file_path}"
+    staged_changes[file_path] = {"content": content, "message": message}
+
+
+def get_staged_file_content(file_path: str, base_args: BaseArgs) -> str | None:
+    """Return the staged content of the file or None if the file is not staged."""
+    staged_change = base_args.get("staged_changes", {}).get(file_path)
+    return None if staged_change is None else staged_change["content"]
+
+
+@handle_exceptions(raise_on_error=True)
+def get_branch_head(base_args: BaseArgs) -> tuple[str, str]:
+    """Return the commit SHA and the tree SHA of the working branch.
+    https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#get-a-reference
+    https://docs.github.com/en/rest/git/commits?apiVersion=2022-11-28#get-a-commit-object
+    """
+    owner, repo, branch, token = (
+        base_args["owner"],
+        base_args["repo"],
+        base_args["new_branch"],
+        base_args["token"],
+    )
+    headers = create_headers(token=token)
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{branch}"
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    commit_sha: str = response.json()["object"]["sha"]
+
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits/{commit_sha}"
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    tree_sha: str = response.json()["tree"]["sha"]
+    return commit_sha, tree_sha
+
+
+@handle_exceptions(raise_on_error=True)
+def create_blob(content: str, base_args: BaseArgs) -> str:
+    """https://docs.github.com/en/rest/git/blobs?apiVersion=2022-11-28#create-a-blob"""
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    encoded_content = base64.b64encode(s=content.encode(encoding=UTF8))
+    response = github_request(
+        method="POST",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/blobs",
+        headers=create_headers(token=token),
+        json={"content": encoded_content.decode(encoding=UTF8), "encoding": "base64"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["sha"]
+
+
+@handle_exceptions(raise_on_error=True)
+def create_tree(base_tree: str, tree: list[dict[str, str]], base_args: BaseArgs) -> str:
+    """https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#create-a-tree"""
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    response = github_request(
+        method="POST",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees",
+        headers=create_headers(token=token),
+        json={"base_tree": base_tree, "tree": tree},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["sha"]
+
+
+@handle_exceptions(raise_on_error=True)
+def create_commit(message: str, tree_sha: str, parent: str, base_args: BaseArgs) -> str:
+    """https://docs.github.com/en/rest/git/commits?apiVersion=2022-11-28#create-a-commit"""
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    response = github_request(
+        method="POST",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits",
+        headers=create_headers(token=token),
+        json={"message": message, "tree": tree_sha, "parents": [parent]},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["sha"]
+
+
+@handle_exceptions(raise_on_error=True)
+def update_branch_ref(sha: str, base_args: BaseArgs) -> None:
+    """https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#update-a-reference"""
+    owner, repo, branch, token = (
+        base_args["owner"],
+        base_args["repo"],
+        base_args["new_branch"],
+        base_args["token"],
+    )
+    response = github_request(
+        method="PATCH",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs/heads/{branch}",
+        headers=create_headers(token=token),
+        json={"sha": sha, "force": False},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def commit_staged_changes(base_args: BaseArgs) -> str | None:
+    """Commit all staged changes to the working branch as a single commit with the Git Data API: blobs -> tree -> commit -> ref. Return the new commit SHA or None if nothing is staged."""
+    staged_changes: dict[str, dict[str, str]] = base_args.get("staged_changes", {})
+    if not staged_changes:
+        return None
+
+    parent_sha, base_tree_sha = get_branch_head(base_args=base_args)
+    file_paths = list(staged_changes)
+    base_tree = load_tree_index(tree_sha=base_tree_sha, base_args=base_args)
+    tree: list[dict[str, str]] = []
+    for file_path in file_paths:
+        blob_sha = create_blob(
+            content=staged_changes[file_path]["content"], base_args=base_args
+        )
+
+        # Keep the mode of an existing file not to drop the executable bit
+        mode = "100644"
+        i = -1 if base_tree is None else base_tree.find(path=file_path)
+        if i != -1:
+            mode = base_tree.modes[i]
+        tree.append({"path": file_path, "mode": mode, "type": "blob", "sha": blob_sha})
+    tree_sha = create_tree(base_tree=base_tree_sha, tree=tree, base_args=base_args)
+
+    # Use the single message as is, or summarize the messages of multiple files
+    messages = [staged_changes[file_path]["message"] for file_path in file_paths]
+    message = messages[0]
+    if len(messages) > 1:
+        message = f"Update {len(file_paths)} files\n\n- " + "\n- ".join(messages)
+
+    commit_sha = create_commit(
+        message=message, tree_sha=tree_sha, parent=parent_sha, base_args=base_args
+    )
+    update_branch_ref(sha=commit_sha, base_args=base_args)
+    staged_changes.clear()
+    print(f"Committed {len(file_paths)} files in {commit_sha}: {file_paths}")
+    return commit_sha
@@ -0,0 +1,94 @@
+# Local imports
+from config import GITHUB_API_URL, TIMEOUT, UTF8
+from services.github.blob_cache import cache_blob, get_cached_blob
+from services.github.create_headers import create_headers
+from services.github.github_types import BaseArgs
+from services.github.http_client import get_with_etag, github_request
+from services.github.tree_index import (
+    TreeIndex,
+    get_cached_tree_index,
+    get_tree_index,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_blob_content(sha: str, base_args: BaseArgs) -> bytes:
+    """Stream the raw bytes of a blob, which works for files up to 100 MB.
+    https://docs.github.com/en/rest/git/blobs?apiVersion=2022-11-28#get-a-blob"""
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    response = github_request(
+        method="GET",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/blobs/{sha}",
+        headers=create_headers(token=token, media_type=".raw"),
+        timeout=TIMEOUT,
+        stream=True,
+    )
+    with response:
+        response.raise_for_status()
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            content.extend(chunk)
+    return bytes(content)
+
+
+def get_blob(sha: str, base_args: BaseArgs) -> bytes:
+    """Return the raw bytes of a blob from the cache or GitHub. The content is keyed by the SHA it was fetched with, so a cached blob always matches its SHA."""
+    cached = get_cached_blob(sha=sha)
+    if cached is not None:
+        return cached
+    content = get_blob_content(sha=sha, base_args=base_args)
+    cache_blob(sha=sha, content=content)
+    return content
+
+
+def fetch_file(
+    file_path: str,
+    ref: str,
+    base_args: BaseArgs,
+    fetch_tree: bool = True,
+    index: TreeIndex | None = None,
+) -> bytes | list[str] | None:
+    """Return the raw bytes of the file, the paths in it if file_path is a directory, or None if it doesn't exist.
+
+    A file in the tree index of the ref is fetched from /git/blobs/{sha} by the SHA in the index, so the content always belongs to the same commit as the index and a cached blob is returned without a request. Pass the index if the caller already resolved the ref, so that the ref is resolved once. With fetch_tree=False, only a tree index already in memory is used. Directories, and files when no index is available, are fetched from the Contents API with the raw media type.
+    https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28#get-repository-content
+    """
+    if index is None and fetch_tree:
+        index = get_tree_index(ref=ref, base_args=base_args)
+    elif index is None:
+        index = get_cached_tree_index(ref=ref)
+    i = -1 if index is None else index.find(path=file_path)
+    if i != -1:
+        return get_blob(sha=index.shas[i], base_args=base_args)
+
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}"
+    response = get_with_etag(
+        url=url,
+        headers=create_headers(token=token, media_type=".raw"),
+        params={"ref": ref},
+        timeout=TIMEOUT,
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    # A directory is listed in JSON even with the raw media type
+    if response.headers.get("Content-Type", "").startswith("application/json"):
+        items = response.json()
+        if isinstance(items, list) and all(
+            isinstance(item, dict) and "path" in item and "type" in item
+            for item in items
+        ):
+            return [item["path"] for item in items]
+    return response.content
+
+
+def get_gitattributes(index: TreeIndex | None, base_args: BaseArgs) -> str | None:
+    """Return the root .gitattributes in the tree index, or None if there is none. A repository without one costs no request."""
+    i = -1 if index is None else index.find(path=".gitattributes")
+    if i == -1:
+        return None
+    content = get_blob(sha=index.shas[i], base_args=base_args)
+    return content.decode(encoding=UTF8, errors="replace")
@@ -6,6 +6,7 @@ import json
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Optional
 from uuid import uuid4
@@ -14,10 +15,6 @@ from uuid import uuid4
 import jwt  # For generating JWTs (JSON Web Tokens)
 import requests
 from fastapi import Request
-from github import Github, GithubException
-from github.ContentFile import ContentFile
-from github.PullRequest import PullRequest
-from github.Repository import Repository
 
 # Local imports
 from config import (
@@ -38,93 +35,221 @@ from config import (
     SUPABASE_SERVICE_ROLE_KEY,
     UTF8,
 )
+from services.github.commit_manager import (
+    create_commit,
+    create_tree,
+    get_staged_file_content,
+    stage_file_change,
+)
+from services.github.comment_updater import (
+    finish_progress_updater,
+    get_progress_updater,
+)
 from services.github.create_headers import create_headers
 from services.github.github_types import (
     BaseArgs,
-    GitHubContentInfo,
     GitHubLabeledPayload,
     IssueInfo,
 )
+from services.github.file_fetcher import fetch_file, get_gitattributes
+from services.github.http_client import get_with_etag, github_request
+from services.github.pagination import get_all_pages, iter_pages
 from services.github.pulls_manager import add_reviewers
+from services.github.rate_limiter import rate_limit_governor
+from services.github.tree_index import get_tree_index
 from services.openai.vision import describe_image
 from services.supabase import SupabaseManager
-from utils.detect_new_line import detect_line_break
+from utils.code_outline import get_outline, render_outline
+from utils.content_classifier import classify_content, summarize_content
 from utils.file_manager import apply_patch, get_file_content, run_command
+from utils.file_view import MAX_VIEW_CHARS, get_file_view
 from utils.handle_exceptions import handle_exceptions
 from utils.parse_urls import parse_github_url
 from utils.progress_bar import create_progress_bar
+from utils.retry import RetryPolicy
 from utils.text_copy import request_issue_comment, request_limit_reached
 
+IMAGE_EXTENSIONS = (".png", ".jpeg", ".jpg", ".webp", ".gif")
+MAX_ISSUE_TEMPLATE_WORKERS = 8
+GRAPHQL_REPOS_PER_QUERY = 50
+DEFAULT_BRANCH_RETRY = RetryPolicy(
+    name="github_default_branch", max_attempts=MAX_RETRIES, base_delay=5, max_delay=20
+)
+
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
-def add_issue_templates(full_name: str, installer_name: str, token: str) -> None:
+def add_issue_templates(
+    full_name: str,
+    installer_name: str,
+    token: str,
+    missing_templates: list[str] | None = None,
+) -> list[str] | None:
+    """Open a PR that adds the missing issue templates in a single commit made with the Git Data API. Pass missing_templates from get_missing_issue_templates() to skip listing GITHUB_ISSUE_DIR again. Return the names of the added templates, or None on failure."""
     print(f"Adding issue templates to the repo: '{full_name}' by '{installer_name}'.\n")
-    gh = Github(login_or_token=token)
-    repo: Repository = gh.get_repo(full_name_or_id=full_name)
-
-    # Create a new branch
-    default_branch = None
-    default_branch_name: str = repo.default_branch
-    retries = 0
-    while retries < MAX_RETRIES:
-        try:
-            default_branch = repo.get_branch(branch=default_branch_name)
-            break
-        except GithubException as e:
-            retries += 1
-            msg = f"Error getting default branch for repo '{full_name}', branch '{default_branch_name}'. Status: {e.status}, Error: {e.data}"
-            logging.info(msg)
-            time.sleep(20)
+    owner, repo = full_name.split("/", 1)
+    headers = create_headers(token=token)
+
+    # https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#get-a-repository
+    response = get_with_etag(
+        url=f"{GITHUB_API_URL}/repos/{full_name}", headers=headers, timeout=TIMEOUT
+    )
+    response.raise_for_status()
+    default_branch_name: str = response.json()["default_branch"]
+
+    # Get the default branch. It may not exist yet right after a repository is created, so retry with backoff. https://docs.github.com/en/rest/branches/branches?apiVersion=2022-11-28#get-a-branch
+    def get_default_branch() -> dict[str, Any]:
+        url = f"{GITHUB_API_URL}/repos/{full_name}/branches/{default_branch_name}"
+        branch_response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
+        branch_response.raise_for_status()
+        return branch_response.json()
+
+    default_branch = DEFAULT_BRANCH_RETRY.call(
+        get_default_branch,
+        get_retry_delay=lambda err: (
+            0
+            if isinstance(err, requests.exceptions.HTTPError)
+            and err.response.status_code == 404
+            else None
+        ),
+    )
+    commit_sha: str = default_branch["commit"]["sha"]
+    tree_sha: str = default_branch["commit"]["commit"]["tree"]["sha"]
+
+    # Get the list of existing files in the user's remote repository at the GITHUB_ISSUE_DIR once. It returns 404 if the directory doesn't exist. Also directory path MUST end without a slash. https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28#get-repository-content
+    if missing_templates is None:
+        url = f"{GITHUB_API_URL}/repos/{full_name}/contents/{GITHUB_ISSUE_DIR}"
+        response = get_with_etag(
+            url=url, headers=headers, params={"ref": commit_sha}, timeout=TIMEOUT
+        )
+        remote_file_names: list[str] = []
+        if response.status_code != 404:
+            response.raise_for_status()
+            remote_file_names = [file["name"] for file in response.json()]
+        missing_templates = [
+            template_file
+            for template_file in GITHUB_ISSUE_TEMPLATES
+            if template_file not in remote_file_names
+        ]
+    if not missing_templates:
+        return []
+
+    # Commit all templates at once on a new branch: tree -> commit -> ref. Tree entries can carry the content inline, so no blob needs to be created.
     new_branch_name: str = f"{PRODUCT_ID}/add-issue-templates-{str(object=uuid4())}"
-    ref = f"refs/heads/{new_branch_name}"
-    if default_branch is None:
-        msg = f"Error: Could not get the default branch for repo: {full_name} and branch: {default_branch_name}."
-        raise RuntimeError(msg)
-    repo.create_git_ref(ref=ref, sha=default_branch.commit.sha)
-
-    # Add issue templates to the new branch
-    added_templates: list[str] = []
-    for template_file in GITHUB_ISSUE_TEMPLATES:
+    base_args: BaseArgs = {
+        "owner": owner,
+        "repo": repo,
+        "base_branch": default_branch_name,
+        "new_branch": new_branch_name,
+        "token": token,
+        "reviewers": [installer_name],
+    }
+    tree: list[dict[str, str]] = []
+    for template_file in missing_templates:
         # Get an issue template content from GitAuto repository
         template_path: str = GITHUB_ISSUE_DIR + "/" + template_file
         content = get_file_content(file_path=template_path)
-
-        # Get the list of existing files in the user's remote repository at the GITHUB_ISSUE_DIR. We need to use try except as repo.get_contents() raises a 404 error if the directory doesn't exist. Also directory path MUST end without a slash.
-        try:
-            remote_files: list[ContentFile] = repo.get_contents(path=GITHUB_ISSUE_DIR)
-            remote_file_names: list[str] = [file.name for file in remote_files]
-        except Exception:  # pylint: disable=broad-except
-            remote_file_names = []
-
-        # Skip if the template already exists
-        if template_file in remote_file_names:
-            continue
-
-        # Add file to the new branch
-        msg = f"Add a template: {template_file}"
-        repo.create_file(
-            path=template_path, message=msg, content=content, branch=new_branch_name
+        tree.append(
+            {"path": template_path, "mode": "100644", "type": "blob", "content": content}
         )
-        added_templates.append(template_file)
-
-    # Return early if no templates were added
-    if not added_templates:
-        return
+    new_tree_sha = create_tree(base_tree=tree_sha, tree=tree, base_args=base_args)
+    new_commit_sha = create_commit(
+        message=f"Add issue templates: {', '.join(missing_templates)}",
+        tree_sha=new_tree_sha,
+        parent=commit_sha,
+        base_args=base_args,
+    )
+    create_remote_branch(sha=new_commit_sha, base_args=base_args)
 
-    # If there are added templates, create a PR
-    pr: PullRequest = repo.create_pull(
-        base=default_branch_name,
-        head=new_branch_name,
+    # Create a PR with the added templates. The installer is requested as a reviewer if they are a collaborator.
+    create_pull_request(
         # Add X issue templates: bug_report.yml, feature_request.yml
-        title=f"Add {len(added_templates)} issue templates",
+        title=f"Add {len(missing_templates)} issue templates",
         body=f"## Overview\n\nThis PR adds issue templates to the repository so that you can create issues more easily for {PRODUCT_NAME} and your project. Please review the changes and merge the PR if you agree.\n\n## Added templates:\n\n- "
-        + "\n- ".join(added_templates),
-        maintainer_can_modify=True,
-        draft=False,
+        + "\n- ".join(missing_templates),
+        base_args=base_args,
     )
+    return missing_templates
+
 
-    # Add reviewers to the PR. When I tried to add reviewers, I got a 422 error. So, "reviewers" parameter must be an array of strings, not a string.
-    pr.create_review_request(reviewers=[installer_name])
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_missing_issue_templates(
+    full_names: list[str], token: str
+) -> dict[str, list[str]] | None:
+    """Check GITHUB_ISSUE_DIR on the default branch of many repositories at once with aliased GraphQL queries, and return the templates each repository is missing. Repositories that already have all templates are left out. A repository that can't be checked (e.g. no default branch yet) is treated as missing all templates so that add_issue_templates handles it as before.
+    https://docs.github.com/en/graphql/reference/objects#repository"""
+    missing: dict[str, list[str]] = {}
+    for start in range(0, len(full_names), GRAPHQL_REPOS_PER_QUERY):
+        chunk = full_names[start : start + GRAPHQL_REPOS_PER_QUERY]
+        params: list[str] = []
+        fields: list[str] = []
+        variables: dict[str, str] = {"expression": f"HEAD:{GITHUB_ISSUE_DIR}"}
+        for i, full_name in enumerate(chunk):
+            owner, name = full_name.split("/", 1)
+            params.append(f"$owner{i}: String!, $name{i}: String!")
+            fields.append(
+                f"r{i}: repository(owner: $owner{i}, name: $name{i}) {{ object(expression: $expression) {{ ... on Tree {{ entries {{ name }} }} }} }}"
+            )
+            variables[f"owner{i}"] = owner
+            variables[f"name{i}"] = name
+        query = f"query($expression: String!, {', '.join(params)}) {{ {' '.join(fields)} }}"
+        response: requests.Response = github_request(
+            method="POST",
+            url=f"{GITHUB_API_URL}/graphql",
+            headers=create_headers(token=token),
+            json={"query": query, "variables": variables},
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        # Inaccessible repositories come back as null with an entry in "errors" while the others still have data
+        data: dict[str, Any] = response.json().get("data") or {}
+        for i, full_name in enumerate(chunk):
+            tree = (data.get(f"r{i}") or {}).get("object") or {}
+            existing = {entry["name"] for entry in tree.get("entries", [])}
+            templates = [t for t in GITHUB_ISSUE_TEMPLATES if t not in existing]
+            if templates:
+                missing[full_name] = templates
+    return missing
+
+
+def add_issue_templates_to_repos(
+    full_names: list[str], installer_name: str, token: str
+) -> dict[str, list[str] | None]:
+    """Add issue templates to many repositories concurrently with bounded parallelism. Workers share the rate limit governor, so mutative requests stay paced across all of them. Return the added templates per repository (None on failure)."""
+    results: dict[str, list[str] | None] = {}
+
+    # Preflight so that repositories that already have the templates don't get a branch. Fall back to checking every repository if the preflight fails.
+    missing = get_missing_issue_templates(full_names=full_names, token=token)
+    if missing is not None:
+        for full_name in full_names:
+            if full_name not in missing:
+                results[full_name] = []
+        print(f"Issue templates already exist in {len(results)}/{len(full_names)} repos")
+        full_names = [full_name for full_name in full_names if full_name in missing]
+    if not full_names:
+        return results
+    max_workers = min(MAX_ISSUE_TEMPLATE_WORKERS, len(full_names))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                add_issue_templates,
+                full_name=full_name,
+                installer_name=installer_name,
+                token=token,
+                missing_templates=None if missing is None else missing[full_name],
+            ): full_name
+            for full_name in full_names
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            full_name = futures[future]
+            results[full_name] = future.result()
+            if results[full_name] is None:
+                status = "failed"
+            elif results[full_name]:
+                status = f"added {', '.join(results[full_name])}"
+            else:
+                status = "already has templates"
+            print(f"Issue templates ({i}/{len(full_names)}): {full_name} {status}")
+    return results
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=True)
@@ -132,7 +257,8 @@ def add_label_to_issue(
     owner: str, repo: str, issue_number: int, label: str, token: str
 ) -> None:
     """If the label doesn't exist, it will be created. Color will be automatically assigned. If the issue already has the label, no change will be made and no error will be raised. https://docs.github.com/en/rest/issues/labels?apiVersion=2022-11-28#add-labels-to-an-issue"""
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/labels",
         headers=create_headers(token=token),
         json={"labels": [label]},
@@ -145,7 +271,8 @@ def add_label_to_issue(
 def add_reaction_to_issue(issue_number: int, content: str, base_args: BaseArgs) -> None:
     """https://docs.github.com/en/rest/reactions/reactions?apiVersion=2022-11-28#create-reaction-for-an-issue"""
     owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/reactions",
         headers=create_headers(token=token),
         json={"content": content},
@@ -159,59 +286,35 @@ def add_reaction_to_issue(issue_number: int, content: str, base_args: BaseArgs)
 def commit_changes_to_remote_branch(
     diff: str, file_path: str, base_args: BaseArgs, message: Optional[str] = None
 ):
-    """https://docs.github.com/en/rest/repos/contents#create-or-update-file-contents"""
+    """Apply the diff to the file and stage the result. Staged changes are committed together by commit_staged_changes() at the end of the run.
+    https://docs.github.com/en/rest/repos/contents#get-repository-content"""
     if message is None:
         message = f"Update {file_path}"
-    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
     new_branch = base_args["new_branch"]
     if not new_branch:
         raise ValueError("new_branch is not set.")
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={new_branch}"
-    headers = create_headers(token=token)
-    get_response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
-
-    # If 404 error, the file doesn't exist.
-    if get_response.status_code == 404:
-        original_text, sha = "", ""
-    else:
-        get_response.raise_for_status()
-        file_info: GitHubContentInfo = get_response.json()
 
-        # Handle case where response is a list (directory listing) instead of a single file
-        if isinstance(file_info, list):
-            return f"file_path: '{file_path}' returned multiple files '{file_info}'. Please specify a single file path."
+    # Apply the diff on top of the changes staged earlier in this run
+    original_text = get_staged_file_content(file_path=file_path, base_args=base_args)
+    if original_text is None:
+        content = fetch_file(file_path=file_path, ref=new_branch, base_args=base_args)
 
         # Return if the file_path is a directory. See Example2 at https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28
-        if file_info.get("type") == "dir":
+        if isinstance(content, list):
             return f"file_path: '{file_path}' is a directory. It should be a file path."
 
-        # Get the original text and SHA of the file
-        s1: str = file_info.get("content", "")
-        # content is base64 encoded by default in GitHub API
-        original_text = base64.b64decode(s=s1).decode(encoding=UTF8, errors="replace")
-        sha: str = file_info.get("sha", "")
+        # If 404 error, the file doesn't exist
+        original_text = "" if content is None else content.decode(encoding=UTF8, errors="replace")
 
-    # Create a new commit
+    # Stage the change
     modified_text, rej_text = apply_patch(original_text=original_text, diff_text=diff)
     if modified_text == "":
         return f"diff format is incorrect. No changes were made to the file: {file_path}. Review the diff, correct it, and try again.\n\n{diff=}"
     if modified_text != "" and rej_text != "":
         return f"diff partially applied to the file: {file_path}. But, some changes were rejected. Review rejected changes, modify the diff, and try again.\n\n{diff=}\n\n{rej_text=}"
-    s2 = modified_text.encode(encoding=UTF8)
-    data: dict[str, str | None] = {
-        "message": message,
-        "content": base64.b64encode(s=s2).decode(encoding=UTF8),
-        "branch": new_branch,
-    }
-    if sha != "":
-        data["sha"] = sha
-    put_response = requests.put(
-        url=url,
-        json=data,
-        headers=create_headers(token=token),
-        timeout=TIMEOUT,
+    stage_file_change(
+        file_path=file_path, content=modified_text, base_args=base_args, message=message
     )
-    put_response.raise_for_status()
     return f"diff applied to the file: {file_path} successfully by {commit_changes_to_remote_branch.__name__}()."
 
 
@@ -219,7 +322,8 @@ def commit_changes_to_remote_branch(
 def create_comment(issue_number: int, body: str, base_args: BaseArgs) -> str:
     """https://docs.github.com/en/rest/issues/comments?apiVersion=2022-11-28#create-an-issue-comment"""
     owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
         headers=create_headers(token=token),
         json={"body": body},
@@ -288,7 +392,8 @@ def create_comment_on_issue_with_gitauto_button(payload: GitHubLabeledPayload) -
             user_id=user_id, installation_id=installation_id
         )
 
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner_name}/{repo_name}/issues/{issue_number}/comments",
         headers=create_headers(token=token),
         json={"body": body},
@@ -321,7 +426,8 @@ def create_pull_request(body: str, title: str, base_args: BaseArgs) -> str | Non
         base_args["new_branch"],
         base_args["token"],
     )
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls",
         headers=create_headers(token=token),
         json={"title": title, "body": body, "head": head, "base": base},
@@ -349,7 +455,8 @@ def create_remote_branch(sha: str, base_args: BaseArgs) -> None:
         base_args["new_branch"],
         base_args["token"],
     )
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs",
         headers=create_headers(token=token),
         json={"ref": f"refs/heads/{branch_name}", "sha": sha},
@@ -376,48 +483,38 @@ def initialize_repo(repo_path: str, remote_url: str) -> None:
 def get_installation_access_token(installation_id: int) -> str | None:
     """https://docs.github.com/en/rest/apps/apps?apiVersion=2022-11-28#create-an-installation-access-token-for-an-app"""
     jwt_token: str = create_jwt()
-    response: requests.Response = requests.post(
+    response: requests.Response = github_request(
+        method="POST",
         url=f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens",
         headers=create_headers(token=jwt_token),
         timeout=TIMEOUT,
     )
     response.raise_for_status()
-    return response.json()["token"]
+    token: str = response.json()["token"]
+    rate_limit_governor.register_token(token=token, installation_id=installation_id)
+    return token
 
 
 @handle_exceptions(default_return_value=[], raise_on_error=False)
-def get_installed_owners_and_repos(token: str) -> list[dict[str, int | str]]:
+def get_installed_owners_and_repos(
+    token: str, installation_id: int | None = None
+) -> list[dict[str, int | str]]:
     """https://docs.github.com/en/rest/apps/installations?apiVersion=2022-11-28#list-repositories-accessible-to-the-app-installation"""
-    owners_repos = []
-    page = 1
-    while True:
-        response: requests.Response = requests.get(
-            url=f"{GITHUB_API_URL}/installation/repositories",
-            headers=create_headers(token=token),
-            params={"per_page": 100, "page": page},
-            timeout=TIMEOUT,
-        )
-        response.raise_for_status()
-        repos = response.json().get("repositories", [])
-
-        # If there are no more repositories, break the loop. Otherwise, add them to the list
-        if not repos:
-            break
-        items: list[dict[str, int | str]] = [
-            {
-                "owner_id": repo["owner"]["id"],
-                "owner": repo["owner"]["login"],
-                "repo": repo["name"],
-            }
-            for repo in repos
-        ]
-        owners_repos.extend(items)
-
-        # https://docs.github.com/en/rest/using-the-rest-api/using-pagination-in-the-rest-api?apiVersion=2022-11-28
-        print("response.links:", json.dumps(response.links, indent=2))
-        if "next" not in response.links:
-            break
-        page += 1
+    # The same URL returns different repositories for each installation
+    repos = get_all_pages(
+        url=f"{GITHUB_API_URL}/installation/repositories",
+        headers=create_headers(token=token),
+        key="repositories",
+        scope=f"installation/{installation_id}",
+    )
+    owners_repos: list[dict[str, int | str]] = [
+        {
+            "owner_id": repo["owner"]["id"],
+            "owner": repo["owner"]["login"],
+            "repo": repo["name"],
+        }
+        for repo in repos
+    ]
     return owners_repos
 
 
@@ -427,13 +524,10 @@ def get_issue_comments(
 ) -> list[str]:
     """https://docs.github.com/en/rest/issues/comments#list-issue-comments"""
     owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
-    response = requests.get(
+    comments: list[dict[str, Any]] = get_all_pages(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues/{issue_number}/comments",
         headers=create_headers(token=token),
-        timeout=TIMEOUT,
     )
-    response.raise_for_status()
-    comments: list[dict[str, Any]] = response.json()
     if not includes_me:
         filtered_comments: list[dict[str, Any]] = [
             comment
@@ -458,7 +552,7 @@ def get_latest_remote_commit_sha(clone_url: str, base_args: BaseArgs) -> str:
     )
     token = base_args["token"]
     try:
-        response: requests.Response = requests.get(
+        response: requests.Response = get_with_etag(
             url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{branch}",
             headers=create_headers(token=token),
             timeout=TIMEOUT,
@@ -492,46 +586,39 @@ def get_oldest_unassigned_open_issue(
     owner: str, repo: str, token: str
 ) -> IssueInfo | None:
     """Get an oldest unassigned open issue without "gitauto" label in a repository. https://docs.github.com/en/rest/issues/issues?apiVersion=2022-11-28#list-repository-issues"""
-    page = 1
-    while True:
-        response: requests.Response = requests.get(
-            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues",
-            headers=create_headers(token=token),
-            params={
-                "assignee": "none",  # none, *, or username
-                "direction": "asc",  # asc or desc
-                "page": page,
-                "per_page": 100,
-                "sort": "created",  # created, updated, comments
-                "state": "open",  # open, closed, or all
-            },
-            timeout=TIMEOUT,
-        )
-
+    pages = iter_pages(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/issues",
+        headers=create_headers(token=token),
+        params={
+            "assignee": "none",  # none, *, or username
+            "direction": "asc",  # asc or desc
+            "sort": "created",  # created, updated, comments
+            "state": "open",  # open, closed, or all
+        },
+        max_workers=2,  # The first page usually has one, so don't fetch far ahead
+    )
+    try:
+        for issues in pages:
+            # Find the first issue without the PRODUCT_ID label. If all of them have the label, continue to the next page
+            for issue in issues:
+                if all(label["name"] != PRODUCT_ID for label in issue["labels"]):
+                    return issue
+    except requests.exceptions.HTTPError as err:
         # Return None if repository access is blocked (403 TOS error)
-        if response.status_code == 403 and "Repository access blocked" in response.text:
-            return None
-
-        response.raise_for_status()
-        issues: list[IssueInfo] = response.json()
-
-        # If there are no corresponding issues, return None
-        if not issues:
+        if err.response.status_code == 403 and "Repository access blocked" in err.response.text:
             return None
+        raise
+    finally:
+        pages.close()
 
-        # Find the first issue without the PRODUCT_ID label
-        for issue in issues:
-            if all(label["name"] != PRODUCT_ID for label in issue["labels"]):
-                return issue
-
-        # If there are open issues, but all of them have the PRODUCT_ID label, continue to the next page
-        page += 1
+    # If there are no corresponding issues, return None
+    return None
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def get_owner_name(owner_id: int, token: str) -> str | None:
     """https://docs.github.com/en/rest/users/users?apiVersion=2022-11-28#get-a-user-using-their-id"""
-    response: requests.Response = requests.get(
+    response: requests.Response = get_with_etag(
         url=f"{GITHUB_API_URL}/user/{owner_id}",
         headers=create_headers(token=token),
         timeout=TIMEOUT,
@@ -546,6 +633,7 @@ def get_remote_file_content(
     base_args: BaseArgs,
     line_number: Optional[int] = None,
     keyword: Optional[str] = None,
+    full_content: bool = False,
 ) -> str:
     """
     https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28
@@ -554,76 +642,123 @@ def get_remote_file_content(
     - file_path: file path or directory path. Ex) 'src/main.py' or 'src'
     - line_number: specific line number to focus on
     - keyword: keyword to search in the file content
+    - full_content: show a lockfile, minified, or generated file in full instead of its summary
     """
     if line_number is not None and keyword is not None:
         return "Error: You can only specify either line_number or keyword, not both."
 
-    owner, repo, ref, token = (
-        base_args["owner"],
-        base_args["repo"],
-        base_args["new_branch"],
-        base_args["token"],
-    )
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
-    headers: dict[str, str] = create_headers(token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
+    owner, repo, ref = base_args["owner"], base_args["repo"], base_args["new_branch"]
 
-    # If 404 error, return early. Otherwise, raise a HTTPError
-    if response.status_code == 404:
-        return f"{get_remote_file_content.__name__} encountered an HTTPError: 404 Client Error: Not Found for url: {url}. Check the file path, correct it, and try again."
-    response.raise_for_status()
+    # Changes staged in this run are not committed to the remote branch yet
+    decoded_content = get_staged_file_content(file_path=file_path, base_args=base_args)
+    if decoded_content is None:
+        # Resolve the ref once for both the file and .gitattributes
+        index = get_tree_index(ref=ref, base_args=base_args)
+        content = fetch_file(
+            file_path=file_path, ref=ref, base_args=base_args, index=index
+        )
+        if content is None:
+            url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
+            return f"{get_remote_file_content.__name__} encountered an HTTPError: 404 Client Error: Not Found for url: {url}. Check the file path, correct it, and try again."
+
+        # file_path is expected to be a file path, but it can be a directory path due to AI's volatility. See Example2 at https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28
+        if isinstance(content, list):
+            msg = f"Searched directory '{file_path}' and found: {json.dumps(content)}"
+            return msg
+
+        # If content is image, describe the image content in text by vision API
+        if file_path.endswith(IMAGE_EXTENSIONS):
+            msg = f"Opened image file: '{file_path}' and described the content.\n\n"
+            base64_image = base64.b64encode(s=content).decode(encoding=UTF8)
+            return msg + describe_image(base64_image=base64_image)
+
+        # Binary files can't be decoded, and lockfiles, minified or generated files are only shown in part unless specific lines are asked for
+        gitattributes = get_gitattributes(index=index, base_args=base_args)
+        content_class = classify_content(
+            file_path=file_path, content=content, gitattributes=gitattributes
+        )
+        if content_class.kind == "binary":
+            return summarize_content(
+                file_path=file_path, content=content, content_class=content_class
+            )
+        if (
+            not content_class.is_text
+            and not full_content
+            and line_number is None
+            and keyword is None
+        ):
+            msg = summarize_content(
+                file_path=file_path, content=content, content_class=content_class
+            )
+            return f"{msg}\n\nTo view the full file anyway, call get_remote_file_content() again with full_content set to true, or view specific lines with line_number or keyword."
 
-    # file_path is expected to be a file path, but it can be a directory path due to AI's volatility. See Example2 at https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28
-    res_json = response.json()
-    if not isinstance(res_json, dict):
-        file_paths: list[str] = [item["path"] for item in res_json]
-        msg = f"Searched directory '{file_path}' and found: {json.dumps(file_paths)}"
-        return msg
-
-    encoded_content: str = res_json["content"]  # Base64 encoded content
-
-    # If encoded_content is image, describe the image content in text by vision API
-    if file_path.endswith((".png", ".jpeg", ".jpg", ".webp", ".gif")):
-        msg = f"Opened image file: '{file_path}' and described the content.\n\n"
-        return msg + describe_image(base64_image=encoded_content)
-
-    # Otherwise, decode the content
-    decoded_content: str = base64.b64decode(s=encoded_content).decode(encoding=UTF8)
-    lb: str = detect_line_break(text=decoded_content)
-    lines = decoded_content.split(lb)
-    numbered_lines = [f"{i + 1}: {line}" for i, line in enumerate(lines)]
+        # Otherwise, decode the content
+        decoded_content = content.decode(encoding=UTF8, errors="replace")
+    view = get_file_view(text=decoded_content)
     file_path_with_lines = file_path
 
     # If line_number is specified, show the lines around the line_number
     buffer = 10
     if line_number is not None:
         start = max(line_number - buffer, 0)
-        end = min(line_number + buffer, len(lines))
-        numbered_lines = numbered_lines[start : end + 1]  # noqa: E203
+        end = min(line_number + buffer, view.line_count - 1)
+        numbered_content = view.render(start=start, end=end)
         file_path_with_lines = f"{file_path}#L{start + 1}-L{end + 1}"
 
-    # If keyword is specified, show the lines containing the keyword
+    # If keyword is specified, show the lines containing the keyword. Overlapping windows are merged so that each line is shown once.
     elif keyword is not None:
+        spans = view.get_windows(lines=view.find_lines(keyword=keyword), buffer=buffer)
+        if not spans:
+            return f"Keyword '{keyword}' not found in the file '{file_path}'."
         segments = []
-        for i, line in enumerate(lines):
-            if keyword not in line:
-                continue
-            start = max(i - buffer, 0)
-            end = min(i + buffer, len(lines))
-            segment = lb.join(numbered_lines[start : end + 1])  # noqa: E203
+        size = 0
+        for start, end in spans:
+            segment = view.render(start=start, end=end)
+            size += len(segment)
+            if size > MAX_VIEW_CHARS:
+                segments.append(
+                    f"... ({len(spans) - len(segments)} more occurrences. Narrow down the keyword)"
+                )
+                break
             file_path_with_lines = f"{file_path}#L{start + 1}-L{end + 1}"
             segments.append(f"```{file_path_with_lines}\n" + segment + "\n```")
-
-        if not segments:
-            return f"Keyword '{keyword}' not found in the file '{file_path}'."
         msg = f"Opened file: '{file_path}' and found multiple occurrences of '{keyword}'.\n\n"
         return msg + "\n\n•\n•\n•\n\n".join(segments)
 
-    numbered_content: str = lb.join(numbered_lines)
+    else:
+        numbered_content = view.render()
     msg = f"Opened file: '{file_path}' with line numbers for your information.\n\n"
     return msg + f"```{file_path_with_lines}\n{numbered_content}\n```"
 
 
+@handle_exceptions(default_return_value="", raise_on_error=False)
+def get_remote_file_outline(file_path: str, base_args: BaseArgs) -> str:
+    """Return the classes, functions and methods in the file with their line ranges instead of the whole file, so that the agent can open only the part it needs with line_number or keyword."""
+    ref = base_args["new_branch"]
+    decoded_content = get_staged_file_content(file_path=file_path, base_args=base_args)
+    if decoded_content is None:
+        content = fetch_file(file_path=file_path, ref=ref, base_args=base_args)
+        if content is None:
+            return f"File '{file_path}' not found at '{ref}'. Check the file path, correct it, and try again."
+        if isinstance(content, list):
+            return f"Searched directory '{file_path}' and found: {json.dumps(content)}"
+        content_class = classify_content(file_path=file_path, content=content)
+        if content_class.kind == "binary":
+            return summarize_content(
+                file_path=file_path, content=content, content_class=content_class
+            )
+        decoded_content = content.decode(encoding=UTF8, errors="replace")
+
+    line_count = get_file_view(text=decoded_content).line_count
+    symbols = get_outline(file_path=file_path, text=decoded_content)
+    if symbols is None:
+        return f"Outline is not supported for '{file_path}' ({line_count} lines). Open it with get_remote_file_content() instead."
+    if not symbols:
+        return f"No classes or functions found in '{file_path}' ({line_count} lines)."
+    msg = f"Outline of '{file_path}' ({line_count} lines, {len(symbols)} symbols). Open a symbol with get_remote_file_content() and its line_number.\n\n"
+    return msg + f"```\n{render_outline(symbols=symbols)}\n```"
+
+
 @handle_exceptions(default_return_value="", raise_on_error=False)
 def get_remote_file_content_by_url(url: str, token: str) -> str:
     """https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28"""
@@ -635,27 +770,25 @@ def get_remote_file_content_by_url(url: str, token: str) -> str:
         parts["file_path"],
     )
     start, end = parts["start_line"], parts["end_line"]
-    url: str = f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}?ref={ref}"
-    headers: dict[str, str] = create_headers(token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
-    response.raise_for_status()
-    response_json = response.json()
-    encoded_content: str = response_json["content"]  # Base64 encoded content
-    decoded_content: str = base64.b64decode(s=encoded_content).decode(encoding=UTF8)
-    numbered_lines = [
-        f"{i + 1}: {line}" for i, line in enumerate(decoded_content.split("\n"))
-    ]
 
+    # Reuse the cached blob if the tree of the ref (usually a commit SHA in permalinks) is already indexed, but don't fetch the tree just for one file
+    base_args: BaseArgs = {"owner": owner, "repo": repo, "token": token}
+    content = fetch_file(
+        file_path=file_path, ref=ref, base_args=base_args, fetch_tree=False
+    )
+    if not isinstance(content, bytes):
+        raise ValueError(f"'{file_path}' is not a file at '{ref}' in {owner}/{repo}")
+    view = get_file_view(text=content.decode(encoding=UTF8))
     if start is not None and end is not None:
-        numbered_lines = numbered_lines[start - 1 : end]  # noqa: E203
+        numbered_content = view.render(start=start - 1, end=end - 1)
         file_path_with_lines = f"{file_path}#L{start}-L{end}"
     elif start is not None:
-        numbered_lines = numbered_lines[start - 1]  # noqa: E203
+        numbered_content = view.render(start=start - 1, end=start - 1)
         file_path_with_lines = f"{file_path}#L{start}"
     else:
+        numbered_content = view.render()
         file_path_with_lines = file_path
 
-    numbered_content: str = "\n".join(numbered_lines)
     return f"## {file_path_with_lines}\n\n{numbered_content}"
 
 
@@ -666,7 +799,7 @@ def get_remote_file_tree(base_args: BaseArgs) -> list[str]:
     https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
     """
     owner, repo, ref = base_args["owner"], base_args["repo"], base_args["base_branch"]
-    response = requests.get(
+    response = get_with_etag(
         url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{ref}",
         headers=create_headers(token=base_args["token"]),
         # params={"recursive": 1},  # 0, 1, "true", or "false" are all True!! Just remove it to disable recursion.
@@ -702,7 +835,9 @@ def search_remote_file_contents(query: str, base_args: BaseArgs) -> str:
     url = f"{GITHUB_API_URL}/search/code"
     headers: dict[str, str] = create_headers(token=token)
     headers["Accept"] = "application/vnd.github.text-match+json"
-    response = requests.get(url=url, headers=headers, params=params, timeout=TIMEOUT)
+    response = github_request(
+        method="GET", url=url, headers=headers, params=params, timeout=TIMEOUT
+    )
     response.raise_for_status()
     response_json = response.json()
     files = []
@@ -725,10 +860,19 @@ def turn_on_issue(full_name: str, token: str) -> None:
 
     [UPDATED] This requires "Administration" permission and it is too strong and not recommended as the permission allows the app to delete the repository. So, we will not use this function. Also we don't turn on the permission so we can't use this function as well.
     """
-    gh = Github(login_or_token=token)
-    repo: Repository = gh.get_repo(full_name_or_id=full_name)
-    if not repo.has_issues:
-        repo.edit(has_issues=True)
+    url = f"{GITHUB_API_URL}/repos/{full_name}"
+    headers = create_headers(token=token)
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    if not response.json()["has_issues"]:
+        response = github_request(
+            method="PATCH",
+            url=url,
+            headers=headers,
+            json={"has_issues": True},
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
 
 
 @handle_exceptions(raise_on_error=True)
@@ -752,20 +896,18 @@ async def verify_webhook_signature(request: Request, secret: str) -> None:
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def update_comment(
     body: str, base_args: BaseArgs, p: int | None = None
-) -> dict[str, Any]:
-    """https://docs.github.com/en/rest/issues/comments#update-an-issue-comment"""
+) -> dict[str, Any] | None:
+    """With p, the progress update is coalesced and sent in the background, so None is returned. Without p, the body is a terminal state and is sent right away, superseding any pending progress update.
+    https://docs.github.com/en/rest/issues/comments#update-an-issue-comment"""
     comment_url, token = base_args["comment_url"], base_args["token"]
-    if p is not None:
-        body = create_progress_bar(p=p, msg=body)
+    if p is None:
+        print(body + "\n")
+        return finish_progress_updater(comment_url=comment_url, token=token, body=body)
+
+    body = create_progress_bar(p=p, msg=body)
     print(body + "\n")
-    response: requests.Response = requests.patch(
-        url=comment_url,
-        headers=create_headers(token=token),
-        json={"body": body},
-        timeout=TIMEOUT,
-    )
-    response.raise_for_status()
-    return response.json()
+    get_progress_updater(comment_url=comment_url, token=token).update(body=body)
+    return None
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -776,7 +918,7 @@ def get_user_public_email(username: str, token: str) -> str | None:
         return None
 
     # If the user is not a bot, get the user's email
-    response: requests.Response = requests.get(
+    response: requests.Response = get_with_etag(
         url=f"{GITHUB_API_URL}/users/{username}",
         headers=create_headers(token=token),
         timeout=TIMEOUT,
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import TypedDict, Dict, List, Optional, Union
+from typing import NotRequired, TypedDict, Dict, List, Optional, Union
 import datetime
 
 
@@ -12,6 +12,7 @@ class BaseArgs(TypedDict):
     comment_url: str
     pr_body: str
     token: str
+    staged_changes: NotRequired[Dict[str, Dict[str, str]]]  # Set by stage_file_change()
 
 
 @dataclass
@@ -0,0 +1,94 @@
+# Standard imports
+import hashlib
+import json
+from typing import Any
+from urllib.parse import urlencode
+
+# Third-party imports
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Local imports
+from config import TIMEOUT, UTF8
+from services.github.rate_limiter import rate_limit_governor
+from utils.lru_cache import SizedLRUCache
+
+MAX_RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+# Responses are kept only in memory because they can contain private repository data
+response_cache = SizedLRUCache(max_bytes=MAX_RESPONSE_CACHE_BYTES)
+
+
+def create_cache_key(
+    url: str, headers: dict[str, str], params: dict[str, Any] | None, scope: str
+) -> str:
+    query = urlencode(sorted((params or {}).items()))
+    key = f"{scope}|{headers.get('Accept', '')}|{url}?{query}"
+    return hashlib.sha256(key.encode(encoding=UTF8)).hexdigest()
+
+
+def create_response_from_cache(cached: bytes, response: requests.Response):
+    """Rebuild a 200 response from the cached body for a 304 response. Fresh headers such as X-RateLimit-* come from the 304 response."""
+    meta_json, content = cached.split(b"\n", 1)
+    meta: dict[str, Any] = json.loads(meta_json)
+    cached_response = requests.Response()
+    cached_response.status_code = 200
+    cached_response.reason = "OK"
+    cached_response.url = response.url
+    cached_response.request = response.request
+    cached_response.encoding = meta["encoding"]
+    cached_response.headers = CaseInsensitiveDict(meta["headers"])
+    cached_response.headers.update(response.headers)
+    cached_response._content = content  # pylint: disable=protected-access
+    return cached_response
+
+
+def github_request(
+    method: str, url: str, headers: dict[str, str], **kwargs: Any
+) -> requests.Response:
+    """Send a request to GitHub through the rate limit governor, which paces the request before it is sent and learns the remaining limits from the response headers. The timeout defaults to TIMEOUT so that a forgotten one can't hang until the Lambda timeout."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    rate_limit_governor.before_request(method=method, url=url, headers=headers)
+    response = requests.request(method=method, url=url, headers=headers, **kwargs)
+    rate_limit_governor.after_response(response=response)
+    return response
+
+
+def get_with_etag(
+    url: str,
+    headers: dict[str, str],
+    params: dict[str, Any] | None = None,
+    scope: str = "",
+    timeout: int = TIMEOUT,
+) -> requests.Response:
+    """GET with If-None-Match using the ETag of the previous response to the same URL. A 304 Not Modified response doesn't count against the primary rate limit, and the cached body is returned as a 200 response so that callers don't need to care.
+
+    GitHub revalidates the ETag with the token of each request, so a cached body is never returned to a token that can't read it. "scope" only needs to be set when the same URL returns different contents for different tokens (e.g. "/installation/repositories") so that their entries don't overwrite each other.
+    https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api?apiVersion=2022-11-28#use-conditional-requests-if-appropriate
+    """
+    key = create_cache_key(url=url, headers=headers, params=params, scope=scope)
+    cached = response_cache.get(key=key)
+    request_headers = dict(headers)
+    if cached is not None:
+        meta: dict[str, Any] = json.loads(cached.split(b"\n", 1)[0])
+        request_headers["If-None-Match"] = meta["headers"]["ETag"]
+
+    response = github_request(
+        method="GET", url=url, headers=request_headers, params=params, timeout=timeout
+    )
+    if response.status_code == 304 and cached is not None:
+        return create_response_from_cache(cached=cached, response=response)
+
+    if response.status_code == 200 and "ETag" in response.headers:
+        meta = {
+            "encoding": response.encoding,
+            "headers": {
+                name: response.headers[name]
+                for name in CACHED_HEADERS
+                if name in response.headers
+            },
+        }
+        meta_json = json.dumps(meta).encode(encoding=UTF8)
+        response_cache.set(key=key, value=meta_json + b"\n" + response.content)
+    return response
@@ -0,0 +1,36 @@
+# Standard imports
+import json
+import os
+
+# Local imports
+from config import CACHE_DIR, UTF8
+from utils.handle_exceptions import handle_exceptions
+from utils.lru_cache import SizedLRUCache
+
+# Tree, symbol, and lexical indexes of a whole repository are kept on disk per tree SHA under one budget, next to the blob cache, so that together they leave room in Lambda's 512 MB /tmp. The indexes keep their own small caches in memory, so this one only uses the disk.
+MAX_INDEX_DISK_CACHE_BYTES = 128 * 1024 * 1024
+index_cache = SizedLRUCache(
+    max_bytes=0,
+    disk_dir=os.path.join(CACHE_DIR, "indexes"),
+    max_disk_bytes=MAX_INDEX_DISK_CACHE_BYTES,
+)
+
+
+def get_index_key(kind: str, tree_sha: str) -> str:
+    return f"{kind}-{tree_sha}.json"
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def read_index(kind: str, tree_sha: str) -> dict | None:
+    """Return the serialized index of the kind (e.g. "tree") for the tree or None if it is not on disk."""
+    value = index_cache.get(key=get_index_key(kind=kind, tree_sha=tree_sha))
+    if value is None:
+        return None
+    return json.loads(value.decode(encoding=UTF8))
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def write_index(kind: str, tree_sha: str, data: dict) -> None:
+    """Store the serialized index, evicting the least recently used indexes of any kind beyond the budget. An index larger than the whole budget is not stored."""
+    value = json.dumps(data, separators=(",", ":")).encode(encoding=UTF8)
+    index_cache.set(key=get_index_key(kind=kind, tree_sha=tree_sha), value=value)
@@ -0,0 +1,264 @@
+# Standard imports
+import math
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Local imports
+from config import UTF8
+from services.github.file_fetcher import fetch_file
+from services.github.github_types import BaseArgs
+from services.github.index_cache import read_index, write_index
+from services.github.tarball import download_text_files, is_within_budget
+from services.github.tree_index import get_tree_index, resolve_commit_sha
+from utils.file_view import get_file_view
+from utils.handle_exceptions import handle_exceptions
+
+MAX_LEXICAL_INDEXES_IN_MEMORY = 4
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A term in the path says more about a file than a term in its content
+PATH_TERM_WEIGHT = 5
+# A term frequency is packed with the document index into one integer as (document index << TF_BITS) | tf
+TF_BITS = 16
+MAX_TF = (1 << TF_BITS) - 1
+TOP_K_FILES = 5
+# Seconds the handler waits for the ranking before the agent starts without it
+RELEVANT_FILES_TIMEOUT = 60
+SNIPPETS_PER_FILE = 2
+SNIPPET_BUFFER = 3
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBWORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does",
+    "for", "from", "has", "have", "how", "if", "in", "into", "is", "it", "its",
+    "not", "of", "on", "or", "should", "so", "that", "the", "their", "then",
+    "there", "this", "to", "was", "we", "when", "which", "will", "with", "would",
+    "you",
+}  # fmt: skip
+
+
+def tokenize(text: str) -> list[str]:
+    """Split the text into lowercase terms. An identifier is kept whole and also split into its camelCase and snake_case words, so that 'getUserName' matches both 'getusername' and 'user'."""
+    terms: list[str] = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        whole = identifier.lower()
+        if len(whole) > 1 and whole not in STOPWORDS:
+            terms.append(whole)
+        words = SUBWORD_PATTERN.findall(identifier)
+        if len(words) > 1:
+            terms.extend(
+                word.lower()
+                for word in words
+                if len(word) > 1 and word.lower() not in STOPWORDS
+            )
+    return terms
+
+
+class LexicalIndex:
+    """BM25 index over the paths and contents of the text files in a tree. Postings map a term to packed (document index, term frequency) integers in an array."""
+
+    def __init__(
+        self,
+        tree_sha: str,
+        paths: list[str],
+        lengths: list[int],
+        postings: dict[str, array],
+    ) -> None:
+        self.tree_sha = tree_sha
+        self.paths = paths
+        self.lengths = lengths
+        self.postings = postings
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def from_files(cls, tree_sha: str, files: dict[str, str]) -> "LexicalIndex":
+        paths = sorted(files)
+        lengths: list[int] = []
+        postings: dict[str, array] = {}
+        for i, path in enumerate(paths):
+            counts = Counter(tokenize(text=files[path]))
+            for term in tokenize(text=path):
+                counts[term] += PATH_TERM_WEIGHT
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                if term not in postings:
+                    postings[term] = array("Q")
+                postings[term].append((i << TF_BITS) | min(tf, MAX_TF))
+        return cls(tree_sha=tree_sha, paths=paths, lengths=lengths, postings=postings)
+
+    def to_dict(self) -> dict:
+        return {
+            "tree_sha": self.tree_sha,
+            "paths": self.paths,
+            "lengths": self.lengths,
+            "postings": {k: v.tolist() for k, v in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LexicalIndex":
+        return cls(
+            tree_sha=data["tree_sha"],
+            paths=data["paths"],
+            lengths=data["lengths"],
+            postings={k: array("Q", v) for k, v in data["postings"].items()},
+        )
+
+    def search(self, query: str, k: int = TOP_K_FILES) -> list[tuple[str, float]]:
+        """Return the top k paths by BM25 score for the terms in the query. Each distinct query term counts once, so a long issue body doesn't favor the words it repeats.
+        https://en.wikipedia.org/wiki/Okapi_BM25"""
+        n = len(self.paths)
+        scores: dict[int, float] = {}
+        mask = (1 << TF_BITS) - 1
+        for term in set(tokenize(text=query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for packed in posting:
+                i, tf = packed >> TF_BITS, packed & mask
+                norm = 1 - BM25_B + BM25_B * self.lengths[i] / self.average_length
+                score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                scores[i] = scores.get(i, 0.0) + score
+        top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.paths[i], score) for i, score in top]
+
+
+# Lexical indexes are immutable once built, so they are shared across runs in a warm container and on disk like tree indexes
+lexical_indexes: OrderedDict[str, LexicalIndex] = OrderedDict()
+lexical_indexes_lock = threading.Lock()
+build_locks: dict[str, threading.Lock] = {}  # One build per tree at a time
+
+
+def remember_lexical_index(index: LexicalIndex) -> None:
+    with lexical_indexes_lock:
+        lexical_indexes[index.tree_sha] = index
+        lexical_indexes.move_to_end(index.tree_sha)
+        while len(lexical_indexes) > MAX_LEXICAL_INDEXES_IN_MEMORY:
+            lexical_indexes.popitem(last=False)
+
+
+def get_remembered_lexical_index(tree_sha: str) -> LexicalIndex | None:
+    with lexical_indexes_lock:
+        index = lexical_indexes.get(tree_sha)
+        if index is not None:
+            lexical_indexes.move_to_end(tree_sha)
+        return index
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def read_lexical_index_from_disk(tree_sha: str) -> LexicalIndex | None:
+    data = read_index(kind="lexical", tree_sha=tree_sha)
+    return None if data is None else LexicalIndex.from_dict(data=data)
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def write_lexical_index_to_disk(index: LexicalIndex) -> None:
+    write_index(kind="lexical", tree_sha=index.tree_sha, data=index.to_dict())
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_lexical_index(
+    ref: str,
+    base_args: BaseArgs,
+    cancel: threading.Event | None = None,
+    built_files: dict[str, str] | None = None,
+) -> LexicalIndex | None:
+    """Get the lexical index of a branch name or a commit SHA from memory, disk, or by downloading the tree in this order, keyed by the tree SHA. The download stops once the cancel event is set. If the index is built here, the downloaded files are put in built_files, so that the caller can read them without another request."""
+    commit_sha = resolve_commit_sha(ref=ref, base_args=base_args)
+    if commit_sha is None:
+        return None
+    index = get_tree_index(ref=commit_sha, base_args=base_args)
+    if index is None:
+        return None
+    tree_sha = index.tree_sha
+
+    with lexical_indexes_lock:
+        build_lock = build_locks.setdefault(tree_sha, threading.Lock())
+    try:
+        with build_lock:
+            lexical_index = get_remembered_lexical_index(tree_sha=tree_sha)
+            if lexical_index is not None:
+                return lexical_index
+            lexical_index = read_lexical_index_from_disk(tree_sha=tree_sha)
+            if lexical_index is None:
+                if not is_within_budget(index=index, is_wanted=lambda _: True):
+                    print(
+                        f"Skipped the lexical index of the tree {tree_sha}, too large"
+                    )
+                    return None
+                files = download_text_files(
+                    commit_sha=commit_sha,
+                    base_args=base_args,
+                    is_wanted=lambda _: True,
+                    cancel=cancel,
+                )
+                lexical_index = LexicalIndex.from_files(tree_sha=tree_sha, files=files)
+                if built_files is not None:
+                    built_files.update(files)
+                write_lexical_index_to_disk(index=lexical_index)
+            remember_lexical_index(index=lexical_index)
+        return lexical_index
+    finally:
+        # Drop the lock once no build is running so that a warm container does not keep one per tree
+        with lexical_indexes_lock:
+            if build_locks.get(tree_sha) is build_lock and not build_lock.locked():
+                del build_locks[tree_sha]
+
+
+def get_snippets(text: str, query_terms: set[str]) -> list[str]:
+    """Render the lines that contain the most query terms with a few lines around them."""
+    view = get_file_view(text=text)
+    hits = [
+        (len(query_terms.intersection(tokenize(text=view.get_line(i)))), i)
+        for i in range(view.line_count)
+    ]
+    best = [i for count, i in sorted(hits, key=lambda h: (-h[0], h[1])) if count][
+        :SNIPPETS_PER_FILE
+    ]
+    return [
+        view.render(start=start, end=end)
+        for start, end in view.get_windows(lines=best, buffer=SNIPPET_BUFFER)
+    ]
+
+
+@handle_exceptions(default_return_value="", raise_on_error=False)
+def find_relevant_files(
+    query: str, ref: str, base_args: BaseArgs, cancel: threading.Event | None = None
+) -> str:
+    """Rank the files of the ref against the query (e.g. the issue title and body) with BM25 and show the top files with their best matching lines, so that the agent can start from them instead of exploring the repository from the root. Set the cancel event to stop building the index when the result is no longer awaited."""
+    built_files: dict[str, str] = {}
+    index = get_lexical_index(
+        ref=ref, base_args=base_args, cancel=cancel, built_files=built_files
+    )
+    if index is None or (cancel is not None and cancel.is_set()):
+        return ""
+    top = index.search(query=query)
+    if not top:
+        return ""
+
+    # Files just read from the tarball cost no request. Fetching the others also caches their blobs for when the agent opens them.
+    def get_text(path: str) -> str | None:
+        if path in built_files:
+            return built_files[path]
+        content = fetch_file(file_path=path, ref=ref, base_args=base_args)
+        if not isinstance(content, bytes):
+            return None
+        return content.decode(encoding=UTF8, errors="replace")
+
+    with ThreadPoolExecutor(max_workers=TOP_K_FILES) as executor:
+        texts = list(executor.map(lambda item: get_text(path=item[0]), top))
+    query_terms = set(tokenize(text=query))
+    sections: list[str] = []
+    for (path, score), text in zip(top, texts):
+        section = f"## {path} (score {score:.1f})"
+        if text is not None:
+            for snippet in get_snippets(text=text, query_terms=query_terms):
+                section += f"\n```{path}\n{snippet}\n```"
+        sections.append(section)
+    msg = "Files that may be relevant to this issue, ranked by a keyword search over the repository. Start from them if they look relevant, but they may be incomplete or wrong.\n\n"
+    return msg + "\n\n".join(sections)
@@ -1,10 +1,14 @@
-import requests
-from config import GITHUB_API_URL, TIMEOUT, PER_PAGE
+from typing import Iterator, NamedTuple
+from config import GITHUB_API_URL, TIMEOUT
 from services.github.create_headers import create_headers
 from services.github.github_types import BaseArgs
+from services.github.http_client import get_with_etag, github_request
+from services.github.pagination import get_all_pages
 from services.github.user_manager import check_user_is_collaborator
 from utils.handle_exceptions import handle_exceptions
 
+DIFF_HEADER = "diff --git "
+
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
 def add_reviewers(base_args: BaseArgs):
@@ -34,7 +38,9 @@ def add_reviewers(base_args: BaseArgs):
     url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls/{pr_number}/requested_reviewers"
     headers = create_headers(token=token)
     json = {"reviewers": valid_reviewers}
-    response = requests.post(url=url, headers=headers, json=json, timeout=TIMEOUT)
+    response = github_request(
+        method="POST", url=url, headers=headers, json=json, timeout=TIMEOUT
+    )
     response.raise_for_status()
 
 
@@ -42,7 +48,7 @@ def add_reviewers(base_args: BaseArgs):
 def get_pull_request(url: str, token: str):
     """https://docs.github.com/en/rest/pulls/pulls?apiVersion=2022-11-28#get-a-pull-request"""
     headers = create_headers(token=token)
-    res = requests.get(url=url, headers=headers, timeout=TIMEOUT)
+    res = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
     res.raise_for_status()
     res_json = res.json()
     title: str = res_json["title"]
@@ -50,25 +56,76 @@ def get_pull_request(url: str, token: str):
     return title, body
 
 
+class DiffFile(NamedTuple):
+    filename: str
+    status: str
+    patch: str
+
+
+def iter_diff_files(diff: str) -> Iterator[DiffFile]:
+    """Split a unified diff into files lazily, one "diff --git" section at a time. The status and the patch (from the first hunk header) match the "List pull requests files" API. Files without hunks such as binary files are skipped as the API omits their patch."""
+    start = diff.find(DIFF_HEADER)
+    while start != -1:
+        end = diff.find("\n" + DIFF_HEADER, start)
+        section = diff[start:] if end == -1 else diff[start : end + 1]
+        start = -1 if end == -1 else end + 1
+
+        hunk_start = section.find("\n@@")
+        if hunk_start == -1:
+            continue
+        header = section[:hunk_start].splitlines()
+        patch = section[hunk_start + 1 :].rstrip("\n")
+
+        # "diff --git a/old b/new" is ambiguous when paths have spaces, so prefer the explicit lines
+        filename = header[0].split(" b/", 1)[-1]
+        status = "modified"
+        for line in header[1:]:
+            if line.startswith("+++ b/"):
+                filename = line[len("+++ b/") :]
+            elif line.startswith("--- a/") and status == "removed":
+                filename = line[len("--- a/") :]
+            elif line.startswith("new file mode"):
+                status = "added"
+            elif line.startswith("deleted file mode"):
+                status = "removed"
+            elif line.startswith("rename to "):
+                filename, status = line[len("rename to ") :], "renamed"
+        yield DiffFile(filename=filename, status=status, patch=patch)
+
+
 @handle_exceptions(default_return_value=None, raise_on_error=False)
-def get_pull_request_files(url: str, token: str):
-    """https://docs.github.com/en/rest/pulls/pulls?apiVersion=2022-11-28#list-pull-requests-files"""
+def get_pull_request_diff(url: str, token: str):
+    """Get the whole PR as a unified diff in one request. Return None if the diff is too large for GitHub to render (406), so that the caller can page through the files instead.
+    https://docs.github.com/en/rest/pulls/pulls?apiVersion=2022-11-28#get-a-pull-request"""
     headers = create_headers(token=token)
-    changes: list[dict[str, str]] = []
-    page = 1
-    while True:
-        params = {"per_page": PER_PAGE, "page": page}
-        response = requests.get(
-            url=url, headers=headers, params=params, timeout=TIMEOUT
-        )
-        response.raise_for_status()
-        files = response.json()
-        if not files:
-            break
-        for file in files:
-            if "patch" not in file:
-                continue
-            filename, status, patch = file["filename"], file["status"], file["patch"]
-            changes.append({"filename": filename, "status": status, "patch": patch})
-        page += 1
+    headers["Accept"] = "application/vnd.github.diff"
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 406:
+        print(f"The diff of {url} is too large, so paging through the files instead")
+        return None
+    response.raise_for_status()
+    return response.text
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_pull_request_files(url: str, token: str):
+    """Get the changed files from the diff of the PR in one request, and page through the files only when the diff is too large.
+    https://docs.github.com/en/rest/pulls/pulls?apiVersion=2022-11-28#list-pull-requests-files"""
+    diff = get_pull_request_diff(url=url.removesuffix("/files"), token=token)
+    if diff is not None:
+        return [file._asdict() for file in iter_diff_files(diff=diff)]
+
+    files = get_all_pages(url=url, headers=create_headers(token=token))
+    changes: list[dict[str, str]] = [
+        {"filename": file["filename"], "status": file["status"], "patch": file["patch"]}
+        for file in files
+        if "patch" in file
+    ]
     return changes
+
+
+def format_pull_request_files(files: list[dict[str, str]]) -> str:
+    """Render the changed files as plain patches under their file names for a prompt. JSON would escape every newline and quote in the patches."""
+    return "\n\n".join(
+        f"{file['filename']} ({file['status']})\n{file['patch']}" for file in files
+    )
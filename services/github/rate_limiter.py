@@ -0,0 +1,159 @@
+# Standard imports
+import hashlib
+import threading
+import time
+
+# Third-party imports
+import requests
+
+# Local imports
+from config import UTF8
+from utils.retry import get_remaining_time
+
+# Primary rate limit for installation tokens is 5,000 requests per hour. https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#primary-rate-limit-for-github-app-installations
+DEFAULT_CORE_LIMIT_PER_HOUR = 5000
+# Secondary rate limits: pause at least 1 second between mutative requests, 80 content-generating requests per minute, and 10 code search requests per minute. https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#about-secondary-rate-limits
+MUTATIVE_REQUESTS_PER_SECOND = 1.0
+MUTATIVE_BURST = 3
+SEARCH_REQUESTS_PER_MINUTE = 30
+CODE_SEARCH_REQUESTS_PER_MINUTE = 10
+MUTATIVE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class RateLimitWaitTooLongError(Exception):
+    """The wait for a rate limit token doesn't fit in the remaining time of the Lambda invocation."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() reserves a token and sleeps until the token is available, so concurrent callers are spaced out instead of failing together."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate  # Tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def acquire(self) -> float:
+        """Raise RateLimitWaitTooLongError without reserving a token if the wait would outlive the invocation (e.g. the primary limit is exhausted until a reset in an hour), so that the caller fails fast instead of being killed by the Lambda timeout."""
+        with self.lock:
+            self.refill()
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            remaining_time = get_remaining_time()
+            if wait > remaining_time:
+                raise RateLimitWaitTooLongError(
+                    f"Rate limit wait of {wait:.0f} seconds exceeds the remaining {remaining_time:.0f} seconds"
+                )
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def sync(self, remaining: int, limit: int, reset_ts: int) -> None:
+        """Sync with X-RateLimit-* headers. Remaining requests become the available tokens, and the bucket refills at the pace that spreads the limit over the rest of the window."""
+        with self.lock:
+            self.refill()
+            seconds_to_reset = max(reset_ts - time.time(), 1.0)
+            self.capacity = max(limit, 1)
+            self.tokens = remaining
+            if remaining == 0:
+                # Nothing is left until the window resets, so the next request waits until then
+                self.rate = 1 / seconds_to_reset
+            else:
+                self.rate = max(remaining / seconds_to_reset, limit / 3600)
+
+
+class RateLimitGovernor:
+    """Paces GitHub requests per installation before they hit rate limits. Primary limits are learned from the X-RateLimit-* headers of every response, and mutative and search requests have their own buckets for secondary limits."""
+
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+        self.installations: dict[str, str] = {}  # Token hash -> installation ID
+        self.lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def register_token(self, token: str, installation_id: int) -> None:
+        """Share buckets among all tokens of the same installation because limits are per installation."""
+        with self.lock:
+            self.installations[hash_token(token=token)] = (
+                f"installation/{installation_id}"
+            )
+
+    def get_scope(self, headers: dict[str, str]) -> str:
+        token = headers.get("Authorization", "").removeprefix("Bearer ")
+        if token.startswith("eyJ"):
+            return "app"  # JWTs are created for each request to authenticate as the app itself
+        token_hash = hash_token(token=token)
+        with self.lock:
+            return self.installations.get(token_hash, f"token/{token_hash}")
+
+    def get_bucket(self, scope: str, resource: str) -> TokenBucket:
+        with self.lock:
+            key = (scope, resource)
+            if key not in self.buckets:
+                if resource == "mutative":
+                    bucket = TokenBucket(
+                        rate=MUTATIVE_REQUESTS_PER_SECOND, capacity=MUTATIVE_BURST
+                    )
+                elif resource == "code_search":
+                    rate = CODE_SEARCH_REQUESTS_PER_MINUTE
+                    bucket = TokenBucket(rate=rate / 60, capacity=rate)
+                elif resource == "search":
+                    rate = SEARCH_REQUESTS_PER_MINUTE
+                    bucket = TokenBucket(rate=rate / 60, capacity=rate)
+                else:
+                    limit = DEFAULT_CORE_LIMIT_PER_HOUR
+                    bucket = TokenBucket(rate=limit / 3600, capacity=limit)
+                self.buckets[key] = bucket
+            return self.buckets[key]
+
+    def before_request(self, method: str, url: str, headers: dict[str, str]) -> None:
+        scope = self.get_scope(headers=headers)
+        resources = [get_resource(url=url)]
+        # GraphQL queries are sent with POST but are not mutative
+        if method.upper() in MUTATIVE_METHODS and resources[0] != "graphql":
+            resources.append("mutative")
+        for resource in resources:
+            wait = self.get_bucket(scope=scope, resource=resource).acquire()
+            if wait > 0:
+                with self.lock:
+                    self.total_wait += wait
+                print(f"Paced a {resource} request for {scope} by {wait:.2f} seconds")
+
+    def after_response(self, response: requests.Response) -> None:
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        scope = self.get_scope(headers=response.request.headers)
+        self.get_bucket(scope=scope, resource=resource).sync(
+            remaining=int(headers["X-RateLimit-Remaining"]),
+            limit=int(headers.get("X-RateLimit-Limit", DEFAULT_CORE_LIMIT_PER_HOUR)),
+            reset_ts=int(headers.get("X-RateLimit-Reset", time.time() + 3600)),
+        )
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode(encoding=UTF8)).hexdigest()[:16]
+
+
+def get_resource(url: str) -> str:
+    """Return the rate limit resource name used in X-RateLimit-Resource. https://docs.github.com/en/rest/rate-limit/rate-limit?apiVersion=2022-11-28"""
+    if "/search/code" in url:
+        return "code_search"
+    if "/search/" in url:
+        return "search"
+    if url.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+# Shared by all handlers in the container
+rate_limit_governor = RateLimitGovernor()
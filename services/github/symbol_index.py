@@ -0,0 +1,223 @@
+# Standard imports
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+# Local imports
+from services.github.github_types import BaseArgs
+from services.github.index_cache import read_index, write_index
+from services.github.tarball import download_text_files, is_within_budget
+from services.github.tree_index import get_tree_index, resolve_commit_sha
+from utils.code_outline import is_outline_supported, parse_outline
+from utils.handle_exceptions import handle_exceptions
+
+MAX_SYMBOL_INDEXES_IN_MEMORY = 4
+MAX_DEFINITION_RESULTS = 50
+MAX_REFERENCE_FILES = 100
+MAX_REFERENCE_LINES_PER_FILE = 20
+# Single letters are left out to keep the index small
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_$][\w$]+")
+# A reference is packed into one integer as (path index << LINE_BITS) | line
+LINE_BITS = 32
+
+
+class SymbolIndex:
+    """Definitions and references of the identifiers in a tree. Definitions map a name to [path index, start line, end line, kind] entries, and references map a name to packed (path index, line) integers in an array, which keeps the index of a large repository in a few tens of MB."""
+
+    def __init__(
+        self,
+        tree_sha: str,
+        paths: list[str],
+        definitions: dict[str, list[list]],
+        references: dict[str, array],
+    ) -> None:
+        self.tree_sha = tree_sha
+        self.paths = paths
+        self.definitions = definitions
+        self.references = references
+
+    @classmethod
+    def from_files(cls, tree_sha: str, files: dict[str, str]) -> "SymbolIndex":
+        paths = sorted(files)
+        definitions: dict[str, list[list]] = {}
+        references: dict[str, array] = {}
+        for i, path in enumerate(paths):
+            text = files[path]
+            for symbol in parse_outline(file_path=path, text=text) or []:
+                name = symbol.name.rsplit(".", 1)[-1]
+                definitions.setdefault(name, []).append(
+                    [i, symbol.start, symbol.end, symbol.kind]
+                )
+            for line_number, line in enumerate(text.splitlines(), start=1):
+                for name in set(IDENTIFIER_PATTERN.findall(line)):
+                    if name not in references:
+                        references[name] = array("Q")
+                    references[name].append((i << LINE_BITS) | line_number)
+        return cls(
+            tree_sha=tree_sha,
+            paths=paths,
+            definitions=definitions,
+            references=references,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "tree_sha": self.tree_sha,
+            "paths": self.paths,
+            "definitions": self.definitions,
+            "references": {k: v.tolist() for k, v in self.references.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SymbolIndex":
+        return cls(
+            tree_sha=data["tree_sha"],
+            paths=data["paths"],
+            definitions=data["definitions"],
+            references={k: array("Q", v) for k, v in data["references"].items()},
+        )
+
+    def find_definitions(self, name: str) -> list[tuple[str, int, int, str]]:
+        return [
+            (self.paths[i], start, end, kind)
+            for i, start, end, kind in self.definitions.get(name, [])
+        ]
+
+    def find_references(self, name: str) -> dict[str, list[int]]:
+        """Return the lines where the name appears, grouped by file in path order."""
+        references: dict[str, list[int]] = {}
+        mask = (1 << LINE_BITS) - 1
+        for packed in self.references.get(name, array("Q")):
+            path = self.paths[packed >> LINE_BITS]
+            references.setdefault(path, []).append(packed & mask)
+        return references
+
+
+# Symbol indexes are immutable once built, so they are shared across runs in a warm container and on disk like tree indexes
+symbol_indexes: OrderedDict[str, SymbolIndex] = OrderedDict()
+symbol_indexes_lock = threading.Lock()
+build_locks: dict[str, threading.Lock] = {}  # One build per tree at a time
+
+
+def remember_symbol_index(index: SymbolIndex) -> None:
+    with symbol_indexes_lock:
+        symbol_indexes[index.tree_sha] = index
+        symbol_indexes.move_to_end(index.tree_sha)
+        while len(symbol_indexes) > MAX_SYMBOL_INDEXES_IN_MEMORY:
+            symbol_indexes.popitem(last=False)
+
+
+def get_remembered_symbol_index(tree_sha: str) -> SymbolIndex | None:
+    with symbol_indexes_lock:
+        index = symbol_indexes.get(tree_sha)
+        if index is not None:
+            symbol_indexes.move_to_end(tree_sha)
+        return index
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def read_symbol_index_from_disk(tree_sha: str) -> SymbolIndex | None:
+    data = read_index(kind="symbol", tree_sha=tree_sha)
+    return None if data is None else SymbolIndex.from_dict(data=data)
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def write_symbol_index_to_disk(index: SymbolIndex) -> None:
+    write_index(kind="symbol", tree_sha=index.tree_sha, data=index.to_dict())
+
+
+def is_source_file(path: str) -> bool:
+    """Keep only the source files that can be outlined."""
+    return is_outline_supported(file_path=path)
+
+
+def download_source_files(commit_sha: str, base_args: BaseArgs) -> dict[str, str]:
+    return download_text_files(
+        commit_sha=commit_sha, base_args=base_args, is_wanted=is_source_file
+    )
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_symbol_index(ref: str, base_args: BaseArgs) -> SymbolIndex | None:
+    """Get the symbol index of a branch name or a commit SHA from memory, disk, or by downloading the tree in this order. It is keyed by the tree SHA, so branches and commits with the same contents share one index."""
+    commit_sha = resolve_commit_sha(ref=ref, base_args=base_args)
+    if commit_sha is None:
+        return None
+    index = get_tree_index(ref=commit_sha, base_args=base_args)
+    if index is None:
+        return None
+    tree_sha = index.tree_sha
+
+    with symbol_indexes_lock:
+        build_lock = build_locks.setdefault(tree_sha, threading.Lock())
+    try:
+        with build_lock:
+            symbol_index = get_remembered_symbol_index(tree_sha=tree_sha)
+            if symbol_index is not None:
+                return symbol_index
+            symbol_index = read_symbol_index_from_disk(tree_sha=tree_sha)
+            if symbol_index is None:
+                if not is_within_budget(index=index, is_wanted=is_source_file):
+                    print(f"Skipped the symbol index of the tree {tree_sha}, too large")
+                    return None
+                files = download_source_files(
+                    commit_sha=commit_sha, base_args=base_args
+                )
+                symbol_index = SymbolIndex.from_files(tree_sha=tree_sha, files=files)
+                write_symbol_index_to_disk(index=symbol_index)
+            remember_symbol_index(index=symbol_index)
+        return symbol_index
+    finally:
+        # Drop the lock once no build is running so that a warm container does not keep one per tree
+        with symbol_indexes_lock:
+            if build_locks.get(tree_sha) is build_lock and not build_lock.locked():
+                del build_locks[tree_sha]
+
+
+def get_staged_note(base_args: BaseArgs) -> str:
+    staged = list(base_args.get("staged_changes", {}))
+    if not staged:
+        return ""
+    return f"\n\nNote: the index doesn't include your changes to {', '.join(staged)} in this run."
+
+
+@handle_exceptions(default_return_value="", raise_on_error=False)
+def find_definition(name: str, base_args: BaseArgs) -> str:
+    """Find where a class, function or method is defined in the working branch by its exact name."""
+    index = get_symbol_index(ref=base_args["new_branch"], base_args=base_args)
+    if index is None:
+        return f"The symbol index is unavailable for this repository, which may be too large. Use search_remote_file_contents() to find '{name}' instead."
+    definitions = index.find_definitions(name=name.rsplit(".", 1)[-1])
+    if not definitions:
+        return f"No definition of '{name}' found. Try find_references() or search_remote_file_contents() instead."
+    rows = [
+        f"- {path}#L{start}-L{end} ({kind})"
+        for path, start, end, kind in definitions[:MAX_DEFINITION_RESULTS]
+    ]
+    if len(definitions) > MAX_DEFINITION_RESULTS:
+        rows.append(f"... ({len(definitions) - MAX_DEFINITION_RESULTS} more)")
+    msg = f"{len(definitions)} definitions of '{name}' found:\n"
+    return msg + "\n".join(rows) + get_staged_note(base_args=base_args)
+
+
+@handle_exceptions(default_return_value="", raise_on_error=False)
+def find_references(name: str, base_args: BaseArgs) -> str:
+    """Find the lines that mention an identifier in the source files of the working branch by its exact name."""
+    index = get_symbol_index(ref=base_args["new_branch"], base_args=base_args)
+    if index is None:
+        return f"The symbol index is unavailable for this repository, which may be too large. Use search_remote_file_contents() to find '{name}' instead."
+    references = index.find_references(name=name.rsplit(".", 1)[-1])
+    if not references:
+        return f"No references to '{name}' found in source files."
+    rows: list[str] = []
+    for path, lines in list(references.items())[:MAX_REFERENCE_FILES]:
+        row = f"- {path}: L{', L'.join(str(line) for line in lines[:MAX_REFERENCE_LINES_PER_FILE])}"
+        if len(lines) > MAX_REFERENCE_LINES_PER_FILE:
+            row += f" ... ({len(lines) - MAX_REFERENCE_LINES_PER_FILE} more lines)"
+        rows.append(row)
+    if len(references) > MAX_REFERENCE_FILES:
+        rows.append(f"... ({len(references) - MAX_REFERENCE_FILES} more files)")
+    count = sum(len(lines) for lines in references.values())
+    msg = f"{count} references to '{name}' found in {len(references)} files:\n"
+    return msg + "\n".join(rows) + get_staged_note(base_args=base_args)
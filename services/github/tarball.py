@@ -0,0 +1,94 @@
+# Standard imports
+import tarfile
+import threading
+from typing import Callable
+
+# Local imports
+from config import GITHUB_API_URL, TIMEOUT, UTF8
+from services.github.create_headers import create_headers
+from services.github.github_types import BaseArgs
+from services.github.http_client import github_request
+from services.github.tree_index import TreeIndex
+from utils.content_classifier import classify_content
+from utils.retry import get_remaining_time
+
+MAX_TARBALL_FILE_BYTES = 512 * 1024
+# A tree over these sizes is not downloaded, since the download and the index built from it would not fit in the time and memory of one invocation
+MAX_TARBALL_TREE_BYTES = 512 * 1024 * 1024  # Uncompressed size of all blobs in the tree
+MAX_TARBALL_WANTED_FILES = 20_000
+MAX_TARBALL_WANTED_BYTES = 128 * 1024 * 1024
+
+
+class TarballDeadlineError(Exception):
+    """Raised when the invocation runs out of time while a tarball is being read."""
+
+
+class TarballCancelledError(Exception):
+    """Raised when the caller no longer needs the files while a tarball is being read."""
+
+
+def is_within_budget(
+    index: TreeIndex,
+    is_wanted: Callable[[str], bool],
+    max_file_bytes: int = MAX_TARBALL_FILE_BYTES,
+) -> bool:
+    """Tell from the sizes in the tree index alone, without any request, whether download_text_files() fits in the budget."""
+    wanted = [
+        size
+        for path, size in zip(index.paths, index.sizes)
+        if size <= max_file_bytes and is_wanted(path)
+    ]
+    return (
+        sum(index.sizes) <= MAX_TARBALL_TREE_BYTES
+        and len(wanted) <= MAX_TARBALL_WANTED_FILES
+        and sum(wanted) <= MAX_TARBALL_WANTED_BYTES
+    )
+
+
+def download_text_files(
+    commit_sha: str,
+    base_args: BaseArgs,
+    is_wanted: Callable[[str], bool],
+    max_file_bytes: int = MAX_TARBALL_FILE_BYTES,
+    cancel: threading.Event | None = None,
+) -> dict[str, str]:
+    """Download the whole tree of the commit in one tarball and keep the text of the wanted files, skipping large, binary, lockfile, minified and generated files. The tarball is read as a stream, so the archive itself is never held in memory or written to disk. Reading stops with TarballDeadlineError when the invocation runs out of time, and with TarballCancelledError once the cancel event is set.
+    https://docs.github.com/en/rest/repos/contents?apiVersion=2022-11-28#download-a-repository-archive-tar
+    """
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    response = github_request(
+        method="GET",
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball/{commit_sha}",
+        headers=create_headers(token=token),
+        timeout=TIMEOUT,
+        stream=True,
+    )
+    files: dict[str, str] = {}
+    with response:
+        response.raise_for_status()
+        with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+            for member in archive:
+                if get_remaining_time() <= 0:
+                    raise TarballDeadlineError(
+                        f"Ran out of time reading the tarball of {owner}/{repo} at {commit_sha}"
+                    )
+                if cancel is not None and cancel.is_set():
+                    raise TarballCancelledError(
+                        f"Cancelled reading the tarball of {owner}/{repo} at {commit_sha}"
+                    )
+                # Paths are prefixed with "{owner}-{repo}-{short sha}/"
+                path = member.name.split("/", 1)[-1]
+                if (
+                    not member.isfile()
+                    or member.size > max_file_bytes
+                    or not is_wanted(path)
+                ):
+                    continue
+                f = archive.extractfile(member)
+                if f is None:
+                    continue
+                content = f.read()
+                if not classify_content(file_path=path, content=content).is_text:
+                    continue
+                files[path] = content.decode(encoding=UTF8, errors="replace")
+    return files
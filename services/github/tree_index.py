@@ -0,0 +1,252 @@
+# Standard imports
+import difflib
+import fnmatch
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Local imports
+from config import GITHUB_API_URL, TIMEOUT
+from services.github.create_headers import create_headers
+from services.github.github_types import BaseArgs
+from services.github.index_cache import read_index, write_index
+from services.github.http_client import get_with_etag
+from utils.handle_exceptions import handle_exceptions
+
+MAX_TREE_INDEXES_IN_MEMORY = 32
+MAX_PATH_SEARCH_RESULTS = 100
+COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+class TreeIndex:
+    """Compact index of a recursive Git tree: blob paths in a sorted array with their SHAs, sizes, and modes in parallel arrays, and directory paths in another sorted array."""
+
+    def __init__(
+        self,
+        tree_sha: str,
+        paths: list[str],
+        shas: list[str],
+        sizes: list[int],
+        modes: list[str],
+        dirs: list[str],
+    ) -> None:
+        self.tree_sha = tree_sha
+        self.paths = paths
+        self.shas = shas
+        self.sizes = sizes
+        self.modes = modes
+        self.dirs = dirs
+
+    @classmethod
+    def from_tree(cls, tree_sha: str, tree: list[dict]) -> "TreeIndex":
+        blobs = sorted(
+            (item["path"], item["sha"], item.get("size", 0), item["mode"])
+            for item in tree
+            if item["type"] == "blob"
+        )
+        dirs = sorted(item["path"] for item in tree if item["type"] == "tree")
+        return cls(
+            tree_sha=tree_sha,
+            paths=[blob[0] for blob in blobs],
+            shas=[blob[1] for blob in blobs],
+            sizes=[blob[2] for blob in blobs],
+            modes=[blob[3] for blob in blobs],
+            dirs=dirs,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "tree_sha": self.tree_sha,
+            "paths": self.paths,
+            "shas": self.shas,
+            "sizes": self.sizes,
+            "modes": self.modes,
+            "dirs": self.dirs,
+        }
+
+    def find(self, path: str) -> int:
+        """Return the position of the blob path or -1 if not found."""
+        i = bisect_left(self.paths, path)
+        if i < len(self.paths) and self.paths[i] == path:
+            return i
+        return -1
+
+    def is_dir(self, path: str) -> bool:
+        i = bisect_left(self.dirs, path)
+        return i < len(self.dirs) and self.dirs[i] == path
+
+    def search_prefix(self, prefix: str) -> list[str]:
+        """Paths starting with the prefix, e.g. 'src/utils/'. Sorted paths make this a binary search plus a slice."""
+        start = bisect_left(self.paths, prefix)
+        end = start
+        while end < len(self.paths) and self.paths[end].startswith(prefix):
+            end += 1
+        return self.paths[start:end]
+
+    def search_glob(self, pattern: str) -> list[str]:
+        """Paths matching a glob, e.g. '*.py' or 'tests/**/test_*.py'. A pattern without a slash matches file names in any directory."""
+        if "/" not in pattern:
+            return [
+                p
+                for p in self.paths
+                if fnmatch.fnmatchcase(p.rsplit("/", 1)[-1], pattern)
+            ]
+
+        # Narrow down the candidates with the literal prefix before the first wildcard
+        literal_prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        candidates = self.search_prefix(prefix=literal_prefix)
+        return [p for p in candidates if fnmatch.fnmatchcase(p, pattern)]
+
+    def search_fuzzy(self, query: str) -> list[str]:
+        """Paths containing the query case-insensitively, then paths whose file names are close to the query to tolerate typos."""
+        lowered = query.lower()
+        results = [p for p in self.paths if lowered in p.lower()]
+        if results:
+            return results
+
+        names: dict[str, list[str]] = {}
+        for p in self.paths:
+            names.setdefault(p.rsplit("/", 1)[-1].lower(), []).append(p)
+        matches = difflib.get_close_matches(
+            word=lowered.rsplit("/", 1)[-1],
+            possibilities=names.keys(),
+            n=10,
+            cutoff=0.6,
+        )
+        return [p for name in matches for p in names[name]]
+
+
+# Tree indexes are immutable once built, so they are shared across runs in a warm container and on disk
+tree_indexes: OrderedDict[str, TreeIndex] = OrderedDict()
+commit_to_tree: dict[str, str] = {}
+tree_indexes_lock = threading.Lock()  # Handlers read trees from several threads
+
+
+def remember_tree_index(index: TreeIndex) -> None:
+    with tree_indexes_lock:
+        tree_indexes[index.tree_sha] = index
+        tree_indexes.move_to_end(index.tree_sha)
+        while len(tree_indexes) > MAX_TREE_INDEXES_IN_MEMORY:
+            tree_indexes.popitem(last=False)
+
+
+def get_remembered_tree_index(tree_sha: str) -> TreeIndex | None:
+    with tree_indexes_lock:
+        index = tree_indexes.get(tree_sha)
+        if index is not None:
+            tree_indexes.move_to_end(tree_sha)
+        return index
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def read_tree_index_from_disk(tree_sha: str) -> TreeIndex | None:
+    data = read_index(kind="tree", tree_sha=tree_sha)
+    return None if data is None else TreeIndex(**data)
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def write_tree_index_to_disk(index: TreeIndex) -> None:
+    write_index(kind="tree", tree_sha=index.tree_sha, data=index.to_dict())
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def load_tree_index(tree_sha: str, base_args: BaseArgs) -> TreeIndex | None:
+    """Get the index of a tree from memory, disk, or GitHub in this order.
+    https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
+    """
+    index = get_remembered_tree_index(tree_sha=tree_sha)
+    if index is not None:
+        return index
+
+    index = read_tree_index_from_disk(tree_sha=tree_sha)
+    if index is None:
+        owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+        response = get_with_etag(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{tree_sha}",
+            headers=create_headers(token=token),
+            params={"recursive": 1},  # 0, 1, "true", or "false" are all True!!
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        res_json = response.json()
+        if res_json.get("truncated"):
+            print(f"The tree {tree_sha} of {owner}/{repo} is truncated by GitHub.")
+        index = TreeIndex.from_tree(tree_sha=tree_sha, tree=res_json["tree"])
+        write_tree_index_to_disk(index=index)
+
+    remember_tree_index(index=index)
+    return index
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def resolve_commit_sha(ref: str, base_args: BaseArgs) -> str:
+    """https://docs.github.com/en/rest/git/refs?apiVersion=2022-11-28#get-a-reference"""
+    if COMMIT_SHA_PATTERN.match(ref):
+        return ref
+    owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+    response = get_with_etag(
+        url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/ref/heads/{ref}",
+        headers=create_headers(token=token),
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()["object"]["sha"]
+
+
+@handle_exceptions(default_return_value=None, raise_on_error=False)
+def get_tree_index(ref: str, base_args: BaseArgs) -> TreeIndex | None:
+    """Get the tree index of a branch name or a commit SHA. A commit always points to the same tree, so the tree is fetched once per commit.
+    https://docs.github.com/en/rest/git/commits?apiVersion=2022-11-28#get-a-commit-object
+    """
+    commit_sha = resolve_commit_sha(ref=ref, base_args=base_args)
+    if commit_sha is None:
+        return None
+    if commit_sha not in commit_to_tree:
+        owner, repo, token = base_args["owner"], base_args["repo"], base_args["token"]
+        response = get_with_etag(
+            url=f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits/{commit_sha}",
+            headers=create_headers(token=token),
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        commit_to_tree[commit_sha] = response.json()["tree"]["sha"]
+    return load_tree_index(tree_sha=commit_to_tree[commit_sha], base_args=base_args)
+
+
+def get_cached_tree_index(ref: str) -> TreeIndex | None:
+    """Return the tree index of a commit SHA only if it is already in memory. It never makes a request."""
+    tree_sha = commit_to_tree.get(ref)
+    return None if tree_sha is None else get_remembered_tree_index(tree_sha=tree_sha)
+
+
+@handle_exceptions(default_return_value="", raise_on_error=False)
+def search_file_paths(query: str, base_args: BaseArgs) -> str:
+    """Search file paths in the working branch by a glob (e.g. '**/*.test.ts'), a directory prefix ending with a slash (e.g. 'src/utils/'), or a part of a file name (e.g. 'handler'), including files created in this run."""
+    index = get_tree_index(ref=base_args["new_branch"], base_args=base_args)
+    if index is None:
+        return f"Failed to get the file tree to search '{query}'."
+
+    if any(char in query for char in "*?["):
+        method, results = "glob", index.search_glob(pattern=query)
+    elif query.endswith("/"):
+        method, results = "prefix", index.search_prefix(prefix=query)
+    else:
+        method, results = "fuzzy", index.search_fuzzy(query=query)
+
+    # Add files that are staged but not committed yet
+    for file_path in base_args.get("staged_changes", {}):
+        if index.find(path=file_path) == -1 and file_path not in results:
+            if (
+                fnmatch.fnmatchcase(file_path, query)
+                or query.lower() in file_path.lower()
+            ):
+                results.append(file_path)
+
+    if not results:
+        return f"No file paths found for '{query}' ({method} search)."
+    msg = f"{len(results)} file paths found for '{query}' ({method} search)"
+    if len(results) > MAX_PATH_SEARCH_RESULTS:
+        msg += f". Showing the first {MAX_PATH_SEARCH_RESULTS}, narrow down the query to see the rest"
+        results = results[:MAX_PATH_SEARCH_RESULTS]
+    return msg + ":\n" + "\n".join(results)
@@ -1,6 +1,6 @@
-import requests
 from config import GITHUB_API_URL, TIMEOUT
 from services.github.create_headers import create_headers
+from services.github.http_client import get_with_etag
 from utils.handle_exceptions import handle_exceptions
 
 
@@ -9,6 +9,6 @@ def check_user_is_collaborator(owner: str, repo: str, user: str, token: str) ->
     """https://docs.github.com/en/rest/collaborators/collaborators?apiVersion=2022-11-28#check-if-a-user-is-a-repository-collaborator"""
     url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/collaborators/{user}"
     headers = create_headers(token=token)
-    response = requests.get(url=url, headers=headers, timeout=TIMEOUT)
+    response = get_with_etag(url=url, headers=headers, timeout=TIMEOUT)
     response.raise_for_status()
     return response.status_code == 204
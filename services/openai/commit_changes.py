@@ -1,6 +1,8 @@
 # Standard imports
 import json
-from typing import Iterable, List, Literal
+import logging
+from functools import partial
+from typing import Any, Iterable, List, Literal
 
 # Third-party imports
 from openai import OpenAI
@@ -32,6 +34,21 @@ from services.openai.instructions.update_comment import (
 )
 from utils.colorize_log import colorize
 from utils.handle_exceptions import handle_exceptions
+from utils.task_graph import Task, run_task_graph
+
+# Tools that change the branch or the comment. Calls to them on the same file (or the comment) run in order, while the other tools only read and run concurrently
+WRITE_TOOLS = {"commit_changes_to_remote_branch", "update_github_comment"}
+
+
+def run_tool(tool_name: str, tool_args: dict, base_args: BaseArgs, **_: Any) -> Any:
+    """Call the tool. The results of the calls it waited for are ignored. An error is returned as the result of this call, so that it doesn't discard the results of the other calls in the same response."""
+    try:
+        return tools_to_call[tool_name](**tool_args, base_args=base_args)
+    except Exception as err:  # pylint: disable=broad-except
+        logging.error(
+            "Tool '%s' failed with %s: %s", tool_name, type(err).__name__, err
+        )
+        return f"The function '{tool_name}' failed with {type(err).__name__}: {err}"
 
 
 @handle_exceptions(raise_on_error=True)
@@ -71,7 +88,7 @@ def chat_with_agent(
         timeout=TIMEOUT,
         tools=tools,
         tool_choice="auto",  # DO NOT USE "required" and allow GitAuto not to call any tools.
-        parallel_tool_calls=False,
+        parallel_tool_calls=True,
     )
     choice: Choice = completion.choices[0]
     tool_calls: List[ChatCompletionMessageToolCall] | None = choice.message.tool_calls
@@ -84,36 +101,71 @@ def chat_with_agent(
     is_done = False
     if not tool_calls:
         print(colorize(f"No tools were called in '{mode}' mode", "yellow"))
-        return messages, previous_calls, None, None, token_input, token_output, is_done
-
-    # Handle multiple tool calls
-    tool_call_id: str = tool_calls[0].id
-    tool_name: str = tool_calls[0].function.name
-    tool_args: dict = json.loads(tool_calls[0].function.arguments)
-    print(colorize(f"tool_name: {tool_name}", "green"))
-    print(colorize(f"tool_args: {tool_args}\n", "green"))
-
-    # Check if the same function with the same args has been called before
-    current_call = {"function": tool_name, "args": tool_args}
-    if current_call in previous_calls:
-        msg = f"The function '{tool_name}' was called with the same arguments as before"
-        print(msg)
-        tool_result = f"{msg}, which is non-sense. You must open the file path in your tool args and update your diff content accordingly."
-    else:
-        tool_result = tools_to_call[tool_name](**tool_args, base_args=base_args)
+        return messages, previous_calls, [], [], token_input, token_output, is_done
+
+    # Run the tool calls in this response, reads concurrently and writes to the same file in order
+    tool_names: list[str] = []
+    tool_args_list: list[dict] = []
+    tasks: dict[str, Task] = {}
+    tool_results: dict[str, str] = {}
+    last_writes: dict[str, str] = {}  # File path (or tool name) to the last call writing it
+    touched: dict[str, list[str]] = {}  # File path (or tool name) to the calls on it
+    for tool_call in tool_calls:
+        tool_name: str = tool_call.function.name
+        tool_args: dict = json.loads(tool_call.function.arguments)
+        print(colorize(f"tool_name: {tool_name}", "green"))
+        print(colorize(f"tool_args: {tool_args}\n", "green"))
+        tool_names.append(tool_name)
+        tool_args_list.append(tool_args)
+
+        # Check if the same function with the same args has been called before
+        current_call = {"function": tool_name, "args": tool_args}
+        if current_call in previous_calls:
+            msg = f"The function '{tool_name}' was called with the same arguments as before"
+            print(msg)
+            tool_results[tool_call.id] = f"{msg}, which is non-sense. You must open the file path in your tool args and update your diff content accordingly."
+            continue
         previous_calls.append(current_call)
         is_done = True
 
-    # Append the function call to the messages
+        # A write waits for the earlier calls on the same file, and a read waits for the last earlier write to it
+        if tool_name in WRITE_TOOLS:
+            target = tool_args.get("file_path", tool_name)
+            deps = tuple(touched.get(target, []))
+            last_writes[target] = tool_call.id
+        else:
+            target = tool_args.get("file_path")
+            deps = (last_writes[target],) if target in last_writes else ()
+        if target is not None:
+            touched.setdefault(target, []).append(tool_call.id)
+        tasks[tool_call.id] = Task(
+            func=partial(
+                run_tool, tool_name=tool_name, tool_args=tool_args, base_args=base_args
+            ),
+            deps=deps,
+        )
+    tool_results |= run_task_graph(tasks=tasks) if tasks else {}
+
+    # Append the function calls and their results to the messages in the order of the calls
     messages.append(choice.message)
-    messages.append(
-        {
-            "role": "tool",
-            "tool_call_id": tool_call_id,
-            "name": tool_name,
-            "content": str(tool_result),
-        }
-    )
+    for tool_call in tool_calls:
+        messages.append(
+            {
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "name": tool_call.function.name,
+                "content": str(tool_results[tool_call.id]),
+            }
+        )
 
     # Return
-    return messages, previous_calls, tool_name, tool_args, token_input, token_output, is_done
+    return messages, previous_calls, tool_names, tool_args_list, token_input, token_output, is_done
+
+
+def describe_tool_calls(tool_names: list[str], tool_args_list: list[dict]) -> str:
+    """Describe the tool calls of a turn for the progress comment."""
+    calls = [
+        f"`{tool_name}()` with `{tool_args}`"
+        for tool_name, tool_args in zip(tool_names, tool_args_list)
+    ]
+    return f"Calling {', '.join(calls)}..."
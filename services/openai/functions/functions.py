@@ -9,9 +9,12 @@ from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 from services.github.github_manager import (
     commit_changes_to_remote_branch,
     get_remote_file_content,
+    get_remote_file_outline,
     search_remote_file_contents,
     update_comment,
 )
+from services.github.symbol_index import find_definition, find_references
+from services.github.tree_index import search_file_paths
 from services.openai.functions.update_comment import UPDATE_GITHUB_COMMENT
 from services.openai.instructions.diff import DIFF_DESCRIPTION
 
@@ -30,6 +33,10 @@ KEYWORD: dict[str, str] = {
     "type": "string",
     "description": "The keyword to search for in a file. For example, 'variable_name'. Exact matches only.",
 }
+FULL_CONTENT: dict[str, str] = {
+    "type": "boolean",
+    "description": "Set to true only if you need the whole file even though it was summarized as a lockfile, a minified bundle, or generated code. Opening the same file again with this is fine. Binary files are never shown.",
+}
 LINE_NUMBER: dict[str, int] = {
     "type": "integer",
     "description": "If you already know the line number of interest when opening a file, use this. The 5 lines before and after this line number will be retrieved. For example, use it when checking the surrounding lines of a specific line number if the diff is incorrect.",
@@ -60,6 +67,7 @@ GET_REMOTE_FILE_CONTENT: shared_params.FunctionDefinition = {
             "file_path": FILE_PATH,
             "line_number": LINE_NUMBER,
             "keyword": KEYWORD,
+            "full_content": FULL_CONTENT,
         },
         "required": ["file_path"],
         # "additionalProperties": False,  # For Structured Outpus
@@ -67,6 +75,19 @@ GET_REMOTE_FILE_CONTENT: shared_params.FunctionDefinition = {
     # "strict": True,  # For Structured Outpus
 }
 
+# See https://platform.openai.com/docs/api-reference/chat/create#chat-create-tools
+GET_REMOTE_FILE_OUTLINE: shared_params.FunctionDefinition = {
+    "name": "get_remote_file_outline",
+    "description": "Lists the classes, functions and methods in a source file with their line ranges, without the file content. Use this before get_remote_file_content on a large file, then open only the symbol you need with its line_number.",
+    "parameters": {
+        "type": "object",
+        "properties": {"file_path": FILE_PATH},
+        "required": ["file_path"],
+        "additionalProperties": False,  # For Structured Outpus
+    },
+    "strict": True,  # For Structured Outpus
+}
+
 QUERY: dict[str, str] = {
     "type": "string",
     "description": """
@@ -100,18 +121,79 @@ SEARCH_REMOTE_FILE_CONTENT: shared_params.FunctionDefinition = {
     "strict": True,  # For Structured Outpus
 }
 
+PATH_QUERY: dict[str, str] = {
+    "type": "string",
+    "description": """
+    The query to search for file paths in the repository. The search type is decided by the query:
+
+    - Glob if the query contains '*', '?', or '[': '*.py' matches file names in any directory, 'src/**/test_*.py' matches full paths.
+    - Directory prefix if the query ends with '/': 'src/utils/' lists all files under the directory recursively.
+    - Otherwise, a part of a path, e.g. 'handler' or 'config.py'. Close file names are returned if there is no exact match.
+    """,
+}
+
+# See https://platform.openai.com/docs/api-reference/chat/create#chat-create-tools
+SEARCH_FILE_PATHS: shared_params.FunctionDefinition = {
+    "name": "search_file_paths",
+    "description": "Search file paths in the whole repository, including subdirectories. Use this to find the exact path of a file before opening it instead of guessing paths or opening directories one by one.",
+    "parameters": {
+        "type": "object",
+        "properties": {"query": PATH_QUERY},
+        "required": ["query"],
+        "additionalProperties": False,  # For Structured Outpus
+    },
+    "strict": True,  # For Structured Outpus
+}
+
+SYMBOL_NAME: dict[str, str] = {
+    "type": "string",
+    "description": "The exact name of a class, function, method, or variable. For example, 'get_remote_file_content' or 'UserService'. Not a partial name or a phrase.",
+}
+
+# See https://platform.openai.com/docs/api-reference/chat/create#chat-create-tools
+FIND_DEFINITION: shared_params.FunctionDefinition = {
+    "name": "find_definition",
+    "description": "Finds the files and line ranges where a class, function, or method is defined in the repository by its exact name. Faster and more precise than search_remote_file_contents when you know the name.",
+    "parameters": {
+        "type": "object",
+        "properties": {"name": SYMBOL_NAME},
+        "required": ["name"],
+        "additionalProperties": False,  # For Structured Outpus
+    },
+    "strict": True,  # For Structured Outpus
+}
+
+# See https://platform.openai.com/docs/api-reference/chat/create#chat-create-tools
+FIND_REFERENCES: shared_params.FunctionDefinition = {
+    "name": "find_references",
+    "description": "Finds the lines in source files that mention an identifier by its exact name. Use this to find the callers and usages of something you are going to change.",
+    "parameters": {
+        "type": "object",
+        "properties": {"name": SYMBOL_NAME},
+        "required": ["name"],
+        "additionalProperties": False,  # For Structured Outpus
+    },
+    "strict": True,  # For Structured Outpus
+}
+
 # See https://platform.openai.com/docs/api-reference/chat/create#chat-create-tools
 TOOLS_TO_UPDATE_COMMENT: Iterable[ChatCompletionToolParam] = [
     {"type": "function", "function": UPDATE_GITHUB_COMMENT},
 ]
 TOOLS_TO_GET_FILE: Iterable[ChatCompletionToolParam] = [
     {"type": "function", "function": GET_REMOTE_FILE_CONTENT},
+    {"type": "function", "function": GET_REMOTE_FILE_OUTLINE},
+    {"type": "function", "function": SEARCH_FILE_PATHS},
 ]
 TOOLS_TO_EXPLORE_REPO: Iterable[ChatCompletionToolParam] = [
     # {"type": "code_interpreter"},
     # {"type": "retrieval"},
     {"type": "function", "function": GET_REMOTE_FILE_CONTENT},
+    {"type": "function", "function": GET_REMOTE_FILE_OUTLINE},
     {"type": "function", "function": SEARCH_REMOTE_FILE_CONTENT},
+    {"type": "function", "function": SEARCH_FILE_PATHS},
+    {"type": "function", "function": FIND_DEFINITION},
+    {"type": "function", "function": FIND_REFERENCES},
 ]
 TOOLS_TO_COMMIT_CHANGES: Iterable[ChatCompletionToolParam] = [
     {"type": "function", "function": COMMIT_CHANGES_TO_REMOTE_BRANCH},
@@ -120,7 +202,11 @@ TOOLS_TO_COMMIT_CHANGES: Iterable[ChatCompletionToolParam] = [
 # Define tools to call
 tools_to_call: dict[str, Any] = {
     "commit_changes_to_remote_branch": commit_changes_to_remote_branch,
+    "find_definition": find_definition,
+    "find_references": find_references,
     "get_remote_file_content": get_remote_file_content,
+    "get_remote_file_outline": get_remote_file_outline,
+    "search_file_paths": search_file_paths,
     "search_remote_file_contents": search_remote_file_contents,
     "update_github_comment": update_comment,
 }
@@ -15,6 +15,9 @@ When working on an issue in a GitHub repository, you may need to interact with r
 
 - Function to Call: `get_remote_file_content()` or `search_remote_file_contents()` followed by `commit_changes_to_remote_branch()`
 - When to Call: When you need to modify an existing file (e.g., fixing a bug, adding a feature, or removing unnecessary code).
+- If you don't know the exact path of the file, call `search_file_paths()` first instead of guessing the path.
+- If you know the name of the class or function to change, call `find_definition()` to open the right file and `find_references()` to find its usages instead of searching for the name.
+- If the file is large, call `get_remote_file_outline()` first to find the line ranges of its classes and functions, then open only the part you need with `get_remote_file_content()` and `line_number`.
 - IMPORTANT:
   1. After retrieving the file content, ENSURE you proceed to create the diff and call `commit_changes_to_remote_branch()`. Do not repeatedly call `get_remote_file_content()` or `search_remote_file_contents()` without committing the changes.
   2. If you need to change multiple blocks in the same file, call the function multiple times with each block separately for simplicity. For example, if you have three blocks to change in the same file, call the function three times with each block separately.
@@ -26,6 +29,7 @@ When working on an issue in a GitHub repository, you may need to interact with r
 
 ## Important Considerations
 
+- Parallel Calls: If you already know several files to open or several things to search, call those functions together in one response instead of one by one.
 - Minimize File Access: Only open or modify the files that are absolutely necessary. Avoid accessing the same file more than once or opening too many files to reduce penalties.
 - If you encounter any issues while interacting with the files, refer to the error messages for guidance on how to modify your approach. This is very crucial.
 
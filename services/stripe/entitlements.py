@@ -0,0 +1,59 @@
+# Standard imports
+import threading
+import time
+from typing import NamedTuple
+
+# Local imports
+from config import STRIPE_PRODUCT_ID_FREE
+from services.stripe.subscriptions import get_stripe_product_id
+from services.supabase.owers_manager import get_stripe_customer_id
+
+# Plans rarely change, and a stale answer only delays a plan change by this long
+ENTITLEMENT_TTL = 300
+
+
+class Entitlement(NamedTuple):
+    product_id: str | None
+    expires_at: float
+
+    @property
+    def is_paid(self) -> bool:
+        return self.product_id is not None and self.product_id != STRIPE_PRODUCT_ID_FREE
+
+
+entitlements: dict[int, Entitlement] = {}
+entitlements_lock = threading.Lock()
+
+
+def get_entitlement(owner_id: int) -> Entitlement:
+    """Return the plan of the owner from memory, or look it up in Supabase and Stripe and keep it for ENTITLEMENT_TTL seconds. A missing Stripe customer is cached as the free tier too, so repeated events from free accounts don't hit Supabase or Stripe. A failed lookup is never cached, so a transient error doesn't turn off repairs for a paying owner until the TTL expires."""
+    now = time.time()
+    with entitlements_lock:
+        entitlement = entitlements.get(owner_id)
+    if entitlement is not None and entitlement.expires_at > now:
+        return entitlement
+
+    product_id: str | None = None
+    try:
+        stripe_customer_id = get_stripe_customer_id(owner_id=owner_id)
+        if stripe_customer_id is not None:
+            product_id = get_stripe_product_id(customer_id=stripe_customer_id)
+    except Exception:  # pylint: disable=broad-except
+        # Fall back to the expired answer if there is one, and try again on the next event
+        if entitlement is not None:
+            return entitlement
+        return Entitlement(product_id=None, expires_at=now)
+    entitlement = Entitlement(product_id=product_id, expires_at=now + ENTITLEMENT_TTL)
+    with entitlements_lock:
+        entitlements[owner_id] = entitlement
+    return entitlement
+
+
+def is_paid_owner(owner_id: int) -> bool:
+    return get_entitlement(owner_id=owner_id).is_paid
+
+
+def invalidate_entitlement(owner_id: int) -> None:
+    """Forget the cached plan, e.g. when the owner installs or uninstalls the app or changes the plan."""
+    with entitlements_lock:
+        entitlements.pop(owner_id, None)
@@ -5,9 +5,10 @@ from utils.handle_exceptions import handle_exceptions
 stripe.api_key = STRIPE_API_KEY
 
 
-@handle_exceptions(default_return_value=None, raise_on_error=False)
+@handle_exceptions(default_return_value=None, raise_on_error=True)
 def get_stripe_product_id(customer_id: str):
-    """https://docs.stripe.com/api/subscriptions/list?lang=python"""
+    """Return None if the customer has no subscription. Errors are raised so that callers can tell them from no subscription.
+    https://docs.stripe.com/api/subscriptions/list?lang=python"""
     subscriptions = stripe.Subscription.list(customer=customer_id)
     data = subscriptions["data"]
     if len(data) == 0:
@@ -1,10 +1,11 @@
 from supabase import create_client, Client
 
+from .check_run_attempts_manager import CheckRunAttemptsManager
 from .gitauto_manager import GitAutoAgentManager
 from .users_manager import UsersManager
 
 
-class SupabaseManager(GitAutoAgentManager, UsersManager):
+class SupabaseManager(CheckRunAttemptsManager, GitAutoAgentManager, UsersManager):
     "Combines all supabase services into one manager so you only need to instntiate one object."
 
     def __init__(self, url: str, key: str) -> None:
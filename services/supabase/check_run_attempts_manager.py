@@ -0,0 +1,98 @@
+"""Ledger of check run repair attempts to avoid infinite loops
+
+The Supabase table is created by supabase/migrations/20261019000000_create_check_run_attempts.sql.
+"""
+
+# Standard imports
+import os
+import sqlite3
+import threading
+
+# Third Party imports
+from supabase import Client
+
+# Local imports
+from utils.handle_exceptions import handle_exceptions
+
+
+class CheckRunAttemptsManager:
+    """Manager for check run repair attempts"""
+
+    def __init__(self, client: Client) -> None:
+        self.client: Client = client
+
+    @handle_exceptions(default_return_value=True, raise_on_error=False)
+    def has_check_run_attempt(
+        self, owner: str, repo: str, pull_number: int, check_run_name: str
+    ) -> bool:
+        """Return True if GitAuto has tried to fix this check run in the PR before, at any head SHA. A fix pushes a new head SHA, so matching the SHA too would let a failing fix trigger another fix forever. It returns True on errors too, because skipping one repair is better than repairing in a loop."""
+        data, _count = (
+            self.client.table(table_name="check_run_attempts")
+            .select("id")
+            .eq(column="owner", value=owner)
+            .eq(column="repo", value=repo)
+            .eq(column="pull_number", value=pull_number)
+            .eq(column="check_run_name", value=check_run_name)
+            .limit(size=1)
+            .execute()
+        )
+        return len(data[1]) > 0
+
+    @handle_exceptions(raise_on_error=True)
+    def create_check_run_attempt(
+        self,
+        owner: str,
+        repo: str,
+        pull_number: int,
+        check_run_name: str,
+        head_sha: str,
+    ) -> None:
+        self.client.table(table_name="check_run_attempts").upsert(
+            json={
+                "owner": owner,
+                "repo": repo,
+                "pull_number": pull_number,
+                "check_run_name": check_run_name,
+                "head_sha": head_sha,
+            },
+            on_conflict="owner,repo,pull_number,check_run_name,head_sha",
+            ignore_duplicates=True,
+        ).execute()
+
+
+class SQLiteCheckRunAttempts:
+    """Local stand-in for CheckRunAttemptsManager backed by a SQLite file"""
+
+    def __init__(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(name=os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(database=path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS check_run_attempts (owner TEXT NOT NULL, repo TEXT NOT NULL, pull_number INTEGER NOT NULL, check_run_name TEXT NOT NULL, head_sha TEXT NOT NULL, created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP, UNIQUE (owner, repo, pull_number, check_run_name, head_sha))"
+            )
+
+    def has_check_run_attempt(
+        self, owner: str, repo: str, pull_number: int, check_run_name: str
+    ) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM check_run_attempts WHERE owner = ? AND repo = ? AND pull_number = ? AND check_run_name = ? LIMIT 1",
+                (owner, repo, pull_number, check_run_name),
+            ).fetchone()
+        return row is not None
+
+    def create_check_run_attempt(
+        self,
+        owner: str,
+        repo: str,
+        pull_number: int,
+        check_run_name: str,
+        head_sha: str,
+    ) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO check_run_attempts (owner, repo, pull_number, check_run_name, head_sha) VALUES (?, ?, ?, ?, ?)",
+                (owner, repo, pull_number, check_run_name, head_sha),
+            )
@@ -11,14 +11,17 @@ supabase: Client = create_client(
 )
 
 
-@handle_exceptions(default_return_value=None, raise_on_error=False)
+@handle_exceptions(default_return_value=None, raise_on_error=True)
 def get_stripe_customer_id(owner_id: int):
-    """https://supabase.com/docs/reference/python/select"""
+    """Return None if the owner has no row or no Stripe customer. Errors are raised so that callers can tell them from a missing customer.
+    https://supabase.com/docs/reference/python/select"""
     data, _count = (
         supabase.table(table_name="owners")
         .select("stripe_customer_id")
         .eq(column="owner_id", value=owner_id)
         .execute()
     )
+    if not data[1]:
+        return None
     customer_id: str | None = data[1][0]["stripe_customer_id"]
     return customer_id
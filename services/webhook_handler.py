@@ -4,6 +4,7 @@ from typing import Any
 
 # Local imports
 from config import (
+    GITHUB_APP_USER_NAME,
     GITHUB_CHECK_RUN_FAILURES,
     PRODUCT_ID,
     SUPABASE_URL,
@@ -13,13 +14,14 @@ from config import (
 )
 from services.check_run_handler import handle_check_run
 from services.github.github_manager import (
-    add_issue_templates,
+    add_issue_templates_to_repos,
     create_comment_on_issue_with_gitauto_button,
     get_installation_access_token,
     # turn_on_issue,
     get_user_public_email,
 )
 from services.github.github_types import GitHubInstallationPayload
+from services.stripe.entitlements import invalidate_entitlement, is_paid_owner
 from services.supabase import SupabaseManager
 from services.gitauto_handler import handle_gitauto
 from utils.handle_exceptions import handle_exceptions
@@ -40,6 +42,7 @@ async def handle_installation_created(payload: GitHubInstallationPayload) -> Non
     user_name: str = payload["sender"]["login"]
     token: str = get_installation_access_token(installation_id=installation_id)
     user_email: str | None = get_user_public_email(username=user_name, token=token)
+    invalidate_entitlement(owner_id=owner_id)
 
     # Create installation record in Supabase
     supabase_manager.create_installation(
@@ -53,10 +56,10 @@ async def handle_installation_created(payload: GitHubInstallationPayload) -> Non
     )
 
     # Add issue templates to the repositories
-    for i, full_name in enumerate(iterable=repo_full_names, start=1):
-        print(f"\nAdding issue templates ({i}/{len(repo_full_names)}): {full_name}")
-        # turn_on_issue(full_name=full_name, token=token)
-        add_issue_templates(full_name=full_name, installer_name=user_name, token=token)
+    # turn_on_issue(full_name=full_name, token=token)
+    add_issue_templates_to_repos(
+        full_names=repo_full_names, installer_name=user_name, token=token
+    )
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -64,6 +67,7 @@ async def handle_installation_deleted(payload: GitHubInstallationPayload) -> Non
     """Soft deletes installation record on GitAuto APP installation"""
     installation_id: int = payload["installation"]["id"]
     supabase_manager.delete_installation(installation_id=installation_id)
+    invalidate_entitlement(owner_id=payload["installation"]["account"]["id"])
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=False)
@@ -74,11 +78,10 @@ async def handle_installation_repos_added(payload) -> None:
     ]
     sender_name: str = payload["sender"]["login"]
     token: str = get_installation_access_token(installation_id=installation_id)
-    for full_name in repo_full_names:
-        # turn_on_issue(full_name=full_name, token=token)
-        add_issue_templates(
-            full_name=full_name, installer_name=sender_name, token=token
-        )
+    # turn_on_issue(full_name=full_name, token=token)
+    add_issue_templates_to_repos(
+        full_names=repo_full_names, installer_name=sender_name, token=token
+    )
 
 
 @handle_exceptions(default_return_value=None, raise_on_error=True)
@@ -97,6 +100,14 @@ async def handle_webhook_event(event_name: str, payload: dict[str, Any]) -> None
     #     print("Marketplace purchase is triggered")
     #     await handle_installation_created(payload=payload)
 
+    # A purchase, a plan change, or a cancellation changes the entitlement of the account
+    # See https://docs.github.com/en/webhooks/webhook-events-and-payloads#marketplace_purchase
+    if event_name == "marketplace_purchase":
+        invalidate_entitlement(
+            owner_id=payload["marketplace_purchase"]["account"]["id"]
+        )
+        return
+
     # See https://docs.github.com/en/webhooks/webhook-events-and-payloads#installation
     if event_name == "installation" and action in ("created"):
         print("Installation is created")
@@ -143,8 +154,21 @@ async def handle_webhook_event(event_name: str, payload: dict[str, Any]) -> None
     # See https://docs.github.com/en/webhooks/webhook-events-and-payloads#check_run
     if event_name == "check_run" and action in ("completed"):
         conclusion: str = payload["check_run"]["conclusion"]
-        if conclusion in GITHUB_CHECK_RUN_FAILURES:
-            handle_check_run(payload=payload)
+        if conclusion not in GITHUB_CHECK_RUN_FAILURES:
+            return
+
+        # Drop events that handle_check_run would skip anyway by the payload alone, before any external call
+        if payload["sender"]["login"] != GITHUB_APP_USER_NAME:
+            return
+        if not payload["check_run"].get("pull_requests"):
+            return
+
+        # Then drop failures from free-tier owners before minting a token or calling GitHub. The plan is cached per owner, so bursts of CI failures cost little.
+        owner_id: int = payload["repository"]["owner"]["id"]
+        if not is_paid_owner(owner_id=owner_id):
+            print(f"Skipping check_run because owner {owner_id} is in free tier")
+            return
+        handle_check_run(payload=payload)
         return
 
     # Track merged PRs as this is also our success status
@@ -0,0 +1,15 @@
+-- Ledger of check run repair attempts to avoid infinite loops. See services/supabase/check_run_attempts_manager.py
+-- has_check_run_attempt() matches any head SHA, which the unique index answers by its prefix
+create table if not exists check_run_attempts (
+    id bigint generated always as identity primary key,
+    owner text not null,
+    repo text not null,
+    pull_number bigint not null,
+    check_run_name text not null,
+    head_sha text not null,
+    created_at timestamptz not null default now(),
+    unique (owner, repo, pull_number, check_run_name, head_sha)
+);
+
+-- Only the service role used by the app reads and writes the ledger
+alter table check_run_attempts enable row level security;
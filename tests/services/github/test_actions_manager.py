@@ -0,0 +1,90 @@
+from services.github import actions_manager
+
+JOB_LOG = """2024-10-18T23:27:38.1000000Z Current runner version: '2.320.0'
+2024-10-18T23:27:39.1000000Z ##[group]Run actions/checkout@v4
+2024-10-18T23:27:39.2000000Z Syncing repository
+2024-10-18T23:27:39.3000000Z ##[endgroup]
+2024-10-18T23:27:40.1000000Z ##[group]Run pytest
+2024-10-18T23:27:40.2000000Z pytest -q
+2024-10-18T23:27:40.3000000Z ##[endgroup]
+2024-10-18T23:27:40.6602932Z FAILED tests/test_main.py::test_main
+2024-10-18T23:27:40.7000000Z ##[error]Process completed with exit code 1.
+2024-10-18T23:27:41.1000000Z ##[group]Run actions/upload-artifact@v4
+2024-10-18T23:27:41.2000000Z Uploading
+2024-10-18T23:27:41.3000000Z ##[endgroup]"""
+
+
+def test_slice_failed_step_log():
+    assert actions_manager.slice_failed_step_log(log=JOB_LOG) == "\n".join(
+        [
+            "##[group]Run pytest",
+            "pytest -q",
+            "##[endgroup]",
+            "FAILED tests/test_main.py::test_main",
+            "##[error]Process completed with exit code 1.",
+        ]
+    )
+
+
+def test_get_workflow_run_logs_fetches_failed_jobs_only(monkeypatch):
+    jobs = [
+        {
+            "id": 1,
+            "name": "test (3.11)",
+            "conclusion": "failure",
+            "steps": [{"number": 3, "name": "Run pytest", "conclusion": "failure"}],
+        },
+        {
+            "id": 2,
+            "name": "test (3.12)",
+            "conclusion": "failure",
+            "steps": [{"number": 3, "name": "Run pytest", "conclusion": "failure"}],
+        },
+    ]
+    fetched = []
+
+    def fake_get_job_log(owner, repo, job_id, token):
+        fetched.append(job_id)
+        return JOB_LOG
+
+    monkeypatch.setattr(actions_manager, "get_failed_jobs", lambda **kwargs: jobs)
+    monkeypatch.setattr(actions_manager, "get_job_log", fake_get_job_log)
+
+    logs = actions_manager.get_workflow_run_logs(
+        owner="owner", repo="repo", run_id=1, token="token"
+    )
+
+    assert sorted(fetched) == [1, 2]
+    assert (
+        "```GitHub Check Run Log: test (3.11)/3_Run pytest\n##[group]Run pytest" in logs
+    )
+    assert "```GitHub Check Run Log: test (3.12)/3_Run pytest" in logs
+    assert "Uploading" not in logs
+
+
+def test_get_failed_jobs_uses_cancelled_jobs_only_without_failures(monkeypatch):
+    conclusions: list[str] = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {
+                "jobs": [
+                    {"id": i, "conclusion": conclusion}
+                    for i, conclusion in enumerate(conclusions)
+                ]
+            }
+
+    monkeypatch.setattr(
+        actions_manager, "get_with_etag", lambda **kwargs: FakeResponse()
+    )
+    args = {"owner": "owner", "repo": "repo", "run_id": 1, "token": "token"}
+
+    conclusions[:] = ["success", "failure", "cancelled", "timed_out", "skipped"]
+    assert [job["id"] for job in actions_manager.get_failed_jobs(**args)] == [1, 3]
+    conclusions[:] = ["success", "cancelled", "skipped"]
+    assert [job["id"] for job in actions_manager.get_failed_jobs(**args)] == [1]
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from services.github import comment_updater
+from services.github.comment_updater import ProgressCommentUpdater
+
+
+def test_progress_comment_updater_coalesces_updates(monkeypatch):
+    sent: list[str] = []
+    flushed = threading.Event()
+
+    def fake_send(self, body: str):
+        sent.append(body)
+        flushed.set()
+        return {"body": body}
+
+    monkeypatch.setattr(ProgressCommentUpdater, "send", fake_send)
+    updater = ProgressCommentUpdater(comment_url="url", token="token", interval=0.2)
+    # Start within the interval of a previous PATCH so that the first update doesn't flush right away
+    updater.flushed_at = time.monotonic()
+
+    for i in range(5):
+        updater.update(body=f"progress {i}")
+    assert flushed.wait(timeout=2)
+    assert sent == ["progress 4"]
+    assert updater.coalesced == 4
+
+
+def test_progress_comment_updater_finish_supersedes_pending(monkeypatch):
+    sent: list[str] = []
+    monkeypatch.setattr(
+        ProgressCommentUpdater, "send", lambda self, body: sent.append(body)
+    )
+    updater = comment_updater.get_progress_updater(comment_url="url", token="token")
+    # Keep the progress update pending as if a PATCH was just sent
+    updater.interval = 60.0
+    updater.flushed_at = time.monotonic()
+    updater.update(body="progress")
+
+    comment_updater.finish_progress_updater(comment_url="url", token="token", body="done")
+
+    assert sent == ["done"]
+    assert "url" not in comment_updater.progress_updaters
@@ -0,0 +1,126 @@
+import pytest
+import requests
+
+from services.github import commit_manager
+from services.github.tree_index import TreeIndex
+
+BASE_ARGS = {"owner": "o", "repo": "r", "token": "token", "new_branch": "b"}
+
+
+class FakeGitHub:
+    """Records the Git Data API calls of commit_staged_changes()."""
+
+    def __init__(self, fail_ref_update: bool = False):
+        self.fail_ref_update = fail_ref_update
+        self.blobs: list[str] = []
+        self.trees: list[dict] = []
+        self.commits: list[dict] = []
+        self.refs: list[str] = []
+
+    def install(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        base_tree = TreeIndex.from_tree(
+            tree_sha="base_tree",
+            tree=[
+                {"path": "run.sh", "sha": "s1", "mode": "100755", "type": "blob"},
+                {"path": "main.py", "sha": "s2", "mode": "100644", "type": "blob"},
+            ],
+        )
+        monkeypatch.setattr(
+            commit_manager,
+            "get_branch_head",
+            lambda base_args: ("parent_sha", "base_tree"),
+        )
+        monkeypatch.setattr(
+            commit_manager, "load_tree_index", lambda tree_sha, base_args: base_tree
+        )
+        monkeypatch.setattr(commit_manager, "create_blob", self.create_blob)
+        monkeypatch.setattr(commit_manager, "create_tree", self.create_tree)
+        monkeypatch.setattr(commit_manager, "create_commit", self.create_commit)
+        monkeypatch.setattr(commit_manager, "update_branch_ref", self.update_branch_ref)
+
+    def create_blob(self, content: str, base_args):
+        self.blobs.append(content)
+        return f"blob{len(self.blobs)}"
+
+    def create_tree(self, base_tree: str, tree: list[dict], base_args):
+        self.trees.append({"base_tree": base_tree, "tree": tree})
+        return "new_tree"
+
+    def create_commit(self, message: str, tree_sha: str, parent: str, base_args):
+        self.commits.append({"message": message, "tree": tree_sha, "parent": parent})
+        return "new_commit"
+
+    def update_branch_ref(self, sha: str, base_args):
+        if self.fail_ref_update:
+            raise requests.exceptions.ConnectionError("connection reset")
+        self.refs.append(sha)
+
+
+def test_commit_staged_changes_returns_none_without_staged_changes(monkeypatch):
+    github = FakeGitHub()
+    github.install(monkeypatch=monkeypatch)
+    base_args = dict(BASE_ARGS)
+    assert commit_manager.commit_staged_changes(base_args=base_args) is None
+    base_args["staged_changes"] = {}
+    assert commit_manager.commit_staged_changes(base_args=base_args) is None
+    assert not github.blobs and not github.commits
+
+
+def test_commit_staged_changes_keeps_file_modes(monkeypatch):
+    github = FakeGitHub()
+    github.install(monkeypatch=monkeypatch)
+    base_args = dict(BASE_ARGS)
+    commit_manager.stage_file_change(
+        file_path="run.sh", content="echo 1\n", base_args=base_args
+    )
+    commit_manager.stage_file_change(
+        file_path="new.py", content="x = 1\n", base_args=base_args
+    )
+
+    assert commit_manager.commit_staged_changes(base_args=base_args) == "new_commit"
+    assert github.trees == [
+        {
+            "base_tree": "base_tree",
+            "tree": [
+                {"path": "run.sh", "mode": "100755", "type": "blob", "sha": "blob1"},
+                {"path": "new.py", "mode": "100644", "type": "blob", "sha": "blob2"},
+            ],
+        }
+    ]
+    assert github.refs == ["new_commit"]
+    assert not base_args["staged_changes"]
+
+
+def test_commit_staged_changes_combines_messages(monkeypatch):
+    github = FakeGitHub()
+    github.install(monkeypatch=monkeypatch)
+    base_args = dict(BASE_ARGS)
+    commit_manager.stage_file_change(
+        file_path="main.py", content="a", base_args=base_args, message="Fix main"
+    )
+    commit_manager.stage_file_change(
+        file_path="run.sh", content="b", base_args=base_args
+    )
+
+    commit_manager.commit_staged_changes(base_args=base_args)
+    assert github.commits == [
+        {
+            "message": "Update 2 files\n\n- Fix main\n- Update run.sh",
+            "tree": "new_tree",
+            "parent": "parent_sha",
+        }
+    ]
+
+
+def test_commit_staged_changes_keeps_changes_when_ref_update_fails(monkeypatch):
+    github = FakeGitHub(fail_ref_update=True)
+    github.install(monkeypatch=monkeypatch)
+    base_args = dict(BASE_ARGS)
+    commit_manager.stage_file_change(
+        file_path="main.py", content="a", base_args=base_args
+    )
+
+    assert commit_manager.commit_staged_changes(base_args=base_args) is None
+    assert base_args["staged_changes"] == {
+        "main.py": {"content": "a", "message": "Update main.py"}
+    }
@@ -0,0 +1,105 @@
+import json
+
+import requests
+
+from services.github import file_fetcher
+from services.github.tree_index import TreeIndex
+
+BASE_ARGS = {"owner": "o", "repo": "r", "token": "token"}
+
+
+def create_index() -> TreeIndex:
+    tree = [
+        {"path": "small.py", "sha": "s1", "size": 10, "mode": "100644", "type": "blob"},
+        {
+            "path": "big.csv",
+            "sha": "s2",
+            "size": 5_000_000,
+            "mode": "100644",
+            "type": "blob",
+        },
+        {"path": "src", "sha": "t1", "mode": "040000", "type": "tree"},
+    ]
+    return TreeIndex.from_tree(tree_sha="t0", tree=tree)
+
+
+def create_response(content: bytes, content_type: str, status_code: int = 200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = content_type
+    response._content = content
+    return response
+
+
+def test_fetch_file_fetches_blobs_by_sha_and_caches(monkeypatch):
+    blobs = []
+    cached = {}
+    monkeypatch.setattr(
+        file_fetcher, "get_tree_index", lambda ref, base_args: create_index()
+    )
+    monkeypatch.setattr(
+        file_fetcher,
+        "get_with_etag",
+        lambda **kwargs: (_ for _ in ()).throw(AssertionError("no request expected")),
+    )
+    monkeypatch.setattr(
+        file_fetcher,
+        "get_blob_content",
+        lambda sha, base_args: blobs.append(sha) or f"content of {sha}".encode(),
+    )
+    monkeypatch.setattr(file_fetcher, "get_cached_blob", lambda sha: cached.get(sha))
+    monkeypatch.setattr(
+        file_fetcher, "cache_blob", lambda sha, content: cached.update({sha: content})
+    )
+
+    for _ in range(2):
+        assert (
+            file_fetcher.fetch_file(
+                file_path="small.py", ref="main", base_args=BASE_ARGS
+            )
+            == b"content of s1"
+        )
+    assert (
+        file_fetcher.fetch_file(
+            file_path="big.csv", ref="main", base_args=BASE_ARGS, index=create_index()
+        )
+        == b"content of s2"
+    )
+    assert blobs == ["s1", "s2"]
+    assert cached == {"s1": b"content of s1", "s2": b"content of s2"}
+
+
+def test_fetch_file_lists_directories_and_returns_none_for_404(monkeypatch):
+    def fake_get_with_etag(url, headers, params=None, scope="", timeout=0):
+        if url.endswith("/src"):
+            listing = [{"path": "src/main.py", "type": "file"}]
+            return create_response(
+                json.dumps(listing).encode(), "application/json; charset=utf-8"
+            )
+        return create_response(b"", "application/json", status_code=404)
+
+    monkeypatch.setattr(
+        file_fetcher, "get_tree_index", lambda ref, base_args: create_index()
+    )
+    monkeypatch.setattr(file_fetcher, "get_with_etag", fake_get_with_etag)
+
+    assert file_fetcher.fetch_file(
+        file_path="src", ref="main", base_args=BASE_ARGS
+    ) == ["src/main.py"]
+    assert (
+        file_fetcher.fetch_file(file_path="missing.py", ref="main", base_args=BASE_ARGS)
+        is None
+    )
+
+
+def test_get_gitattributes_skips_request_without_file(monkeypatch):
+    monkeypatch.setattr(
+        file_fetcher,
+        "get_blob_content",
+        lambda **kwargs: (_ for _ in ()).throw(AssertionError("no request expected")),
+    )
+    assert (
+        file_fetcher.get_gitattributes(index=create_index(), base_args=BASE_ARGS)
+        is None
+    )
+    assert file_fetcher.get_gitattributes(index=None, base_args=BASE_ARGS) is None
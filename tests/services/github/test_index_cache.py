@@ -0,0 +1,22 @@
+from services.github import index_cache
+from utils.lru_cache import SizedLRUCache
+
+
+def test_index_cache_evicts_least_recently_used_indexes(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        index_cache,
+        "index_cache",
+        SizedLRUCache(max_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=100),
+    )
+    data = {"paths": ["a" * 30]}
+    index_cache.write_index(kind="tree", tree_sha="t1", data=data)
+    index_cache.write_index(kind="symbol", tree_sha="t1", data=data)
+    assert index_cache.read_index(kind="tree", tree_sha="t1") == data
+    index_cache.write_index(kind="lexical", tree_sha="t1", data=data)
+
+    assert index_cache.read_index(kind="symbol", tree_sha="t1") is None
+    assert index_cache.read_index(kind="tree", tree_sha="t1") == data
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "lexical-t1.json",
+        "tree-t1.json",
+    ]
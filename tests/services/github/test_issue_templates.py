@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+
+import requests
+
+from services.github import commit_manager, github_manager
+
+
+def test_add_issue_templates_to_repos_runs_concurrently(monkeypatch):
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def fake_add_issue_templates(
+        full_name: str, installer_name: str, token: str, missing_templates: list[str]
+    ):
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        if full_name == "owner/broken":
+            return None
+        if full_name == "owner/done":
+            return []
+        return ["bug_report.yml"]
+
+    monkeypatch.setattr(github_manager, "add_issue_templates", fake_add_issue_templates)
+    monkeypatch.setattr(
+        github_manager,
+        "get_missing_issue_templates",
+        lambda full_names, token: {
+            full_name: ["bug_report.yml"]
+            for full_name in full_names
+            if full_name != "owner/skipped"
+        },
+    )
+    monkeypatch.setattr(github_manager, "MAX_ISSUE_TEMPLATE_WORKERS", 2)
+    full_names = ["owner/a", "owner/b", "owner/broken", "owner/done", "owner/skipped"]
+
+    results = github_manager.add_issue_templates_to_repos(
+        full_names=full_names, installer_name="installer", token="token"
+    )
+
+    assert results == {
+        "owner/a": ["bug_report.yml"],
+        "owner/b": ["bug_report.yml"],
+        "owner/broken": None,
+        "owner/done": [],
+        "owner/skipped": [],
+    }
+    assert max_active == 2
+
+
+def test_get_missing_issue_templates_batches_repos(monkeypatch):
+    requests_sent = []
+
+    def fake_github_request(method, url, headers, **kwargs):
+        requests_sent.append(kwargs["json"])
+        response = requests.Response()
+        response.status_code = 200
+        data = {
+            "r0": {"object": {"entries": [{"name": "bug_report.yml"}]}},
+            "r1": {
+                "object": {
+                    "entries": [
+                        {"name": "bug_report.yml"},
+                        {"name": "feature_request.yml"},
+                    ]
+                }
+            },
+            "r2": {"object": None},  # No ISSUE_TEMPLATE directory
+            "r3": None,  # Not accessible
+        }
+        response._content = json.dumps({"data": data}).encode()
+        return response
+
+    monkeypatch.setattr(github_manager, "github_request", fake_github_request)
+    full_names = ["owner/partial", "owner/complete", "owner/empty", "owner/private"]
+
+    missing = github_manager.get_missing_issue_templates(
+        full_names=full_names, token="token"
+    )
+
+    assert len(requests_sent) == 1
+    assert requests_sent[0]["variables"]["name3"] == "private"
+    assert missing == {
+        "owner/partial": ["feature_request.yml"],
+        "owner/empty": ["bug_report.yml", "feature_request.yml"],
+        "owner/private": ["bug_report.yml", "feature_request.yml"],
+    }
+
+
+def test_add_issue_templates_commits_missing_templates_at_once(monkeypatch):
+    calls = []
+
+    def create_response(data, status_code=200):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps(data).encode()
+        return response
+
+    def fake_get_with_etag(url, headers, params=None, scope="", timeout=0):
+        calls.append(("GET", url.removeprefix("https://api.github.com")))
+        if url.endswith("/repos/owner/repo"):
+            return create_response({"default_branch": "main"})
+        if url.endswith("/branches/main"):
+            commit = {"sha": "c1", "commit": {"tree": {"sha": "t1"}}}
+            return create_response({"commit": commit})
+        return create_response({}, status_code=404)
+
+    def fake_github_request(method, url, headers, **kwargs):
+        calls.append((method, url.removeprefix("https://api.github.com")))
+        if url.endswith("/git/trees"):
+            assert kwargs["json"]["base_tree"] == "t1"
+            assert len(kwargs["json"]["tree"]) == 1
+            return create_response({"sha": "t2"})
+        if url.endswith("/git/commits"):
+            assert kwargs["json"]["parents"] == ["c1"]
+            return create_response({"sha": "c2"})
+        if url.endswith("/git/refs"):
+            assert kwargs["json"]["sha"] == "c2"
+            return create_response({}, status_code=201)
+        return create_response({"number": 1, "html_url": "https://github.com/pr"})
+
+    monkeypatch.setattr(github_manager, "get_with_etag", fake_get_with_etag)
+    monkeypatch.setattr(github_manager, "github_request", fake_github_request)
+    monkeypatch.setattr(commit_manager, "github_request", fake_github_request)
+    monkeypatch.setattr(github_manager, "add_reviewers", lambda base_args: None)
+
+    added = github_manager.add_issue_templates(
+        full_name="owner/repo",
+        installer_name="installer",
+        token="token",
+        missing_templates=["feature_request.yml"],
+    )
+
+    assert added == ["feature_request.yml"]
+    assert [method for method, _ in calls] == ["GET", "GET", "POST", "POST", "POST", "POST"]
+    assert calls[-1] == ("POST", "/repos/owner/repo/pulls")
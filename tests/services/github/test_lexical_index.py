@@ -0,0 +1,89 @@
+from services.github import index_cache, lexical_index
+from services.github.lexical_index import LexicalIndex, tokenize
+from services.github.tree_index import TreeIndex
+from utils.lru_cache import SizedLRUCache
+
+BASE_ARGS = {"owner": "o", "repo": "r", "token": "token", "new_branch": "main"}
+FILES = {
+    "src/auth/login_handler.py": "def handle_login(user):\n    check_password(user)\n    return create_session(user)\n",
+    "src/billing/invoice.py": "def create_invoice(customer):\n    return Invoice(customer)\n",
+    "docs/setup.md": "# Setup\n\nInstall the dependencies and run the server.\n",
+    "src/session.py": "def create_session(user):\n    return Session(user)\n",
+}
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize(text="getUserName in HTTPServer_v2") == [
+        "getusername",
+        "get",
+        "user",
+        "name",
+        "httpserver_v2",
+        "http",
+        "server",
+    ]
+
+
+def test_lexical_index_ranks_paths_and_contents():
+    index = LexicalIndex.from_files(tree_sha="t0", files=FILES)
+
+    top = index.search(query="Login fails when the password is wrong")
+    assert top[0][0] == "src/auth/login_handler.py"
+    assert [path for path, _ in index.search(query="invoice for customers")] == [
+        "src/billing/invoice.py"
+    ]
+    assert index.search(query="nothing matches here") == []
+
+    restored = LexicalIndex.from_dict(data=index.to_dict())
+    assert restored.search(query="create session") == index.search(
+        query="create session"
+    )
+
+
+def test_find_relevant_files_shows_snippets(monkeypatch, tmp_path):
+    downloads = []
+
+    def fake_download(commit_sha, base_args, is_wanted, cancel):
+        downloads.append(commit_sha)
+        return FILES
+
+    monkeypatch.setattr(
+        index_cache,
+        "index_cache",
+        SizedLRUCache(max_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=1 << 20),
+    )
+    monkeypatch.setattr(
+        lexical_index, "lexical_indexes", type(lexical_index.lexical_indexes)()
+    )
+    monkeypatch.setattr(
+        lexical_index, "resolve_commit_sha", lambda ref, base_args: "c0"
+    )
+    monkeypatch.setattr(
+        lexical_index,
+        "get_tree_index",
+        lambda ref, base_args: TreeIndex.from_tree(tree_sha="t2", tree=[]),
+    )
+    monkeypatch.setattr(lexical_index, "download_text_files", fake_download)
+    fetched = []
+
+    def fake_fetch_file(file_path, ref, base_args):
+        fetched.append(file_path)
+        return FILES[file_path].encode()
+
+    monkeypatch.setattr(lexical_index, "fetch_file", fake_fetch_file)
+
+    result = lexical_index.find_relevant_files(
+        query="Invoice total is wrong", ref="main", base_args=BASE_ARGS
+    )
+    assert "## src/billing/invoice.py (score " in result
+    assert (
+        "```src/billing/invoice.py\n1: def create_invoice(customer):\n2:     return Invoice(customer)\n3: \n```"
+        in result
+    )
+    # The files read while building the index are not downloaded again
+    assert not fetched
+    lexical_index.find_relevant_files(query="invoice", ref="main", base_args=BASE_ARGS)
+    assert fetched == ["src/billing/invoice.py"]
+    assert downloads == ["c0"]
+    assert (tmp_path / "lexical-t2.json").exists()
+    assert not lexical_index.build_locks
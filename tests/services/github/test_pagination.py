@@ -0,0 +1,58 @@
+import json
+import threading
+
+import requests
+
+from services.github import pagination
+
+URL = "https://api.github.com/repos/o/r/issues/1/comments"
+
+
+def create_page(url: str, page: int, last_page: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    if page == 1:
+        response.headers["Link"] = (
+            f'<{URL}?per_page=100&page=2>; rel="next", '
+            f'<{URL}?per_page=100&page={last_page}>; rel="last"'
+        )
+    response._content = json.dumps([{"page": page}]).encode()
+    return response
+
+
+def test_get_all_pages_fetches_remaining_pages_concurrently(monkeypatch):
+    requested: list[str] = []
+    lock = threading.Lock()
+
+    def fake_get_with_etag(url, headers, params=None, scope="", timeout=0):
+        with lock:
+            requested.append(url)
+        page = int(url.rsplit("page=", 1)[1]) if "page=" in url else 1
+        return create_page(url=url, page=page, last_page=5)
+
+    monkeypatch.setattr(pagination, "get_with_etag", fake_get_with_etag)
+
+    items = pagination.get_all_pages(url=URL, headers={})
+
+    assert [item["page"] for item in items] == [1, 2, 3, 4, 5]
+    assert len(requested) == 5
+    assert f"{URL}?per_page=100&page=5" in requested
+
+
+def test_iter_pages_stops_early(monkeypatch):
+    requested: list[str] = []
+
+    def fake_get_with_etag(url, headers, params=None, scope="", timeout=0):
+        requested.append(url)
+        page = int(url.rsplit("page=", 1)[1]) if "page=" in url else 1
+        return create_page(url=url, page=page, last_page=50)
+
+    monkeypatch.setattr(pagination, "get_with_etag", fake_get_with_etag)
+
+    pages = pagination.iter_pages(url=URL, headers={}, max_workers=2)
+    assert next(pages) == [{"page": 1}]
+    assert next(pages) == [{"page": 2}]
+    pages.close()
+
+    assert len(requested) <= 4
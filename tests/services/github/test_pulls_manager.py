@@ -0,0 +1,89 @@
+import requests
+
+from services.github import pagination, pulls_manager
+
+DIFF = """diff --git a/main.py b/main.py
+index 1111111..2222222 100644
+--- a/main.py
++++ b/main.py
+@@ -1,2 +1,2 @@
+-print("a")
++print("b")
+ x = 1
+diff --git a/new.txt b/new.txt
+new file mode 100644
+index 0000000..3333333
+--- /dev/null
++++ b/new.txt
+@@ -0,0 +1 @@
++hello
+diff --git a/old.txt b/old.txt
+deleted file mode 100644
+index 4444444..0000000
+--- a/old.txt
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+diff --git a/logo.png b/logo.png
+index 5555555..6666666 100644
+Binary files a/logo.png and b/logo.png differ
+diff --git a/a.py b/b.py
+similarity index 90%
+rename from a.py
+rename to b.py
+index 7777777..8888888 100644
+--- a/a.py
++++ b/b.py
+@@ -1 +1 @@
+-a = 1
++b = 1
+"""
+
+
+def test_iter_diff_files():
+    files = list(pulls_manager.iter_diff_files(diff=DIFF))
+    assert [(f.filename, f.status) for f in files] == [
+        ("main.py", "modified"),
+        ("new.txt", "added"),
+        ("old.txt", "removed"),
+        ("b.py", "renamed"),
+    ]
+    assert files[0].patch == '@@ -1,2 +1,2 @@\n-print("a")\n+print("b")\n x = 1'
+
+
+def test_get_pull_request_files_falls_back_to_paging(monkeypatch):
+    requested = []
+
+    def fake_get_with_etag(url, headers, params=None, scope="", timeout=0):
+        requested.append((url, headers["Accept"]))
+        response = requests.Response()
+        response.url = url
+        if headers["Accept"] == "application/vnd.github.diff":
+            response.status_code = 406
+            return response
+        response.status_code = 200
+        page = 2 if url.endswith("page=2") else 1
+        if page == 1:
+            response.headers["Link"] = f'<{url}?per_page=100&page=2>; rel="next"'
+        response._content = (
+            b'[{"filename": "f%d.py", "status": "modified", "patch": "@@"}]' % page
+        )
+        return response
+
+    monkeypatch.setattr(pulls_manager, "get_with_etag", fake_get_with_etag)
+    monkeypatch.setattr(pagination, "get_with_etag", fake_get_with_etag)
+    url = "https://api.github.com/repos/o/r/pulls/1"
+
+    files = pulls_manager.get_pull_request_files(url=f"{url}/files", token="token")
+
+    assert [f["filename"] for f in files] == ["f1.py", "f2.py"]
+    assert requested[0] == (url, "application/vnd.github.diff")
+    assert len(requested) == 3  # The diff, then two pages without an empty one
+
+
+def test_format_pull_request_files():
+    files = [file._asdict() for file in pulls_manager.iter_diff_files(diff=DIFF)]
+    text = pulls_manager.format_pull_request_files(files=files)
+    assert text.startswith("main.py (modified)\n@@")
+    assert "\n\nnew.txt (added)\n@@" in text
+    assert '\\"' not in text
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+import requests
+
+from services.github import rate_limiter
+from services.github.rate_limiter import RateLimitGovernor, TokenBucket, get_resource
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=100, capacity=2)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() > 0
+
+
+def test_token_bucket_sync_waits_until_reset_when_exhausted():
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.sync(remaining=0, limit=5000, reset_ts=int(time.time()) + 100)
+
+    with bucket.lock:
+        bucket.refill()
+        assert bucket.tokens < 1
+        assert 1 / bucket.rate > 50
+
+
+def test_governor_shares_buckets_per_installation():
+    governor = RateLimitGovernor()
+    governor.register_token(token="token-1", installation_id=1)
+    governor.register_token(token="token-2", installation_id=1)
+
+    scope_1 = governor.get_scope(headers={"Authorization": "Bearer token-1"})
+    scope_2 = governor.get_scope(headers={"Authorization": "Bearer token-2"})
+    assert scope_1 == scope_2 == "installation/1"
+
+    response = requests.Response()
+    response.request = requests.Request(
+        method="GET",
+        url="https://api.github.com",
+        headers={"Authorization": "Bearer token-2"},
+    ).prepare()
+    response.headers["X-RateLimit-Remaining"] = "42"
+    response.headers["X-RateLimit-Limit"] = "5000"
+    response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 600)
+    governor.after_response(response=response)
+
+    assert governor.get_bucket(scope=scope_1, resource="core").tokens == 42
+
+
+def test_get_resource():
+    assert get_resource(url="https://api.github.com/search/code") == "code_search"
+    assert get_resource(url="https://api.github.com/search/issues") == "search"
+    assert get_resource(url="https://api.github.com/repos/o/r/pulls") == "core"
+
+
+def test_token_bucket_fails_fast_when_wait_exceeds_deadline(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "get_remaining_time", lambda: 30.0)
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.sync(remaining=0, limit=5000, reset_ts=int(time.time()) + 3600)
+
+    # Concurrent callers don't push the bucket further into debt
+    for _ in range(3):
+        with pytest.raises(rate_limiter.RateLimitWaitTooLongError):
+            bucket.acquire()
+    assert bucket.tokens > -1
@@ -0,0 +1,176 @@
+import io
+import tarfile
+import threading
+
+import pytest
+
+from services.github import index_cache, symbol_index, tarball
+from services.github.symbol_index import SymbolIndex
+from services.github.tree_index import TreeIndex
+from utils.lru_cache import SizedLRUCache
+
+BASE_ARGS = {"owner": "o", "repo": "r", "token": "token", "new_branch": "main"}
+FILES = {
+    "src/service.py": "class UserService:\n    def get_user(self, user_id):\n        return load(user_id)\n",
+    "src/api.ts": "export function load(id: string) {\n  return id;\n}\n",
+    "src/main.py": "from service import UserService\n\nUserService().get_user(1)\n",
+}
+
+
+def create_tarball(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, content in files.items():
+            info = tarfile.TarInfo(name=f"o-r-abc1234/{path}")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.raw = io.BytesIO(content)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+def test_symbol_index_finds_definitions_and_references():
+    index = SymbolIndex.from_files(tree_sha="t0", files=FILES)
+
+    assert index.find_definitions(name="UserService") == [
+        ("src/service.py", 1, 3, "class")
+    ]
+    assert index.find_definitions(name="get_user") == [
+        ("src/service.py", 2, 3, "method")
+    ]
+    assert index.find_references(name="UserService") == {
+        "src/main.py": [1, 3],
+        "src/service.py": [1],
+    }
+    assert index.find_references(name="load") == {
+        "src/api.ts": [1],
+        "src/service.py": [3],
+    }
+
+    restored = SymbolIndex.from_dict(data=index.to_dict())
+    assert restored.find_references(name="load") == index.find_references(name="load")
+
+
+def test_download_source_files_keeps_only_source_text(monkeypatch):
+    archive = create_tarball(
+        files={
+            "src/service.py": FILES["src/service.py"].encode(),
+            "README.md": b"# Title",
+            "web/app.min.js": b"var a=1;",
+            "bin/tool.py": b"\x00\x01",
+        }
+    )
+    monkeypatch.setattr(
+        tarball, "github_request", lambda **kwargs: FakeResponse(archive)
+    )
+    files = symbol_index.download_source_files(commit_sha="c0", base_args=BASE_ARGS)
+    assert files == {"src/service.py": FILES["src/service.py"]}
+
+
+def test_find_definition_builds_index_once_per_tree(monkeypatch, tmp_path):
+    downloads = []
+
+    def fake_download(commit_sha, base_args):
+        downloads.append(commit_sha)
+        return FILES
+
+    monkeypatch.setattr(
+        index_cache,
+        "index_cache",
+        SizedLRUCache(max_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=1 << 20),
+    )
+    monkeypatch.setattr(
+        symbol_index, "symbol_indexes", type(symbol_index.symbol_indexes)()
+    )
+    monkeypatch.setattr(symbol_index, "resolve_commit_sha", lambda ref, base_args: "c0")
+    monkeypatch.setattr(
+        symbol_index,
+        "get_tree_index",
+        lambda ref, base_args: TreeIndex.from_tree(tree_sha="t1", tree=[]),
+    )
+    monkeypatch.setattr(symbol_index, "download_source_files", fake_download)
+
+    result = symbol_index.find_definition(
+        name="UserService.get_user", base_args=BASE_ARGS
+    )
+    assert (
+        result
+        == "1 definitions of 'UserService.get_user' found:\n- src/service.py#L2-L3 (method)"
+    )
+    result = symbol_index.find_references(name="load", base_args=BASE_ARGS)
+    assert (
+        result
+        == "2 references to 'load' found in 2 files:\n- src/api.ts: L1\n- src/service.py: L3"
+    )
+    assert downloads == ["c0"]
+    assert (tmp_path / "symbol-t1.json").exists()
+    assert not symbol_index.build_locks
+
+
+def test_find_definition_skips_trees_over_budget(monkeypatch):
+    tree = [
+        {
+            "path": "src/service.py",
+            "sha": "s1",
+            "size": 100,
+            "mode": "100644",
+            "type": "blob",
+        }
+    ]
+    monkeypatch.setattr(tarball, "MAX_TARBALL_WANTED_FILES", 0)
+    monkeypatch.setattr(
+        symbol_index, "read_symbol_index_from_disk", lambda tree_sha: None
+    )
+    monkeypatch.setattr(symbol_index, "resolve_commit_sha", lambda ref, base_args: "c0")
+    monkeypatch.setattr(
+        symbol_index,
+        "get_tree_index",
+        lambda ref, base_args: TreeIndex.from_tree(tree_sha="t3", tree=tree),
+    )
+    monkeypatch.setattr(
+        symbol_index,
+        "download_source_files",
+        lambda **kwargs: (_ for _ in ()).throw(AssertionError("no download expected")),
+    )
+
+    result = symbol_index.find_definition(name="UserService", base_args=BASE_ARGS)
+    assert result.startswith("The symbol index is unavailable for this repository")
+    assert not symbol_index.build_locks
+
+
+def test_download_text_files_stops_at_the_deadline(monkeypatch):
+    archive = create_tarball(files={"src/service.py": b"x = 1\n"})
+    monkeypatch.setattr(
+        tarball, "github_request", lambda **kwargs: FakeResponse(archive)
+    )
+    monkeypatch.setattr(tarball, "get_remaining_time", lambda: 0.0)
+    with pytest.raises(tarball.TarballDeadlineError):
+        symbol_index.download_source_files(commit_sha="c0", base_args=BASE_ARGS)
+
+
+def test_download_text_files_stops_once_cancelled(monkeypatch):
+    archive = create_tarball(files={"src/service.py": b"x = 1\n"})
+    monkeypatch.setattr(
+        tarball, "github_request", lambda **kwargs: FakeResponse(archive)
+    )
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(tarball.TarballCancelledError):
+        tarball.download_text_files(
+            commit_sha="c0",
+            base_args=BASE_ARGS,
+            is_wanted=lambda _: True,
+            cancel=cancel,
+        )
@@ -0,0 +1,33 @@
+from services.github.tree_index import TreeIndex
+
+TREE = [
+    {"path": "README.md", "mode": "100644", "type": "blob", "sha": "a1", "size": 10},
+    {"path": "src", "mode": "040000", "type": "tree", "sha": "t1"},
+    {"path": "src/main.py", "mode": "100644", "type": "blob", "sha": "a2", "size": 20},
+    {"path": "src/utils", "mode": "040000", "type": "tree", "sha": "t2"},
+    {"path": "src/utils/handler.py", "mode": "100644", "type": "blob", "sha": "a3", "size": 30},
+    {"path": "tests/test_main.py", "mode": "100755", "type": "blob", "sha": "a4", "size": 40},
+]
+
+
+def test_tree_index_find_and_prefix():
+    index = TreeIndex.from_tree(tree_sha="root", tree=TREE)
+
+    assert index.paths == sorted(index.paths)
+    assert index.modes[index.find(path="tests/test_main.py")] == "100755"
+    assert index.find(path="src") == -1
+    assert index.is_dir(path="src/utils")
+    assert index.search_prefix(prefix="src/") == ["src/main.py", "src/utils/handler.py"]
+
+
+def test_tree_index_glob_and_fuzzy():
+    index = TreeIndex.from_tree(tree_sha="root", tree=TREE)
+
+    assert index.search_glob(pattern="*.py") == [
+        "src/main.py",
+        "src/utils/handler.py",
+        "tests/test_main.py",
+    ]
+    assert index.search_glob(pattern="src/*/*.py") == ["src/utils/handler.py"]
+    assert index.search_fuzzy(query="HANDLER") == ["src/utils/handler.py"]
+    assert index.search_fuzzy(query="handlr.py")[0] == "src/utils/handler.py"
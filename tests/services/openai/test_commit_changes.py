@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from services.openai import commit_changes
+
+
+def create_tool_call(call_id: str, name: str, args: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(args)),
+    )
+
+
+def create_client(tool_calls: list):
+    message = SimpleNamespace(tool_calls=tool_calls)
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    create = lambda **kwargs: completion  # noqa: E731
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+
+def test_chat_with_agent_runs_reads_concurrently_and_writes_in_order(monkeypatch):
+    events: list[str] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def read(file_path, base_args):
+        barrier.wait()  # Both reads must be running at the same time
+        with lock:
+            events.append(f"read {file_path}")
+        return f"content of {file_path}"
+
+    def write(file_path, diff, base_args):
+        time.sleep(0.05 if diff == "first" else 0)
+        with lock:
+            events.append(f"write {file_path} {diff}")
+        return f"committed {diff}"
+
+    tool_calls = [
+        create_tool_call("c1", "get_remote_file_content", {"file_path": "a.py"}),
+        create_tool_call("c2", "get_remote_file_content", {"file_path": "b.py"}),
+        create_tool_call(
+            "c3",
+            "commit_changes_to_remote_branch",
+            {"file_path": "c.py", "diff": "first"},
+        ),
+        create_tool_call(
+            "c4",
+            "commit_changes_to_remote_branch",
+            {"file_path": "c.py", "diff": "second"},
+        ),
+        create_tool_call("c5", "get_remote_file_content", {"file_path": "b.py"}),
+    ]
+    monkeypatch.setattr(
+        commit_changes, "create_openai_client", lambda: create_client(tool_calls)
+    )
+    monkeypatch.setattr(commit_changes, "count_tokens", lambda messages: 0)
+    monkeypatch.setattr(
+        commit_changes,
+        "tools_to_call",
+        {"get_remote_file_content": read, "commit_changes_to_remote_branch": write},
+    )
+
+    messages, previous_calls, tool_names, tool_args_list, _, _, is_done = (
+        commit_changes.chat_with_agent(
+            messages=[{"role": "user", "content": "fix it"}],
+            base_args={},
+            mode="explore",
+            previous_calls=[
+                {"function": "get_remote_file_content", "args": {"file_path": "old.py"}}
+            ],
+        )
+    )
+
+    assert is_done
+    assert tool_names == ["get_remote_file_content"] * 2 + [
+        "commit_changes_to_remote_branch"
+    ] * 2 + ["get_remote_file_content"]
+    assert [m["tool_call_id"] for m in messages[2:]] == ["c1", "c2", "c3", "c4", "c5"]
+    assert messages[2]["content"] == "content of a.py"
+    assert messages[3]["content"] == "content of b.py"
+    assert messages[5]["content"] == "committed second"
+    assert events.index("write c.py first") < events.index("write c.py second")
+    assert messages[6]["content"].startswith(
+        "The function 'get_remote_file_content' was called with the same arguments as before"
+    )
+    assert len(previous_calls) == 5
+
+
+def test_describe_tool_calls():
+    assert (
+        commit_changes.describe_tool_calls(
+            tool_names=["find_definition", "search_file_paths"],
+            tool_args_list=[{"name": "main"}, {"query": "*.py"}],
+        )
+        == "Calling `find_definition()` with `{'name': 'main'}`, `search_file_paths()` with `{'query': '*.py'}`..."
+    )
+
+
+def test_chat_with_agent_returns_a_failing_tool_error_as_its_result(monkeypatch):
+    def read(file_path, base_args):
+        if file_path == "missing.py":
+            raise FileNotFoundError(file_path)
+        return f"content of {file_path}"
+
+    tool_calls = [
+        create_tool_call("c1", "get_remote_file_content", {"file_path": "a.py"}),
+        create_tool_call("c2", "get_remote_file_content", {"file_path": "missing.py"}),
+        create_tool_call("c3", "get_remote_file_content", {"file_path": "b.py"}),
+    ]
+    monkeypatch.setattr(
+        commit_changes, "create_openai_client", lambda: create_client(tool_calls)
+    )
+    monkeypatch.setattr(commit_changes, "count_tokens", lambda messages: 0)
+    monkeypatch.setattr(
+        commit_changes, "tools_to_call", {"get_remote_file_content": read}
+    )
+
+    messages, *_, is_done = commit_changes.chat_with_agent(
+        messages=[{"role": "user", "content": "fix it"}],
+        base_args={},
+        mode="explore",
+        previous_calls=[],
+    )
+
+    assert is_done
+    assert [m["content"] for m in messages[2:]] == [
+        "content of a.py",
+        "The function 'get_remote_file_content' failed with FileNotFoundError: missing.py",
+        "content of b.py",
+    ]
@@ -0,0 +1,69 @@
+from services.stripe import entitlements
+
+
+def test_entitlement_is_cached_until_invalidated(monkeypatch):
+    lookups = []
+
+    def fake_get_stripe_customer_id(owner_id: int):
+        lookups.append(owner_id)
+        return None if owner_id == 1 else "cus_123"
+
+    monkeypatch.setattr(
+        entitlements, "get_stripe_customer_id", fake_get_stripe_customer_id
+    )
+    monkeypatch.setattr(
+        entitlements, "get_stripe_product_id", lambda customer_id: "prod_paid"
+    )
+    monkeypatch.setattr(entitlements, "entitlements", {})
+
+    assert not entitlements.is_paid_owner(owner_id=1)
+    assert not entitlements.is_paid_owner(owner_id=1)
+    assert entitlements.is_paid_owner(owner_id=2)
+    assert lookups == [1, 2]
+
+    entitlements.invalidate_entitlement(owner_id=1)
+    assert not entitlements.is_paid_owner(owner_id=1)
+    assert lookups == [1, 2, 1]
+
+
+def test_entitlement_expires(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(
+        entitlements,
+        "get_stripe_customer_id",
+        lambda owner_id: lookups.append(owner_id) or "cus_123",
+    )
+    monkeypatch.setattr(
+        entitlements,
+        "get_stripe_product_id",
+        lambda customer_id: entitlements.STRIPE_PRODUCT_ID_FREE,
+    )
+    monkeypatch.setattr(entitlements, "entitlements", {})
+    monkeypatch.setattr(entitlements, "ENTITLEMENT_TTL", -1)
+
+    assert not entitlements.is_paid_owner(owner_id=3)
+    assert not entitlements.is_paid_owner(owner_id=3)
+    assert lookups == [3, 3]
+
+
+def test_failed_lookup_is_not_cached(monkeypatch):
+    lookups = []
+
+    def fake_get_stripe_customer_id(owner_id: int):
+        lookups.append(owner_id)
+        if len(lookups) == 1:
+            raise ConnectionError("Supabase is down")
+        return "cus_123"
+
+    monkeypatch.setattr(
+        entitlements, "get_stripe_customer_id", fake_get_stripe_customer_id
+    )
+    monkeypatch.setattr(
+        entitlements, "get_stripe_product_id", lambda customer_id: "prod_paid"
+    )
+    monkeypatch.setattr(entitlements, "entitlements", {})
+
+    assert not entitlements.is_paid_owner(owner_id=4)
+    assert entitlements.is_paid_owner(owner_id=4)
+    assert entitlements.is_paid_owner(owner_id=4)
+    assert lookups == [4, 4]
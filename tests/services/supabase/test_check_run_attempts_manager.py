@@ -0,0 +1,48 @@
+import pytest
+
+from services.supabase.check_run_attempts_manager import (
+    CheckRunAttemptsManager,
+    SQLiteCheckRunAttempts,
+)
+
+
+def test_sqlite_check_run_attempts(tmp_path):
+    ledger = SQLiteCheckRunAttempts(path=str(tmp_path / "attempts.sqlite"))
+    key = {
+        "owner": "owner",
+        "repo": "repo",
+        "pull_number": 1,
+        "check_run_name": "pytest",
+    }
+    assert not ledger.has_check_run_attempt(**key)
+
+    ledger.create_check_run_attempt(**key, head_sha="sha1")
+    ledger.create_check_run_attempt(**key, head_sha="sha1")  # Ignored duplicate
+
+    # Any head SHA counts because a fix pushes a new head SHA
+    assert ledger.has_check_run_attempt(**key)
+    assert not ledger.has_check_run_attempt(**{**key, "check_run_name": "lint"})
+    assert not ledger.has_check_run_attempt(**{**key, "pull_number": 2})
+
+    # The ledger persists across instances
+    ledger = SQLiteCheckRunAttempts(path=str(tmp_path / "attempts.sqlite"))
+    assert ledger.has_check_run_attempt(**key)
+
+
+class FailingClient:
+    def table(self, table_name):
+        raise RuntimeError(f'relation "{table_name}" does not exist')
+
+
+def test_supabase_check_run_attempts_fail_closed():
+    ledger = CheckRunAttemptsManager(client=FailingClient())
+    key = {
+        "owner": "owner",
+        "repo": "repo",
+        "pull_number": 1,
+        "check_run_name": "pytest",
+    }
+    # An unreadable ledger counts as an attempt, so the handler skips the repair
+    assert ledger.has_check_run_attempt(**key)
+    with pytest.raises(RuntimeError):
+        ledger.create_check_run_attempt(**key, head_sha="sha1")
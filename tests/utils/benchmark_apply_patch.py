@@ -0,0 +1,71 @@
+# run this file locally with: python -m tests.utils.benchmark_apply_patch
+# It compares the in-memory apply_patch() with the previous "patch" subprocess approach. GNU patch must be installed.
+
+# Standard imports
+import os
+import subprocess
+import tempfile
+import timeit
+
+# Local imports
+from config import UTF8
+from utils.file_manager import apply_patch
+
+ORIGINAL_TEXT = "".join(f"def function_{i}():\n    return {i}\n\n" for i in range(500))
+DIFF_TEXT = (
+    "--- a/module.py\n+++ b/module.py\n"
+    "@@ -601,5 +601,5 @@\n"
+    " def function_200():\n"
+    "-    return 200\n"
+    "+    return 2000\n"
+    " \n"
+    " def function_201():\n"
+)
+NUMBER = 200
+
+
+def apply_patch_with_subprocess(original_text: str, diff_text: str) -> str:
+    """The previous implementation: write temporary files and run "patch --fuzz=3"."""
+    with tempfile.NamedTemporaryFile(
+        mode="w+", encoding=UTF8, newline="\n", delete=False
+    ) as org_file:
+        org_fname: str = org_file.name
+        org_file.write(original_text)
+    try:
+        subprocess.run(
+            args=["patch", "-u", "--fuzz=3", "--forward", org_fname],
+            input=diff_text,
+            text=True,
+            encoding=UTF8,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        with open(file=org_fname, mode="r", encoding=UTF8, newline="\n") as f:
+            return f.read()
+    finally:
+        os.remove(path=org_fname)
+        if os.path.exists(path=f"{org_fname}.orig"):
+            os.remove(path=f"{org_fname}.orig")
+
+
+def main() -> None:
+    in_memory, _msg = apply_patch(original_text=ORIGINAL_TEXT, diff_text=DIFF_TEXT)
+    with_subprocess = apply_patch_with_subprocess(ORIGINAL_TEXT, DIFF_TEXT)
+    assert in_memory == with_subprocess, "Results differ"
+
+    t1 = timeit.timeit(
+        stmt=lambda: apply_patch(original_text=ORIGINAL_TEXT, diff_text=DIFF_TEXT),
+        number=NUMBER,
+    )
+    t2 = timeit.timeit(
+        stmt=lambda: apply_patch_with_subprocess(ORIGINAL_TEXT, DIFF_TEXT),
+        number=NUMBER,
+    )
+    print(f"in-memory:  {t1 / NUMBER * 1000:.3f} ms per call")
+    print(f"subprocess: {t2 / NUMBER * 1000:.3f} ms per call")
+    print(f"speedup:    {t2 / t1:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Local imports
+from utils.code_outline import get_outline, render_outline
+
+PYTHON = """import os
+
+
+@decorator
+class Handler:
+    def run(self):
+        def inner():
+            pass
+
+        return inner
+
+
+async def main():
+    pass
+"""
+
+TYPESCRIPT = """import x from "y";
+
+export class Store extends Base {
+  private open = "{";
+
+  async load(id: number): Promise<void> {
+    if (id) {
+      return;
+    }
+  }
+}
+
+export const add = (a: number, b: number) => a + b;
+
+export function main() {
+  const s = `}`;
+}
+"""
+
+RUBY = """module Shop
+  class Cart
+    def total
+      1
+    end
+  end
+end
+"""
+
+
+def test_get_outline_parses_python_with_ast():
+    assert render_outline(symbols=get_outline(file_path="a.py", text=PYTHON)) == (
+        "class Handler: L4-L10\n"
+        "  method run: L6-L10\n"
+        "    function inner: L7-L8\n"
+        "function main: L13-L14"
+    )
+
+
+def test_get_outline_falls_back_to_regex_for_invalid_python():
+    symbols = get_outline(
+        file_path="b.py", text=PYTHON.replace("pass\n\n", "pass(\n\n", 1)
+    )
+    assert [(s.kind, s.name) for s in symbols] == [
+        ("class", "Handler"),
+        ("method", "run"),
+        ("function", "inner"),
+        ("function", "main"),
+    ]
+
+
+def test_get_outline_matches_braces_in_other_languages():
+    assert render_outline(symbols=get_outline(file_path="a.ts", text=TYPESCRIPT)) == (
+        "class Store: L3-L11\n"
+        "  method load: L6-L10\n"
+        "function add: L13-L13\n"
+        "function main: L15-L17"
+    )
+    assert render_outline(symbols=get_outline(file_path="a.rb", text=RUBY)) == (
+        "class Shop: L1-L7\n  class Cart: L2-L6\n    method total: L3-L5"
+    )
+
+
+def test_get_outline_returns_none_for_unsupported_files():
+    assert get_outline(file_path="README.md", text="# Title") is None
@@ -0,0 +1,110 @@
+# Standard imports
+import base64
+import os
+
+# Local imports
+from utils.content_classifier import (
+    ContentClass,
+    classify_content,
+    is_marked_generated,
+    summarize_content,
+)
+
+
+def test_classify_content_detects_binary():
+    assert (
+        classify_content(file_path="a.bin", content=b"\x89PNG\x00\x01").kind == "binary"
+    )
+    assert (
+        classify_content(file_path="a.txt", content=b"\xff\xfe\xfa abc").kind
+        == "binary"
+    )
+    encoded = base64.b64encode(os.urandom(6000))
+    assert classify_content(file_path="data.txt", content=encoded).kind == "binary"
+
+
+def test_classify_content_keeps_source_and_non_ascii_text():
+    source = b"def main():\n    return 1\n" * 200
+    assert classify_content(file_path="src/main.py", content=source).is_text
+    japanese = ("これは日本語のテキストです。" * 20 + "\n").encode() * 30
+    assert classify_content(file_path="README.md", content=japanese).is_text
+    # A multi-byte character cut at the end of the sample is not binary
+    assert classify_content(
+        file_path="README.md", content=japanese[:8193] + japanese
+    ).is_text
+
+
+def test_classify_content_detects_lockfiles_minified_and_generated():
+    assert (
+        classify_content(file_path="web/package-lock.json", content=b"{}").kind
+        == "lockfile"
+    )
+    assert classify_content(file_path="app.min.js", content=b"a").kind == "minified"
+    assert (
+        classify_content(file_path="bundle.js", content=b"var a=1;" * 500).kind
+        == "minified"
+    )
+    header = b"// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n"
+    assert classify_content(file_path="api/api.go", content=header).kind == "generated"
+    header = b"/**\n * @generated SignedSource<<abc>>\n */\n"
+    assert classify_content(file_path="src/a.js", content=header).kind == "generated"
+
+
+def test_classify_content_keeps_vendored_and_loosely_marked_files():
+    assert classify_content(file_path="api_pb2.py", content=b"x = 1").is_text
+    assert classify_content(file_path="vendor/lib/a.go", content=b"package a").is_text
+    assert classify_content(file_path="dist/app.js", content=b"var a = 1;").is_text
+    header = (
+        b"# Generated by Django 4.2 on 2024-01-01\nfrom django.db import migrations\n"
+    )
+    assert classify_content(file_path="app/migrations/0001.py", content=header).is_text
+    # A marker far below the top is not a header
+    body = b"x = 1\n" * 10 + b"# DO NOT EDIT below this line\n"
+    assert classify_content(file_path="settings.py", content=body).is_text
+
+
+def test_classify_content_follows_gitattributes():
+    gitattributes = "# comment\nsrc/gen/** linguist-generated\n*.snap linguist-generated=true\ndist/*.js -linguist-generated\n"
+    assert is_marked_generated(file_path="src/gen/a/b.ts", gitattributes=gitattributes)
+    assert is_marked_generated(
+        file_path="tests/__snapshots__/a.snap", gitattributes=gitattributes
+    )
+    assert (
+        is_marked_generated(file_path="src/main.ts", gitattributes=gitattributes)
+        is None
+    )
+    assert (
+        classify_content(
+            file_path="src/gen/a.ts", content=b"x", gitattributes=gitattributes
+        ).kind
+        == "generated"
+    )
+    # Unset by .gitattributes, so the marker in the header doesn't apply
+    assert classify_content(
+        file_path="dist/app.js",
+        content=b"// @generated\nx",
+        gitattributes=gitattributes,
+    ).is_text
+
+
+def test_summarize_content_shows_head_and_tail():
+    content = "\n".join(f"line {i}" for i in range(100)).encode()
+    summary = summarize_content(
+        file_path="yarn.lock",
+        content=content,
+        content_class=ContentClass(kind="lockfile", reason="'yarn.lock' is a lockfile"),
+    )
+    assert summary.startswith("Skipped the contents of 'yarn.lock' (")
+    assert "It has 100 lines." in summary
+    assert "line 9\n...\nline 95" in summary
+    assert "line 50" not in summary
+
+    binary = summarize_content(
+        file_path="a.bin",
+        content=b"\x00" * 10,
+        content_class=ContentClass(kind="binary", reason="it contains NUL bytes"),
+    )
+    assert (
+        binary
+        == "Skipped the contents of 'a.bin' (10 bytes) because it looks binary: it contains NUL bytes."
+    )
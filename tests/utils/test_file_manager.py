@@ -26,3 +26,59 @@ tensorboardx
     modified_text, _message = apply_patch(original_text, diff_text)
 
     assert modified_text == expected_result
+
+
+def test_apply_patch_with_offset_and_fuzz():
+    original_text = "\n".join(f"line{i}" for i in range(1, 21)) + "\n"
+
+    # The hunk header says line 3 but the change is at line 10, and the first context line is wrong
+    diff_text = "--- a.txt\n+++ a.txt\n@@ -3,4 +3,4 @@\n wrong\n line9\n-line10\n+LINE10\n line11\n"
+
+    modified_text, message = apply_patch(original_text, diff_text)
+
+    assert message == ""
+    assert modified_text == original_text.replace("line10\n", "LINE10\n")
+
+
+def test_apply_patch_preserves_crlf():
+    original_text = "a\r\nb\r\nc\r\n"
+    diff_text = "--- a.txt\n+++ a.txt\n@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n"
+
+    modified_text, message = apply_patch(original_text, diff_text)
+
+    assert message == ""
+    assert modified_text == "a\r\nB\r\nc\r\n"
+
+
+def test_apply_patch_new_file():
+    diff_text = "--- /dev/null\n+++ new.py\n@@ -0,0 +1,2 @@\n+import os\n+print(os.getcwd())\n"
+
+    modified_text, message = apply_patch("", diff_text)
+
+    assert message == ""
+    assert modified_text == "import os\nprint(os.getcwd())\n"
+
+
+def test_apply_patch_already_applied():
+    original_text = "a\nB\nc\n"
+    diff_text = "--- a.txt\n+++ a.txt\n@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n"
+
+    modified_text, message = apply_patch(original_text, diff_text)
+
+    assert modified_text == ""
+    assert "already applied" in message
+
+
+def test_apply_patch_rejects_unmatched_hunk():
+    original_text = "a\nb\nc\nd\ne\nf\ng\nh\n"
+    diff_text = (
+        "--- a.txt\n+++ a.txt\n"
+        "@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n"
+        "@@ -6,3 +6,3 @@\n f\n-x\n+X\n h\n"
+    )
+
+    modified_text, message = apply_patch(original_text, diff_text)
+
+    assert modified_text == "a\nB\nc\nd\ne\nf\ng\nh\n"
+    assert "Hunk #2 FAILED at 6." in message
+    assert "rej_text:\n@@ -6,3 +6,3 @@\n f\n-x\n+X\n h\n" in message
@@ -0,0 +1,29 @@
+from utils import file_view
+from utils.file_view import FileView
+
+
+def test_file_view_renders_requested_lines():
+    view = FileView(text="a\r\nb\r\nc\r\nd")
+    assert view.line_count == 4
+    assert view.get_line(3) == "d"
+    assert view.render(start=1, end=2) == "2: b\r\n3: c"
+    assert view.render(start=2, end=10) == "3: c\r\n4: d"
+
+
+def test_file_view_merges_keyword_windows():
+    lines = [f"line {i}" for i in range(100)]
+    lines[10] = lines[12] = lines[60] = "keyword here"
+    view = FileView(text="\n".join(lines))
+
+    found = view.find_lines(keyword="keyword")
+    assert found == [10, 12, 60]
+    assert view.get_windows(lines=found, buffer=5) == [(5, 17), (55, 65)]
+    assert view.find_lines(keyword="missing") == []
+
+
+def test_file_view_cuts_long_output(monkeypatch):
+    monkeypatch.setattr(file_view, "MAX_VIEW_CHARS", 50)
+    view = FileView(text="\n".join("x" * 10 for _ in range(100)))
+    rendered = view.render()
+    assert rendered.startswith("1: xxxxxxxxxx\n")
+    assert rendered.endswith("(cut at line 3 of 100. View the rest with line_number or keyword)")
@@ -0,0 +1,32 @@
+from utils.lru_cache import SizedLRUCache
+
+
+def test_sized_lru_cache_evicts_least_recently_used():
+    cache = SizedLRUCache(max_bytes=10)
+    cache.set(key="a", value=b"1234")
+    cache.set(key="b", value=b"1234")
+    assert cache.get(key="a") == b"1234"  # "a" becomes the most recently used
+
+    cache.set(key="c", value=b"1234")
+
+    assert cache.get(key="b") is None
+    assert cache.get(key="a") == b"1234"
+    assert cache.get(key="c") == b"1234"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 8
+    assert stats["hit_rate"] == 0.75
+
+
+def test_sized_lru_cache_promotes_from_disk(tmp_path):
+    cache = SizedLRUCache(max_bytes=4, disk_dir=str(tmp_path), max_disk_bytes=6)
+    cache.set(key="a", value=b"1234")
+    cache.set(key="b", value=b"5678")  # Evicts "a" from memory and disk
+
+    assert cache.get(key="a") is None
+    assert cache.get(key="b") == b"5678"
+
+    # A new cache in the same container reads what earlier runs wrote
+    new_cache = SizedLRUCache(max_bytes=4, disk_dir=str(tmp_path), max_disk_bytes=6)
+    assert new_cache.get(key="b") == b"5678"
+    assert new_cache.stats()["disk_hits"] == 1
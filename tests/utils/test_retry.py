@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+import requests
+
+from utils import retry
+from utils.handle_exceptions import handle_exceptions
+from utils.retry import RetryPolicy
+
+
+def test_retry_policy_retries_until_max_attempts(monkeypatch):
+    slept: list[float] = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    policy = RetryPolicy(name="test_max_attempts", max_attempts=3, base_delay=1)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        policy.call(fail, get_retry_delay=lambda err: 0)
+
+    assert len(calls) == 3
+    assert len(slept) == 2
+    assert all(0 <= delay <= 2 for delay in slept)  # Full jitter within the backoff
+    metrics = policy.get_metrics()
+    assert metrics["retries"] == 2
+    assert metrics["gave_up"] == 1
+
+
+def test_retry_policy_does_not_retry_other_errors(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda _: None)
+    policy = RetryPolicy(name="test_other_errors")
+
+    def fail():
+        raise KeyError("boom")
+
+    with pytest.raises(KeyError):
+        policy.call(fail, get_retry_delay=lambda err: None)
+    assert policy.get_metrics()["retries"] == 0
+
+
+def test_retry_policy_respects_deadline(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda _: None)
+    policy = RetryPolicy(name="test_deadline", max_attempts=5)
+    retry.set_deadline(remaining_seconds=retry.DEADLINE_SAFETY_MARGIN + 30)
+    try:
+        # Retry-After is longer than the time left in the invocation
+        assert not policy.can_retry(attempt=1, delay=60)
+        assert policy.can_retry(attempt=1, delay=5)
+    finally:
+        monkeypatch.setattr(retry, "deadline", None)
+
+
+def test_retry_policy_call_async(monkeypatch):
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(retry.asyncio, "sleep", no_sleep)
+    policy = RetryPolicy(name="test_async", max_attempts=3)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConnectionError("reset")
+        return "ok"
+
+    result = asyncio.run(policy.call_async(flaky, get_retry_delay=lambda err: 0))
+    assert result == "ok"
+    assert policy.get_metrics()["retries"] == 1
+
+
+def create_http_error(method: str, status_code: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    response.request = requests.Request(
+        method=method, url="https://api.github.com"
+    ).prepare()
+    return requests.exceptions.HTTPError(
+        f"{status_code} Server Error", response=response
+    )
+
+
+def test_handle_exceptions_retries_server_errors_only_for_idempotent_requests(
+    monkeypatch,
+):
+    monkeypatch.setattr(retry.time, "sleep", lambda delay: None)
+    calls: list[str] = []
+
+    @handle_exceptions(default_return_value="default")
+    def request(method: str):
+        calls.append(method)
+        raise create_http_error(method=method, status_code=502)
+
+    assert request(method="GET") == "default"
+    assert calls.count("GET") == retry.GITHUB_SERVER_ERROR_RETRY.max_attempts
+    assert request(method="POST") == "default"
+    assert calls.count("POST") == 1
+
+
+def test_reset_retry_metrics():
+    policy = RetryPolicy(name="test_reset")
+    policy.record(delay=1.5)
+    retry.reset_retry_metrics()
+    assert policy.get_metrics() == {"retries": 0, "gave_up": 0, "slept_seconds": 0}
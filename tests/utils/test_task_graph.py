@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from utils.task_graph import Task, run_task_graph
+
+
+def test_run_task_graph_runs_independent_tasks_concurrently():
+    def slow(value):
+        time.sleep(0.1)
+        return value
+
+    started_at = time.time()
+    results = run_task_graph(
+        tasks={
+            "a": Task(func=lambda: slow(1)),
+            "b": Task(func=lambda: slow(2)),
+            "c": Task(func=lambda: slow(3)),
+            "sum": Task(func=lambda a, b, c: a + b + c, deps=("a", "b", "c")),
+        }
+    )
+
+    assert results == {"a": 1, "b": 2, "c": 3, "sum": 6}
+    assert time.time() - started_at < 0.25
+
+
+def test_run_task_graph_raises_errors_and_stops():
+    calls = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_task_graph(
+            tasks={
+                "fail": Task(func=fail),
+                "after": Task(func=lambda fail: calls.append(fail), deps=("fail",)),
+            }
+        )
+    assert not calls
+
+
+def test_run_task_graph_rejects_unknown_and_circular_deps():
+    with pytest.raises(ValueError):
+        run_task_graph(tasks={"a": Task(func=lambda x: x, deps=("x",))})
+    with pytest.raises(ValueError):
+        run_task_graph(
+            tasks={
+                "a": Task(func=lambda b: b, deps=("b",)),
+                "b": Task(func=lambda a: a, deps=("a",)),
+            }
+        )
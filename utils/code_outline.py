@@ -0,0 +1,255 @@
+# Standard imports
+import ast
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+# A brace-less declaration (e.g. an arrow function returning an expression) ends within this many lines
+MAX_SIGNATURE_LINES = 5
+MAX_OUTLINE_SYMBOLS = 500
+
+KEYWORDS = {"if", "for", "while", "switch", "catch", "return", "else", "do", "new"}
+MODIFIERS = r"(?:(?:public|private|protected|internal|static|final|abstract|override|virtual|async|synchronized|open|suspend|readonly|export|default|inline|sealed|data)\s+)*"
+
+JS_PATTERNS = [
+    ("class", re.compile(rf"^\s*{MODIFIERS}class\s+(?P<name>\w+)")),
+    ("interface", re.compile(rf"^\s*{MODIFIERS}(?:interface|enum)\s+(?P<name>\w+)")),
+    (
+        "function",
+        re.compile(rf"^\s*{MODIFIERS}function\s*\*?\s*(?P<name>\w+)"),
+    ),
+    (
+        "function",
+        re.compile(
+            rf"^\s*{MODIFIERS}(?:const|let|var)\s+(?P<name>\w+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:\([^)]*\)|\w+)\s*(?::[^=]+)?=>"
+        ),
+    ),
+    (
+        "method",
+        re.compile(
+            rf"^\s+{MODIFIERS}(?:get\s+|set\s+)?(?P<name>\w+)\s*\([^)]*\)\s*(?::\s*[^{{]+)?\{{\s*$"
+        ),
+    ),
+]
+GO_PATTERNS = [
+    ("function", re.compile(r"^func\s+(?:\([^)]*\)\s*)?(?P<name>\w+)")),
+    ("class", re.compile(r"^type\s+(?P<name>\w+)\s+(?:struct|interface)\b")),
+]
+RUST_PATTERNS = [
+    (
+        "function",
+        re.compile(
+            r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?fn\s+(?P<name>\w+)"
+        ),
+    ),
+    (
+        "class",
+        re.compile(
+            r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|mod)\s+(?P<name>\w+)"
+        ),
+    ),
+    ("class", re.compile(r"^\s*impl(?:<[^>]*>)?\s+(?P<name>[\w:<>, ]+?)\s*\{")),
+]
+JVM_PATTERNS = [
+    (
+        "class",
+        re.compile(
+            rf"^\s*{MODIFIERS}(?:class|interface|enum|record|object|struct|trait)\s+(?P<name>\w+)"
+        ),
+    ),
+    (
+        "function",
+        re.compile(rf"^\s*{MODIFIERS}(?:fun|def)\s+(?:<[^>]*>\s*)?(?P<name>\w+)"),
+    ),
+    (
+        "method",
+        re.compile(rf"^\s*{MODIFIERS}(?:[\w<>\[\],.?]+\s+)(?P<name>\w+)\s*\([^;]*$"),
+    ),
+]
+C_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:class|struct|namespace)\s+(?P<name>\w+)[^;]*$")),
+    (
+        "function",
+        re.compile(r"^(?!\s)[\w\*&:<>,\s]+?\b(?P<name>[\w:~]+)\s*\([^;]*$"),
+    ),
+]
+PHP_PATTERNS = [
+    ("class", re.compile(rf"^\s*{MODIFIERS}(?:class|interface|trait)\s+(?P<name>\w+)")),
+    ("function", re.compile(rf"^\s*{MODIFIERS}function\s+(?P<name>\w+)")),
+]
+RUBY_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:class|module)\s+(?P<name>[\w:]+)")),
+    ("function", re.compile(r"^\s*def\s+(?P<name>(?:self\.)?\w+[?!=]?)")),
+]
+PYTHON_PATTERNS = [
+    ("class", re.compile(r"^\s*class\s+(?P<name>\w+)")),
+    ("function", re.compile(r"^\s*(?:async\s+)?def\s+(?P<name>\w+)")),
+]
+
+# Extension to (patterns, how a block ends: "brace" or "indent")
+LANGUAGES: dict[str, tuple[list[tuple[str, re.Pattern]], str]] = {
+    **{
+        ext: (JS_PATTERNS, "brace")
+        for ext in (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+    },
+    ".go": (GO_PATTERNS, "brace"),
+    ".rs": (RUST_PATTERNS, "brace"),
+    **{
+        ext: (JVM_PATTERNS, "brace")
+        for ext in (".java", ".kt", ".kts", ".scala", ".cs", ".swift", ".dart")
+    },
+    **{ext: (C_PATTERNS, "brace") for ext in (".c", ".h", ".cc", ".cpp", ".hpp")},
+    ".php": (PHP_PATTERNS, "brace"),
+    ".rb": (RUBY_PATTERNS, "indent"),
+    ".py": (PYTHON_PATTERNS, "indent"),
+}
+
+# String literals and line comments, so that braces in them are not counted
+NON_CODE_PATTERN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|//.*$")
+
+
+class Symbol(NamedTuple):
+    kind: str  # "class", "interface", "function" or "method"
+    name: str
+    start: int  # 1-based, inclusive
+    end: int
+    depth: int = 0
+
+
+def get_python_symbols(text: str) -> list[Symbol]:
+    """Read the symbols from the syntax tree. Decorators are included in the range."""
+    symbols: list[Symbol] = []
+
+    def visit(node: ast.AST, in_class: bool) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                kind = "class"
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+            else:
+                visit(child, in_class=in_class)
+                continue
+            start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+            end = child.end_lineno or child.lineno
+            symbols.append(Symbol(kind=kind, name=child.name, start=start, end=end))
+            visit(child, in_class=kind == "class")
+
+    visit(ast.parse(text), in_class=False)
+    return symbols
+
+
+def find_brace_end(code_lines: list[str], i: int) -> int:
+    """Return the 0-based line where the block opened at or right after line i is closed, or i if no block is opened."""
+    depth = 0
+    opened = False
+    for j in range(i, len(code_lines)):
+        line = code_lines[j]
+        if not opened and j - i >= MAX_SIGNATURE_LINES:
+            return i
+        if not opened and ";" in line and "{" not in line:
+            return j
+        for char in line:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+        if opened and depth <= 0:
+            return j
+    return len(code_lines) - 1
+
+
+def find_indent_end(lines: list[str], i: int) -> int:
+    """Return the 0-based last line of the block at line i, which is the last line indented deeper than it, or the closing 'end' at the same indent (Ruby)."""
+    indent = len(lines[i]) - len(lines[i].lstrip())
+    end = i
+    for j in range(i + 1, len(lines)):
+        stripped = lines[j].strip()
+        if not stripped:
+            continue
+        if len(lines[j]) - len(lines[j].lstrip()) <= indent:
+            if stripped == "end" or stripped.startswith(("end ", ")", "]", "}")):
+                end = j
+            break
+        end = j
+    return end
+
+
+def get_regex_symbols(lines: list[str], patterns: list, block: str) -> list[Symbol]:
+    """Find declarations line by line with the language's patterns and close them by brace matching or indentation. It is a heuristic like ctags, so strings spanning lines or unusual formatting can confuse it."""
+    code_lines = [NON_CODE_PATTERN.sub("", line) for line in lines]
+    symbols: list[Symbol] = []
+    for i, line in enumerate(lines):
+        for kind, pattern in patterns:
+            match = pattern.match(line)
+            if match is None or match.group("name") in KEYWORDS:
+                continue
+            if block == "brace":
+                end = find_brace_end(code_lines=code_lines, i=i)
+            else:
+                end = find_indent_end(lines=lines, i=i)
+            symbols.append(
+                Symbol(
+                    kind=kind,
+                    name=match.group("name").strip(),
+                    start=i + 1,
+                    end=end + 1,
+                )
+            )
+            break
+    return symbols
+
+
+def set_depths(symbols: list[Symbol]) -> list[Symbol]:
+    """Nest each symbol under the symbols whose ranges contain it, and call functions in a class methods."""
+    result: list[Symbol] = []
+    stack: list[Symbol] = []
+    for symbol in sorted(symbols, key=lambda s: (s.start, -s.end)):
+        while stack and stack[-1].end < symbol.start:
+            stack.pop()
+        kind = symbol.kind
+        if kind == "function" and stack and stack[-1].kind in ("class", "interface"):
+            kind = "method"
+        elif kind == "method" and not stack:
+            kind = "function"
+        result.append(symbol._replace(kind=kind, depth=len(stack)))
+        stack.append(symbol)
+    return result
+
+
+def is_outline_supported(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1].lower() in LANGUAGES
+
+
+def parse_outline(file_path: str, text: str) -> list[Symbol] | None:
+    """Return the classes, functions and methods in the file with their line ranges, or None if the language is not supported. Python is parsed with ast, and the other languages are scanned with regular expressions."""
+    if not is_outline_supported(file_path=file_path):
+        return None
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".py":
+        try:
+            return set_depths(symbols=get_python_symbols(text=text))
+        except (SyntaxError, ValueError):
+            pass  # Fall back to the regex for a file that doesn't parse
+    patterns, block = LANGUAGES[ext]
+    lines = text.splitlines()
+    return set_depths(
+        symbols=get_regex_symbols(lines=lines, patterns=patterns, block=block)
+    )
+
+
+@lru_cache(maxsize=32)
+def get_outline(file_path: str, text: str) -> list[Symbol] | None:
+    """Reuse the outline while the agent works on the same file. See parse_outline()."""
+    return parse_outline(file_path=file_path, text=text)
+
+
+def render_outline(symbols: list[Symbol]) -> str:
+    rows = [
+        f"{'  ' * s.depth}{s.kind} {s.name}: L{s.start}-L{s.end}"
+        for s in symbols[:MAX_OUTLINE_SYMBOLS]
+    ]
+    if len(symbols) > MAX_OUTLINE_SYMBOLS:
+        rows.append(f"... ({len(symbols) - MAX_OUTLINE_SYMBOLS} more symbols)")
+    return "\n".join(rows)
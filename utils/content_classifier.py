@@ -0,0 +1,181 @@
+# Standard imports
+import math
+import os
+from collections import Counter
+from fnmatch import fnmatch
+from typing import NamedTuple
+
+# Local imports
+from config import UTF8
+
+# Only the head of a file is inspected, which is enough to tell binary or minified content
+SAMPLE_BYTES = 8 * 1024
+# Bits per byte. Code and prose are around 4.5 to 5.3, while base64 or hex encoded data that decodes as ASCII is close to 6
+MAX_TEXT_ENTROPY = 5.8
+# A minified bundle puts a whole file on a few lines
+MAX_AVERAGE_LINE_LENGTH = 300
+MAX_LINE_LENGTH = 2_000
+SUMMARY_HEAD_LINES = 10
+SUMMARY_TAIL_LINES = 5
+SUMMARY_LINE_CHARS = 200
+
+# Lockfiles and dependency manifests generated by package managers, see https://github.com/github-linguist/linguist/blob/master/lib/linguist/generated.rb
+LOCKFILE_NAMES = {
+    "Cargo.lock",
+    "Gemfile.lock",
+    "Package.resolved",
+    "Pipfile.lock",
+    "bun.lockb",
+    "composer.lock",
+    "flake.lock",
+    "go.sum",
+    "mix.lock",
+    "npm-shrinkwrap.json",
+    "package-lock.json",
+    "packages.lock.json",
+    "pdm.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "pubspec.lock",
+    "uv.lock",
+    "yarn.lock",
+}
+# Minified bundles, which are checked by their line lengths as well
+MINIFIED_PATTERNS = ("*.min.js", "*.min.css")
+# Exact markers that code generators write near the top, e.g. "Code generated by protoc-gen-go. DO NOT EDIT." A looser phrase like "Generated by" also appears in hand-edited files, so it is not a marker.
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT")
+GENERATED_MARKER_LINES = 5
+
+
+class ContentClass(NamedTuple):
+    kind: str  # "text", "binary", "lockfile", "minified" or "generated"
+    reason: str
+
+    @property
+    def is_text(self) -> bool:
+        return self.kind == "text"
+
+
+def get_entropy(data: bytes) -> float:
+    """Shannon entropy of the bytes in bits per byte."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(
+        count / total * math.log2(count / total) for count in Counter(data).values()
+    )
+
+
+def parse_gitattributes(text: str) -> list[tuple[str, bool]]:
+    """Return (pattern, is_generated) pairs for the lines that set or unset linguist-generated, in file order so that a later line overrides an earlier one.
+    https://github.com/github-linguist/linguist/blob/master/docs/overrides.md"""
+    rules: list[tuple[str, bool]] = []
+    for line in text.splitlines():
+        parts = line.strip().split()
+        if not parts or parts[0].startswith("#"):
+            continue
+        for attr in parts[1:]:
+            if attr in ("linguist-generated", "linguist-generated=true"):
+                rules.append((parts[0], True))
+            elif attr in ("-linguist-generated", "linguist-generated=false"):
+                rules.append((parts[0], False))
+    return rules
+
+
+def match_gitattributes_pattern(pattern: str, file_path: str) -> bool:
+    """Match a .gitattributes pattern the way git does for the common cases: a pattern without a slash matches the file name at any depth, and a pattern with a slash matches from the root."""
+    if pattern.endswith("/**"):
+        return file_path.startswith(pattern[:-3].lstrip("/") + "/")
+    if "/" not in pattern:
+        return fnmatch(os.path.basename(file_path), pattern)
+    return fnmatch(file_path, pattern.lstrip("/").replace("**/", "*"))
+
+
+def is_marked_generated(file_path: str, gitattributes: str | None) -> bool | None:
+    """True or False if .gitattributes sets or unsets linguist-generated for the file, None if it says nothing."""
+    marked: bool | None = None
+    for pattern, is_generated in parse_gitattributes(text=gitattributes or ""):
+        if match_gitattributes_pattern(pattern=pattern, file_path=file_path):
+            marked = is_generated
+    return marked
+
+
+def classify_path(file_path: str) -> ContentClass | None:
+    """Classify the file by its path alone, without looking at the content. A path never makes a file generated, since only .gitattributes and the markers in the file say so reliably."""
+    name = os.path.basename(file_path)
+    if name in LOCKFILE_NAMES:
+        return ContentClass(kind="lockfile", reason=f"'{name}' is a lockfile")
+    for pattern in MINIFIED_PATTERNS:
+        if fnmatch(name, pattern):
+            return ContentClass(kind="minified", reason=f"the path matches '{pattern}'")
+    return None
+
+
+def classify_content(
+    file_path: str, content: bytes, gitattributes: str | None = None
+) -> ContentClass:
+    """Tell whether the content is worth showing to the LLM. Binary files can't be decoded, and lockfiles, minified bundles and generated code are long but rarely what the agent needs. The checks go from the cheapest to the most expensive: .gitattributes, path rules, NUL bytes, UTF-8 decoding, entropy, line lengths and generator markers. Only the first SAMPLE_BYTES of the content are inspected. Code is generated only if .gitattributes marks it linguist-generated, or if it has no .gitattributes rule and an exact marker near the top."""
+    marked = is_marked_generated(file_path=file_path, gitattributes=gitattributes)
+    if marked is True:
+        return ContentClass(
+            kind="generated", reason="it is marked linguist-generated in .gitattributes"
+        )
+    by_path = classify_path(file_path=file_path)
+    if by_path is not None:
+        return by_path
+
+    sample = content[:SAMPLE_BYTES]
+    if b"\x00" in sample:
+        return ContentClass(kind="binary", reason="it contains NUL bytes")
+    try:
+        # A multi-byte character may be cut at the end of the sample
+        text = sample.decode(encoding=UTF8)
+    except UnicodeDecodeError as err:
+        if len(content) <= SAMPLE_BYTES or err.start < len(sample) - 3:
+            return ContentClass(kind="binary", reason="it is not valid UTF-8")
+        text = sample[: err.start].decode(encoding=UTF8)
+    # Non-ASCII text like CJK has a higher entropy by nature, so only ASCII is checked
+    if text.isascii() and get_entropy(data=sample) > MAX_TEXT_ENTROPY:
+        return ContentClass(
+            kind="binary", reason="its byte entropy is too high for source code"
+        )
+
+    lines = text.splitlines()
+    if lines:
+        longest = max(len(line) for line in lines)
+        average = len(text) / len(lines)
+        if average > MAX_AVERAGE_LINE_LENGTH or longest > MAX_LINE_LENGTH:
+            return ContentClass(
+                kind="minified",
+                reason=f"its lines are too long (average {average:.0f}, longest {longest} chars)",
+            )
+    if marked is None:
+        header = "\n".join(lines[:GENERATED_MARKER_LINES])
+        for marker in GENERATED_MARKERS:
+            if marker in header:
+                return ContentClass(
+                    kind="generated", reason=f"its header says '{marker}'"
+                )
+    return ContentClass(kind="text", reason="")
+
+
+def cut_line(line: str) -> str:
+    return (
+        line if len(line) <= SUMMARY_LINE_CHARS else line[:SUMMARY_LINE_CHARS] + "..."
+    )
+
+
+def summarize_content(
+    file_path: str, content: bytes, content_class: ContentClass
+) -> str:
+    """Describe the file in a few lines instead of returning the full contents: size, type, and the head and tail for text-like files."""
+    msg = f"Skipped the contents of '{file_path}' ({len(content):,} bytes) because it looks {content_class.kind}: {content_class.reason}."
+    if content_class.kind == "binary":
+        return msg
+    lines = content.decode(encoding=UTF8, errors="replace").splitlines()
+    msg += f" It has {len(lines):,} lines."
+    if len(lines) <= SUMMARY_HEAD_LINES + SUMMARY_TAIL_LINES:
+        return msg + "\n\n" + "\n".join(cut_line(line) for line in lines)
+    head = "\n".join(cut_line(line) for line in lines[:SUMMARY_HEAD_LINES])
+    tail = "\n".join(cut_line(line) for line in lines[-SUMMARY_TAIL_LINES:])
+    return f"{msg} Head and tail:\n\n{head}\n...\n{tail}"
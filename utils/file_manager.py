@@ -1,10 +1,7 @@
 # Standard imports
-import os
+import re
 import subprocess
-import tempfile
-
-# Third-party imports
-import chardet
+from typing import NamedTuple
 
 # Local imports
 from config import UTF8
@@ -12,123 +9,187 @@ from utils.detect_new_line import detect_line_break
 from utils.handle_exceptions import handle_exceptions
 
 
-def apply_patch(original_text: str, diff_text: str):
-    """Apply a diff using the patch command via temporary files.
-    Here is comparison of patch options in handling "Assume -R?" and "Apply anyway?" prompts:
+class Hunk(NamedTuple):
+    old_start: int  # 1-based line number in the original text, 0 for an empty file
+    old_lines: list[str]  # Context and removed lines
+    new_lines: list[str]  # Context and added lines
+    leading_context: int
+    trailing_context: int
+    header: str
+    body: list[str]  # Raw hunk lines for reject reporting
+
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+MAX_FUZZ = 3  # Same as "patch --fuzz=3"
+
+
+def parse_hunks(diff_text: str) -> list[Hunk]:
+    """Parse hunks in a unified diff. Line counts in hunk headers are ignored because LLMs often get them wrong; a hunk ends at the next hunk header, the next file header, or the end of the diff."""
+    lines: list[str] = diff_text.replace("\r\n", "\n").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+
+    hunks: list[Hunk] = []
+    i = 0
+    while i < len(lines):
+        match = HUNK_HEADER.match(lines[i])
+        if not match:
+            i += 1
+            continue
+        header = lines[i]
+        body: list[str] = []
+        i += 1
+        while i < len(lines):
+            line = lines[i]
+            if line.startswith("@@ "):
+                break
+            if line.startswith("--- ") and i + 1 < len(lines):
+                if lines[i + 1].startswith("+++ "):
+                    break
+            body.append(line)
+            i += 1
+
+        old_lines: list[str] = []
+        new_lines: list[str] = []
+        tags: list[str] = []
+        for line in body:
+            # "\ No newline at end of file" is a marker, not a line
+            if line.startswith("\\"):
+                continue
+            # Blank context lines often lose their leading space
+            tag, text = (line[0], line[1:]) if line else (" ", "")
+            if tag == " ":
+                old_lines.append(text)
+                new_lines.append(text)
+            elif tag == "-":
+                old_lines.append(text)
+            elif tag == "+":
+                new_lines.append(text)
+            else:
+                continue
+            tags.append(tag)
+
+        leading = next((n for n, t in enumerate(tags) if t != " "), len(tags))
+        trailing = next((n for n, t in enumerate(reversed(tags)) if t != " "), 0)
+        hunks.append(
+            Hunk(
+                old_start=int(match.group(1)),
+                old_lines=old_lines,
+                new_lines=new_lines,
+                leading_context=leading,
+                trailing_context=trailing,
+                header=header,
+                body=body,
+            )
+        )
+    return hunks
+
+
+def find_hunk(lines: list[str], target: list[str], expected: int, lower: int) -> int:
+    """Find "target" in "lines" at or after "lower", searching outwards from "expected" like patch's offset search. Return -1 if not found."""
+    if not target:
+        return min(max(expected, lower), len(lines))
+    last = len(lines) - len(target)
+    expected = min(max(expected, lower), max(last, lower))
+    for offset in range(max(expected - lower, last - expected) + 1):
+        for pos in (expected + offset, expected - offset):
+            if lower <= pos <= last and lines[pos : pos + len(target)] == target:  # noqa: E203
+                return pos
+    return -1
+
+
+def apply_hunk(lines: list[str], hunk: Hunk, offset: int, lower: int):
+    """Apply a hunk with offset search and up to MAX_FUZZ lines of context fuzz. Return (start of the hunk, end of the new lines, line count delta) or None if the hunk doesn't match."""
+    for fuzz in range(MAX_FUZZ + 1):
+        head = min(fuzz, hunk.leading_context)
+        tail = min(fuzz, hunk.trailing_context)
+        if fuzz and not head and not tail:
+            break
+        old = hunk.old_lines[head : len(hunk.old_lines) - tail]  # noqa: E203
+        new = hunk.new_lines[head : len(hunk.new_lines) - tail]  # noqa: E203
+        expected = max(hunk.old_start - 1, 0) + offset + head
+        pos = find_hunk(lines=lines, target=old, expected=expected, lower=lower)
+        if pos == -1:
+            continue
+        lines[pos : pos + len(old)] = new  # noqa: E203
+        return pos - head, pos + len(new), len(new) - len(old)
+    return None
 
-    --forward:
-    Assume -R? [n]: No
-    Apply anyway? [n]: No
 
-    --batch:
-    Assume -R? [y]: Yes
-    Apply anyway? [y]: Yes
+def apply_patch(original_text: str, diff_text: str):
+    """Apply a unified diff in memory. It mirrors "patch -u --fuzz=3 --forward":
 
-    --force:
-    Assume -R? [n]: No
-    Apply anyway? [y]: Yes
-    """
+    - Hunks are searched for around their expected position (offset search).
+    - Up to 3 leading/trailing context lines can be ignored (fuzz).
+    - Hunks whose result is already in the text are skipped as previously applied.
+    - Hunks that can't be applied are returned as reject text.
 
+    Returns (modified_text, "") on success, ("", msg) if the diff is already applied or is broken, and (partially_modified_text, msg) if some hunks are rejected.
+    """
     # Detect the line break in the original text
     line_break: str = detect_line_break(text=original_text)
 
-    # Create temporary files as subprocess.run() accepts only file paths
-    with tempfile.NamedTemporaryFile(
-        mode="w+", encoding=UTF8, newline="\n", delete=False
-    ) as org_file:
-        org_fname: str = org_file.name
-        if original_text:
-            s = original_text.replace("\r\n", "\n").replace("\r", "\n")
-            if not s.endswith("\n"):
-                s += "\n"
-            org_file.write(s)
-
-    with tempfile.NamedTemporaryFile(
-        mode="w+", encoding=UTF8, newline="\n", delete=False
-    ) as diff_file:
-        diff_fname: str = diff_file.name
-        diff_file.write(diff_text if diff_text.endswith("\n") else diff_text + "\n")
-
-    modified_text = ""
     try:
-        # New file
-        if original_text == "" and "+++ " in diff_text:
-            lines: list[str] = diff_text.split(sep="\n")
-            new_content_lines: list[str] = [
-                line[1:] if line.startswith("+") else line for line in lines[3:]
-            ]
-            new_content: str = "\n".join(new_content_lines)
-            with open(
-                file=org_fname, mode="w", encoding=UTF8, newline="\n"
-            ) as new_file:
-                new_file.write(new_content)
-
-        # Modified or deleted file
-        else:
-            with open(file=diff_fname, mode="r", encoding=UTF8, newline="\n") as diff:
-                subprocess.run(
-                    # See https://www.man7.org/linux/man-pages/man1/patch.1.html
-                    args=["patch", "-u", "--fuzz=3", "--forward", org_fname],
-                    input=diff.read(),
-                    text=True,  # If True, input and output are strings
-                    encoding=UTF8,
-                    # capture_output=True,  # Redundant so commented out
-                    check=True,  # If True, raise a CalledProcessError if the return code is non-zero
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-
-        # If the patch was successfully applied, get the modified text
-        modified_text = get_file_content(file_path=org_fname)
-        modified_text = modified_text.replace("\n", line_break)
-
-    except subprocess.CalledProcessError as e:
-        stdout: str = e.stdout
-        stderr: str = e.stderr
-
-        # Check if the error message indicates that the patch was already applied
-        msg = f"Failed to apply patch because the diff is already applied. But it's OK, move on to the next fix!\n\ndiff_text:\n{diff_text}\n\nstderr:\n{stderr}\n"
-        if "already exists!" in stdout:
+        text = original_text.replace("\r\n", "\n").replace("\r", "\n")
+        lines: list[str] = text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+
+        hunks: list[Hunk] = parse_hunks(diff_text=diff_text)
+        if not hunks:
+            msg = f"Failed to apply patch because no hunk was found in the diff. Make sure the diff is in the unified format with '@@ -a,b +c,d @@' headers.\n\ndiff_text:\n{diff_text}\n"
             print(msg, end="")
             return "", msg
-        if "Ignoring previously applied (or reversed) patch." in stdout:
+
+        offset = 0  # Difference between the expected and the actual positions
+        lower = 0  # Hunks must be applied in order without overlapping
+        applied: list[int] = []
+        already_applied: list[int] = []
+        rejected: list[Hunk] = []
+        errors: list[str] = []
+        for n, hunk in enumerate(iterable=hunks, start=1):
+            result = apply_hunk(lines=lines, hunk=hunk, offset=offset, lower=lower)
+            if result is not None:
+                pos, lower, delta = result
+                offset = pos - max(hunk.old_start - 1, 0) + delta
+                applied.append(n)
+                continue
+
+            # Check if the hunk is already applied, which is a reversed hunk in patch's terms
+            reversed_hunk = hunk._replace(old_lines=hunk.new_lines)
+            if hunk.old_lines != hunk.new_lines and apply_hunk(
+                lines=list(lines), hunk=reversed_hunk, offset=offset, lower=lower
+            ):
+                already_applied.append(n)
+                continue
+
+            rejected.append(hunk)
+            errors.append(f"Hunk #{n} FAILED at {hunk.old_start}.")
+
+        # Check if the diff is already applied
+        if already_applied and not applied and not rejected:
+            msg = f"Failed to apply patch because the diff is already applied. But it's OK, move on to the next fix!\n\ndiff_text:\n{diff_text}\n\nstderr:\nReversed (or previously applied) patch detected! Skipping patch.\n"
             print(msg, end="")
             return "", msg
 
-        # Get the original, diff, and reject file contents for debugging
-        modified_text = get_file_content(file_path=org_fname)
-        modified_text = modified_text.replace("\n", line_break)
-        diff_text = get_file_content(file_path=diff_fname)
-        rej_f_name: str = f"{org_fname}.rej"
-        rej_text = ""
-        if os.path.exists(path=rej_f_name):
-            rej_text = get_file_content(file_path=rej_f_name)
+        modified_text = line_break.join(lines) + line_break if lines else ""
+        if not rejected:
+            return modified_text, ""
 
-        # Log the error and return an empty string not to break the flow
+        # Report rejected hunks like a .rej file
+        rej_text = "".join(
+            hunk.header + "\n" + "".join(line + "\n" for line in hunk.body)
+            for hunk in rejected
+        )
+        stderr = "\n".join(errors) + f"\n{len(rejected)} out of {len(hunks)} hunks FAILED"
         msg = f"Failed to apply patch partially or entirelly because something is wrong in diff. Analyze the reason from stderr and rej_text, modify the diff, and try again.\n\ndiff_text:\n{diff_text}\n\nstderr:\n{stderr}\n\nrej_text:\n{rej_text}\n"
-        # Print encodings of input texts
-        print(f"Org encoding: {chardet.detect(original_text.encode())['encoding']}")
-        print(f"Diff encoding: {chardet.detect(diff_text.encode())['encoding']}")
         print(msg, end="")
-        # logging.error(msg)
         return modified_text, msg
 
     except Exception as e:  # pylint: disable=broad-except
         print(f"Error: {e}", end="")
         # logging.error(msg=f"Error: {e}")
         return "", f"Error: {e}"
-    finally:
-        # Remove temporary files
-        os.remove(path=org_fname)
-        os.remove(path=diff_fname)
-
-        # Remove any Oops.rej* files in the root directory
-        root_dir = os.getcwd()
-        for filename in os.listdir(root_dir):
-            if filename.startswith("Oops.rej"):
-                os.remove(os.path.join(root_dir, filename))
-
-    return modified_text, ""
 
 
 @handle_exceptions(default_return_value="", raise_on_error=False)
@@ -0,0 +1,79 @@
+# Standard imports
+from bisect import bisect_right
+from functools import lru_cache
+
+# Local imports
+from utils.detect_new_line import detect_line_break
+
+# About 15k tokens. A longer view is cut so that a huge file doesn't flood the context
+MAX_VIEW_CHARS = 60_000
+
+
+class FileView:
+    """Line-offset index over the content of a file. Only the requested lines are sliced and numbered, instead of splitting and numbering the whole file for every view. Line indexes are 0-based and ranges are inclusive."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.lb: str = detect_line_break(text=text)
+        self.starts: list[int] = [0]
+        pos = text.find(self.lb)
+        while pos != -1:
+            self.starts.append(pos + len(self.lb))
+            pos = text.find(self.lb, pos + len(self.lb))
+
+    @property
+    def line_count(self) -> int:
+        return len(self.starts)
+
+    def get_line(self, i: int) -> str:
+        end = (
+            self.starts[i + 1] - len(self.lb)
+            if i + 1 < self.line_count
+            else len(self.text)
+        )
+        return self.text[self.starts[i] : end]
+
+    def find_lines(self, keyword: str) -> list[int]:
+        """Return the lines containing the keyword with str.find() over the whole text, jumping to the next line after each match."""
+        lines: list[int] = []
+        pos = self.text.find(keyword) if keyword else -1
+        while pos != -1:
+            i = bisect_right(self.starts, pos) - 1
+            lines.append(i)
+            if i + 1 >= self.line_count:
+                break
+            pos = self.text.find(keyword, self.starts[i + 1])
+        return lines
+
+    def get_windows(self, lines: list[int], buffer: int) -> list[tuple[int, int]]:
+        """Merge the windows of ±buffer lines around each line into disjoint spans, so that close matches are shown once."""
+        spans: list[tuple[int, int]] = []
+        for i in sorted(lines):
+            start, end = max(i - buffer, 0), min(i + buffer, self.line_count - 1)
+            if spans and start <= spans[-1][1] + 1:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+            else:
+                spans.append((start, end))
+        return spans
+
+    def render(self, start: int = 0, end: int | None = None) -> str:
+        """Number the lines from start to end, cut at MAX_VIEW_CHARS."""
+        end = self.line_count - 1 if end is None else min(end, self.line_count - 1)
+        numbered_lines: list[str] = []
+        size = 0
+        for i in range(max(start, 0), end + 1):
+            numbered_line = f"{i + 1}: {self.get_line(i)}"
+            size += len(numbered_line) + len(self.lb)
+            if size > MAX_VIEW_CHARS:
+                numbered_lines.append(
+                    f"... (cut at line {i} of {self.line_count}. View the rest with line_number or keyword)"
+                )
+                break
+            numbered_lines.append(numbered_line)
+        return self.lb.join(numbered_lines)
+
+
+@lru_cache(maxsize=32)
+def get_file_view(text: str) -> FileView:
+    """Reuse the index while the agent views the same file several times."""
+    return FileView(text=text)
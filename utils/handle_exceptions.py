@@ -9,7 +9,36 @@ from typing import Any, Callable, Tuple, TypeVar
 import logging
 import requests
 
+# Local imports
+from utils.retry import (
+    GITHUB_PRIMARY_RATE_LIMIT_RETRY,
+    GITHUB_SECONDARY_RATE_LIMIT_RETRY,
+    GITHUB_SERVER_ERROR_RETRY,
+    RetryPolicy,
+)
+
 F = TypeVar("F", bound=Callable[..., Any])
+SERVER_ERROR_STATUS_CODES = {500, 502, 503, 504}
+# A 5xx to a POST or PATCH may have been applied anyway, so retrying it could create a duplicate comment, PR, or commit
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def is_idempotent(err: requests.exceptions.HTTPError) -> bool:
+    request = err.request if err.request is not None else err.response.request
+    return request is not None and (request.method or "").upper() in IDEMPOTENT_METHODS
+
+
+def wait_before_retry(
+    policy: RetryPolicy, attempt: int, suggested_delay: float | None, err_msg: str
+) -> bool:
+    """Sleep and return True if the policy allows another attempt within the remaining time. Otherwise log that we give up and return False."""
+    delay = policy.get_delay(attempt=attempt, suggested_delay=suggested_delay)
+    if not policy.can_retry(attempt=attempt, delay=delay):
+        logging.warning(msg=f"{err_msg}Giving up after {attempt} attempt(s).\n")
+        return False
+    logging.warning(msg=f"{err_msg}Retrying after {delay:.1f} seconds.\n")
+    policy.sleep(delay=delay)
+    return True
 
 
 def handle_exceptions(
@@ -20,56 +49,94 @@ def handle_exceptions(
     def decorator(func: F) -> F:
         @wraps(wrapped=func)
         def wrapper(*args: Tuple[Any, ...], **kwargs: Any):
-            truncated_kwargs = str({k: str(v)[:50] + '...' if len(str(v)) > 50 else v for k, v in kwargs.items()})
-            try:
-                return func(*args, **kwargs)
-            except requests.exceptions.HTTPError as err:
-                reason: str | Any = err.response.reason
-                text: str | Any = err.response.text
-
-                if err.response.status_code in {403, 429}:
-                    limit = int(err.response.headers["X-RateLimit-Limit"])
-                    remaining = int(err.response.headers["X-RateLimit-Remaining"])
-                    used = int(err.response.headers["X-RateLimit-Used"])
-
-                    # Check if the primary rate limit has been exceeded
-                    if remaining == 0:
-                        reset_ts = int(err.response.headers.get("X-RateLimit-Reset", 0))
-                        current_ts = int(time.time())
-                        wait_time = reset_ts - current_ts
-                        err_msg = f"{func.__name__} encountered a GitHubPrimaryRateLimitError: {err}. Retrying after {wait_time} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
-                        logging.warning(msg=err_msg)
-                        time.sleep(wait_time + 5)  # 5 seconds is a buffer
-                        return wrapper(*args, **kwargs)
-
-                    # Check if the secondary rate limit has been exceeded
-                    if "exceeded a secondary rate limit" in err.response.text.lower():
-                        retry_after = int(err.response.headers.get("Retry-After", 60))
-                        err_msg = f"{func.__name__} encountered a GitHubSecondaryRateLimitError: {err}. Retrying after {retry_after} seconds. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
-                        logging.warning(msg=err_msg)
-                        time.sleep(retry_after)
-                        return wrapper(*args, **kwargs)
-
-                    # Otherwise, log the error and return the default return value
-                    err_msg = f"{func.__name__} encountered an HTTPError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
-                    logging.error(msg=err_msg)
+            truncated_kwargs = str(
+                {
+                    k: str(v)[:50] + "..." if len(str(v)) > 50 else v
+                    for k, v in kwargs.items()
+                }
+            )
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return func(*args, **kwargs)
+                except requests.exceptions.HTTPError as err:
+                    reason: str | Any = err.response.reason
+                    text: str | Any = err.response.text
+                    status_code: int = err.response.status_code
+                    headers = err.response.headers
+                    retry_after = headers.get("Retry-After")
+
+                    if status_code in {403, 429}:
+                        limit = int(headers.get("X-RateLimit-Limit", 0))
+                        remaining = int(headers.get("X-RateLimit-Remaining", -1))
+                        used = int(headers.get("X-RateLimit-Used", 0))
+
+                        # Check if the primary rate limit has been exceeded
+                        if remaining == 0:
+                            reset_ts = int(headers.get("X-RateLimit-Reset", 0))
+                            wait_time = (
+                                reset_ts - int(time.time()) + 5
+                            )  # 5 seconds is a buffer
+                            err_msg = f"{func.__name__} encountered a GitHubPrimaryRateLimitError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
+                            if wait_before_retry(
+                                policy=GITHUB_PRIMARY_RATE_LIMIT_RETRY,
+                                attempt=attempt,
+                                suggested_delay=wait_time,
+                                err_msg=err_msg,
+                            ):
+                                continue
+
+                        # Check if the secondary rate limit has been exceeded. Without Retry-After, wait at least a minute and back off exponentially. https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api?apiVersion=2022-11-28#exceeding-the-rate-limit
+                        elif (
+                            status_code == 429
+                            or "exceeded a secondary rate limit" in text.lower()
+                        ):
+                            err_msg = f"{func.__name__} encountered a GitHubSecondaryRateLimitError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
+                            if wait_before_retry(
+                                policy=GITHUB_SECONDARY_RATE_LIMIT_RETRY,
+                                attempt=attempt,
+                                suggested_delay=(
+                                    None if retry_after is None else int(retry_after)
+                                ),
+                                err_msg=err_msg,
+                            ):
+                                continue
+
+                        # Otherwise, log the error and return the default return value
+                        err_msg = f"{func.__name__} encountered an HTTPError: {err}. Limit: {limit}, Remaining: {remaining}, Used: {used}. Reason: {reason}. Text: {text}\n"
+                        logging.error(msg=err_msg)
+
+                    # Transient server errors are worth a few quick retries, but only for requests that are safe to repeat
+                    elif status_code in SERVER_ERROR_STATUS_CODES and is_idempotent(
+                        err=err
+                    ):
+                        err_msg = f"{func.__name__} encountered an HTTPError: {err}\nArgs: {args}\nKwargs: {truncated_kwargs}. Reason: {reason}. Text: {text}\n"
+                        if wait_before_retry(
+                            policy=GITHUB_SERVER_ERROR_RETRY,
+                            attempt=attempt,
+                            suggested_delay=(
+                                None if retry_after is None else int(retry_after)
+                            ),
+                            err_msg=err_msg,
+                        ):
+                            continue
+                        logging.error(msg=err_msg)
+
+                    # Ex) 409: Conflict, 422: Unprocessable Entity (No changes made), and etc.
+                    else:
+                        err_msg = f"{func.__name__} encountered an HTTPError: {err}\nArgs: {args}\nKwargs: {truncated_kwargs}. Reason: {reason}. Text: {text}\n"
+                        logging.error(msg=err_msg)
                     if raise_on_error:
                         raise
 
-                # Ex) 409: Conflict, 422: Unprocessable Entity (No changes made), and etc.
-                else:
-                    err_msg = f"{func.__name__} encountered an HTTPError: {err}\nArgs: {args}\nKwargs: {truncated_kwargs}. Reason: {reason}. Text: {text}\n"
-                    logging.error(msg=err_msg)
-                if raise_on_error:
-                    raise
-
-            # Catch all other exceptions
-            except (AttributeError, KeyError, TypeError, Exception) as err:
-                error_msg = f"{func.__name__} encountered an {type(err).__name__}: {err}\nArgs: {args}\nKwargs: {truncated_kwargs}\n"
-                logging.error(msg=error_msg)
-                if raise_on_error:
-                    raise
-            return default_return_value
+                # Catch all other exceptions
+                except (AttributeError, KeyError, TypeError, Exception) as err:
+                    error_msg = f"{func.__name__} encountered an {type(err).__name__}: {err}\nArgs: {args}\nKwargs: {truncated_kwargs}\n"
+                    logging.error(msg=error_msg)
+                    if raise_on_error:
+                        raise
+                return default_return_value
 
         return wrapper  # type: ignore
 
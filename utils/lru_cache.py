@@ -0,0 +1,123 @@
+# Standard imports
+import os
+import threading
+from collections import OrderedDict
+
+# Local imports
+from utils.handle_exceptions import handle_exceptions
+
+
+class SizedLRUCache:
+    """Thread-safe LRU cache of bytes bounded by total size in memory, optionally backed by a directory on disk that is bounded by total size as well.
+
+    Keys must be safe as file names (e.g. Git SHAs). A value evicted from memory stays on disk, so it can be promoted back later without a network request.
+    """
+
+    def __init__(
+        self, max_bytes: int, disk_dir: str | None = None, max_disk_bytes: int = 0
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+        self.disk_entries: OrderedDict[str, int] | None = None  # Loaded lazily
+        self.disk_size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            value = self.read_from_disk(key=key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.set_in_memory(key=key, value=value)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self.lock:
+            self.set_in_memory(key=key, value=value)
+            self.write_to_disk(key=key, value=value)
+
+    def set_in_memory(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _key, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def load_disk_entries(self) -> OrderedDict[str, int]:
+        """Scan the cache directory once, oldest access first, so that entries written by earlier runs in this container count toward the size limit."""
+        if self.disk_entries is not None:
+            return self.disk_entries
+        self.disk_entries = OrderedDict()
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            files = [entry for entry in os.scandir(self.disk_dir) if entry.is_file()]
+            for entry in sorted(files, key=lambda e: e.stat().st_atime):
+                self.disk_entries[entry.name] = entry.stat().st_size
+                self.disk_size += entry.stat().st_size
+        return self.disk_entries
+
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def read_from_disk(self, key: str) -> bytes | None:
+        if not self.disk_dir:
+            return None
+        disk_entries = self.load_disk_entries()
+        if key not in disk_entries:
+            return None
+        with open(file=os.path.join(self.disk_dir, key), mode="rb") as f:
+            value = f.read()
+        disk_entries.move_to_end(key)
+        return value
+
+    @handle_exceptions(default_return_value=None, raise_on_error=False)
+    def write_to_disk(self, key: str, value: bytes) -> None:
+        if not self.disk_dir or len(value) > self.max_disk_bytes:
+            return
+        disk_entries = self.load_disk_entries()
+        if key in disk_entries:
+            disk_entries.move_to_end(key)
+            return
+        os.makedirs(name=self.disk_dir, exist_ok=True)
+        path = os.path.join(self.disk_dir, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(file=tmp_path, mode="wb") as f:
+            f.write(value)
+        os.replace(src=tmp_path, dst=path)
+        disk_entries[key] = len(value)
+        self.disk_size += len(value)
+        while self.disk_size > self.max_disk_bytes:
+            evicted_key, evicted_size = disk_entries.popitem(last=False)
+            self.disk_size -= evicted_size
+            os.remove(path=os.path.join(self.disk_dir, evicted_key))
+
+    def stats(self) -> dict[str, int | float]:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            hit_rate = (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hit_rate, 3),
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "disk_bytes": self.disk_size,
+            }
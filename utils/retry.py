@@ -0,0 +1,171 @@
+# Standard imports
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Seconds kept in reserve so that a handler can still report an error before Lambda times out
+DEADLINE_SAFETY_MARGIN = 10.0
+
+deadline: float | None = (
+    None  # time.monotonic() value when the current invocation times out
+)
+
+
+def set_deadline(remaining_seconds: float) -> None:
+    global deadline  # pylint: disable=global-statement
+    deadline = time.monotonic() + remaining_seconds
+
+
+def set_deadline_from_lambda_context(context: Any) -> None:
+    """https://docs.aws.amazon.com/lambda/latest/dg/python-context.html"""
+    if hasattr(context, "get_remaining_time_in_millis"):
+        set_deadline(remaining_seconds=context.get_remaining_time_in_millis() / 1000)
+
+
+def get_remaining_time() -> float:
+    if deadline is None:
+        return float("inf")
+    return deadline - time.monotonic() - DEADLINE_SAFETY_MARGIN
+
+
+retry_policies: dict[str, "RetryPolicy"] = {}
+
+
+class RetryPolicy:
+    """Bounded retries with exponential backoff and full jitter. A delay suggested by the server (e.g. Retry-After) is respected, and no retry is attempted if the wait would not fit in the remaining time of the Lambda invocation."""
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.gave_up = 0
+        self.slept_seconds = 0.0
+        retry_policies[name] = self
+
+    def get_delay(self, attempt: int, suggested_delay: float | None = None) -> float:
+        """attempt is 1-based. A suggested delay is a lower bound, with up to 10% jitter so that waiting clients don't retry at the same moment."""
+        if suggested_delay is not None:
+            return max(suggested_delay, 0.0) * (1 + random.uniform(0, 0.1))
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, backoff)
+
+    def can_retry(self, attempt: int, delay: float) -> bool:
+        if attempt < self.max_attempts and delay <= get_remaining_time():
+            return True
+        with self.lock:
+            self.gave_up += 1
+        return False
+
+    def record(self, delay: float) -> None:
+        with self.lock:
+            self.retries += 1
+            self.slept_seconds += delay
+
+    def sleep(self, delay: float) -> None:
+        self.record(delay=delay)
+        time.sleep(delay)
+
+    async def sleep_async(self, delay: float) -> None:
+        self.record(delay=delay)
+        await asyncio.sleep(delay)
+
+    def call(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        get_retry_delay: Callable[[Exception], float | None],
+        **kwargs: Any,
+    ) -> T:
+        """Call func and retry while get_retry_delay(error) returns a delay (0 for the default backoff). Return None from get_retry_delay for errors that should not be retried."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:  # pylint: disable=broad-except
+                suggested_delay = get_retry_delay(err)
+                if suggested_delay is None:
+                    raise
+                delay = self.get_delay(
+                    attempt=attempt, suggested_delay=suggested_delay or None
+                )
+                if not self.can_retry(attempt=attempt, delay=delay):
+                    raise
+                self.sleep(delay=delay)
+
+    async def call_async(
+        self,
+        func: Callable[..., Awaitable[T]],
+        *args: Any,
+        get_retry_delay: Callable[[Exception], float | None],
+        **kwargs: Any,
+    ) -> T:
+        """Same as call() but for coroutine functions. It doesn't block the event loop while waiting."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func(*args, **kwargs)
+            except Exception as err:  # pylint: disable=broad-except
+                suggested_delay = get_retry_delay(err)
+                if suggested_delay is None:
+                    raise
+                delay = self.get_delay(
+                    attempt=attempt, suggested_delay=suggested_delay or None
+                )
+                if not self.can_retry(attempt=attempt, delay=delay):
+                    raise
+                await self.sleep_async(delay=delay)
+
+    def reset_metrics(self) -> None:
+        with self.lock:
+            self.retries = 0
+            self.gave_up = 0
+            self.slept_seconds = 0.0
+
+    def get_metrics(self) -> dict[str, int | float]:
+        with self.lock:
+            return {
+                "retries": self.retries,
+                "gave_up": self.gave_up,
+                "slept_seconds": round(self.slept_seconds, 3),
+            }
+
+
+def get_retry_metrics() -> dict[str, dict[str, int | float]]:
+    return {name: policy.get_metrics() for name, policy in retry_policies.items()}
+
+
+def reset_retry_metrics() -> None:
+    """Policies live as long as the container, so the counters are reset at the start of each invocation to log them per invocation."""
+    for policy in retry_policies.values():
+        policy.reset_metrics()
+
+
+def log_retry_metrics() -> None:
+    print(f"Retry metrics: {get_retry_metrics()}")
+
+
+# Policies per call class
+GITHUB_PRIMARY_RATE_LIMIT_RETRY = RetryPolicy(
+    name="github_primary_rate_limit", max_attempts=2, max_delay=3600
+)
+GITHUB_SECONDARY_RATE_LIMIT_RETRY = RetryPolicy(
+    name="github_secondary_rate_limit", max_attempts=3, base_delay=60, max_delay=300
+)
+GITHUB_SERVER_ERROR_RETRY = RetryPolicy(
+    name="github_server_error", max_attempts=3, base_delay=1, max_delay=10
+)
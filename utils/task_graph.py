@@ -0,0 +1,53 @@
+# Standard imports
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, NamedTuple
+
+MAX_TASK_WORKERS = 8
+
+
+class Task(NamedTuple):
+    """func is called with the results of its dependencies as keyword arguments named after them."""
+
+    func: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+
+
+def run_task_graph(
+    tasks: dict[str, Task], max_workers: int = MAX_TASK_WORKERS
+) -> dict[str, Any]:
+    """Run tasks on a thread pool as soon as their dependencies are done, and return their results by name. Independent I/O (GitHub, Supabase, Stripe) overlaps while only true dependencies are serialized. If a task raises, no new task is started and the error is raised after running tasks finish, as it would be in serial code."""
+    for name, task in tasks.items():
+        unknown = [dep for dep in task.deps if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {unknown}")
+
+    results: dict[str, Any] = {}
+    pending = dict(tasks)
+    running: dict[Future, str] = {}
+    started_at = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            ready = [
+                name
+                for name, task in pending.items()
+                if all(dep in results for dep in task.deps)
+            ]
+            for name in ready:
+                task = pending.pop(name)
+                kwargs = {dep: results[dep] for dep in task.deps}
+                running[executor.submit(task.func, **kwargs)] = name
+            if not running:
+                raise ValueError(f"Tasks have circular dependencies: {list(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    pending.clear()
+                    wait(running)
+                    raise error
+                results[name] = future.result()
+    print(f"Ran {len(tasks)} tasks in {time.time() - started_at:.2f} seconds")
+    return results